@@ -0,0 +1,200 @@
+"""Non-interactive batch mode: run rental commands from a JSONL or CSV file.
+
+    python batch_runner.py commands.jsonl > results.jsonl
+    cat commands.csv | python batch_runner.py - --format csv --user U001
+
+One command per line (JSONL) or per row (CSV, header = field names):
+
+    {"cmd": "add_car", "car_model": "Toyota Avanza", "price_per_day": 300000}
+    {"cmd": "rent", "car_id": "M001", "days": 3}        (or "start"/"end" as YYYY-MM-DD)
+    {"cmd": "return", "car_id": "M001"}
+    {"cmd": "register", "name": "Budi", "email": "budi@mail.com", "password": "...", "role": "customer"}
+    {"cmd": "export_stats", "path": "stats.xlsx"}       (.csv / .parquet, or "format")
+    {"cmd": "undo"}  /  {"cmd": "redo"}
+
+Commands go through the same functions as the interactive menus, on one pooled
+connection for the whole batch (plus one of the owning branch for a car of
+another branch, see fleet_shards). Each command is its own transaction, so a failing
+line does not undo the others. One JSON result per line is written to stdout
+(or --output); throughput totals go to stderr.
+"""
+import argparse
+import csv
+import datetime
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+
+import rental_system
+from instrumentation import span
+from fleet_shards import ShardsUnavailableError
+from reservations import ReservationConflictError
+
+
+def _date(value):
+    return datetime.date.fromisoformat(str(value).strip())
+
+
+def cmd_add_car(conn, session, args):
+    car = rental_system.create_car(conn, args.get("car_model"), args.get("car_type"), args.get("price_per_day"),
+                                   session=session)
+    return {"car_id": car["car_id"], "car_model": car["car_model"], "car_type": car["car_type"]}
+
+
+def cmd_rent(conn, session, args):
+    car_id = str(args["car_id"]).strip().upper()
+    if args.get("start") or args.get("end"):
+        start = _date(args["start"]) if args.get("start") else datetime.date.today()
+        end = _date(args["end"])
+        with rental_system.connect_car(car_id, conn) as car_conn:
+            rental_system.book_car(car_conn, car_id, start, end, session)
+        return {"car_id": car_id, "start": start.isoformat(), "end": end.isoformat()}
+    days = int(args["days"])
+    if days < 1:
+        raise ValueError("days harus >= 1")
+    with rental_system.connect_car(car_id, conn) as car_conn:
+        rental_system.rent_car(car_conn, car_id, days, session)
+    return {"car_id": car_id, "days": days}
+
+
+def cmd_return(conn, session, args):
+    car_id = str(args["car_id"]).strip().upper()
+    with rental_system.connect_car(car_id, conn) as car_conn:
+        rental_system.return_car(car_conn, car_id, session)
+    return {"car_id": car_id}
+
+
+def cmd_register(conn, session, args):
+    return rental_system.create_user(conn, args.get("name"), args.get("email"), str(args.get("password") or ""),
+                                     str(args.get("role") or "").strip().lower())
+
+
+def cmd_export_stats(conn, session, args):
+    fmt = str(args.get("format") or "").strip().lower() or None
+    path = args.get("path") or f"rental_stats_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt or 'xlsx'}"
+    stats, errors = rental_system.fleet_stats(session, conn)
+    report = rental_system.export_all(stats, path, fmt, session, conn=conn)
+    result = {"paths": report.paths, "rows": report.rows}
+    if errors or report.missing:
+        # branches left out of the statistics or the car list
+        result["unavailable"] = {**errors, **report.missing}
+    return result
+
+
+def _revert(conn, session, action):
+    event, _ = rental_system.session_event(session, action, conn)
+    # end the lookup's read transaction (implicit on MySQL) before revert_event starts its own
+    conn.rollback()
+    if event is None:
+        raise ValueError(f"Tidak ada aksi yang dapat di-{action}.")
+    with rental_system.connect_car(event["car_id"], conn) as car_conn:
+        rental_system.revert_event(car_conn, session, event, action)
+    return {"event_id": event["event_id"], "action": event["action"], "car_id": event["car_id"]}
+
+
+def cmd_undo(conn, session, args):
+    return _revert(conn, session, "undo")
+
+
+def cmd_redo(conn, session, args):
+    return _revert(conn, session, "redo")
+
+
+COMMANDS = {
+    "add_car": cmd_add_car,
+    "rent": cmd_rent,
+    "return": cmd_return,
+    "register": cmd_register,
+    "export_stats": cmd_export_stats,
+    "undo": cmd_undo,
+    "redo": cmd_redo,
+}
+
+# errors that reject one command; anything else is reported the same way but with its type
+EXPECTED_ERRORS = (ValueError, KeyError, rental_system.RentalConflictError, rental_system.CarNotFoundError,
+                   ReservationConflictError, ShardsUnavailableError)
+
+
+def iter_commands(stream, fmt):
+    """Yield (line number, command dict or parse error) from a JSONL or CSV stream."""
+    if fmt == "csv":
+        for i, row in enumerate(csv.DictReader(stream), start=2):
+            yield i, {k.strip(): v.strip() for k, v in row.items() if k and v not in (None, "") and v.strip()}
+        return
+    for i, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield i, ValueError(f"JSON tidak valid: {e}")
+            continue
+        yield i, command if isinstance(command, dict) else ValueError("baris harus berupa objek JSON")
+
+
+def run_command(conn, session, command):
+    if isinstance(command, Exception):
+        raise command
+    name = str(command.get("cmd", "")).strip().lower()
+    handler = COMMANDS.get(name)
+    if handler is None:
+        raise ValueError(f"perintah tidak dikenal: {command.get('cmd')!r} (pilihan: {', '.join(COMMANDS)})")
+    with span(f"batch.{name}"):
+        return handler(conn, session, command)
+
+
+def run_batch(stream, out, fmt="jsonl", user_id=None):
+    session = {"session_id": uuid.uuid4().hex, "user_id": user_id}
+    totals = Counter()
+    started = time.perf_counter()
+    with rental_system.connect_db() as conn:
+        for line_no, command in iter_commands(stream, fmt):
+            name = command.get("cmd") if isinstance(command, dict) else None
+            result = {"line": line_no, "cmd": name}
+            try:
+                result["result"] = run_command(conn, session, command)
+                result["ok"] = True
+            except EXPECTED_ERRORS as e:
+                result.update(ok=False, error=str(e) if not isinstance(e, KeyError) else f"kolom {e} wajib diisi")
+            except Exception as e:
+                result.update(ok=False, error=f"{type(e).__name__}: {e}")
+            finally:
+                # leave the shared connection clean for the next command, the same as a pool release:
+                # no half-done write and no read transaction a report or lookup left open on MySQL
+                conn.rollback()
+            totals["ok" if result["ok"] else "failed"] += 1
+            out.write(json.dumps(result, default=str) + "\n")
+    elapsed = time.perf_counter() - started
+    return totals, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan perintah rental dari file JSONL/CSV")
+    parser.add_argument("path", help="file perintah, atau - untuk stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: dari ekstensi file (jsonl untuk stdin)")
+    parser.add_argument("--output", help="file hasil (default stdout)")
+    parser.add_argument("--user", help="user_id yang dicatat di log event")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    rental_system.init_schema()
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        totals, elapsed = run_batch(stream, out, fmt, args.user)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    done = totals["ok"] + totals["failed"]
+    print(f"{done} perintah dalam {elapsed:.2f} s ({done / elapsed if elapsed else 0:,.0f} perintah/detik): "
+          f"{totals['ok']} sukses, {totals['failed']} gagal", file=sys.stderr)
+    if totals["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Chart data and rendering: raw-row scatter vs aggregate specs, cold vs cached render.
+
+    python -m benchmarks.bench_charts --cars 1000000 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet
+from charts import chart_specs, render_charts
+
+
+def legacy_scatter_data():
+    # what the scatter used to load: every row's price and rental count
+    prices, counts = [], []
+    for chunk in rental_system.iter_query_chunks("SELECT price_per_day, total_rental_count FROM mobil_rental"):
+        prices.append(chunk['price_per_day'].to_numpy())
+        counts.append(chunk['total_rental_count'].to_numpy())
+    return len(np.concatenate(prices)), len(np.concatenate(counts))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    args = parser.parse_args()
+
+    rental_system.set_backend(build_sqlite_fleet(args.cars))
+    rental_system.init_schema()
+    legacy, (points, _) = timed(legacy_scatter_data)
+    with rental_system.connect_db() as conn:
+        spec_time, specs = timed(lambda: chart_specs(conn))
+    out_dir = tempfile.mkdtemp(prefix="charts_")
+    serial, _ = timed(lambda: render_charts(specs, os.path.join(out_dir, "serial"), args.format, workers=1))
+    cold, _ = timed(lambda: render_charts(specs, out_dir, args.format, args.workers))
+    warm, results = timed(lambda: render_charts(specs, out_dir, args.format, args.workers))
+    cached = sum(1 for _, _, source in results if source == "cache")
+    print(f"fleet {args.cars:,} mobil")
+    print(f"data scatter lama (semua baris) : {legacy:.2f} s, {points:,} titik")
+    print(f"spesifikasi 5 grafik (agregat)  : {spec_time:.2f} s, {len(specs['price_vs_rentals']['x']):,} titik scatter")
+    print(f"render 1 proses                 : {serial:.2f} s")
+    print(f"render {args.workers} proses                 : {cold:.2f} s")
+    print(f"render ulang tanpa perubahan    : {warm:.3f} s ({cached}/{len(results)} dari cache)")
+
+
+if __name__ == "__main__":
+    main()
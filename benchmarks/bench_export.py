@@ -0,0 +1,69 @@
+"""Time and peak memory of the statistics export: old pandas ExcelWriter vs streamed writers.
+
+    python -m benchmarks.bench_export --cars 50000
+
+Peak memory is what tracemalloc sees (Python objects, including openpyxl's
+cell objects); the old path keeps the whole full_data sheet in memory until
+the workbook is saved.
+"""
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+import tracemalloc
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet
+from fleet_export import FULL_DATA_QUERY, export_fleet
+from fleet_summary import load_fleet_stats
+
+
+def legacy_excel(stats, path, conn):
+    # the export before streaming: pandas ExcelWriter, full_data appended chunk by chunk
+    import pandas as pd
+    with pd.ExcelWriter(path) as writer:
+        stats.summary_frame().to_excel(writer, sheet_name="summary", index=False)
+        stats.by_type_frame().to_excel(writer, sheet_name="by_type", index=False)
+        row = 0
+        for chunk in rental_system.iter_query_chunks(FULL_DATA_QUERY, conn=conn):
+            chunk.to_excel(writer, sheet_name="full_data", index=False, startrow=row, header=(row == 0))
+            row += len(chunk) + (1 if row == 0 else 0)
+
+
+def measure(fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    # second run for memory: tracemalloc makes openpyxl several times slower
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=50000)
+    parser.add_argument("--skip-legacy", action="store_true", help="old path is slow on large fleets")
+    args = parser.parse_args()
+
+    rental_system.set_backend(build_sqlite_fleet(args.cars))
+    rental_system.init_schema()
+    out = tempfile.mkdtemp(prefix="export_")
+    with rental_system.connect_db() as conn:
+        stats = load_fleet_stats(conn)
+        runs = [] if args.skip_legacy else [("pandas ExcelWriter (lama)", lambda: legacy_excel(stats, os.path.join(out, "old.xlsx"), conn))]
+        runs += [("xlsx streaming", lambda: export_fleet(stats, os.path.join(out, "new.xlsx"), conn)),
+                 ("csv streaming", lambda: export_fleet(stats, os.path.join(out, "new.csv"), conn))]
+        if importlib.util.find_spec("pyarrow"):
+            runs.append(("parquet streaming", lambda: export_fleet(stats, os.path.join(out, "new.parquet"), conn)))
+        print(f"fleet {args.cars:,} mobil")
+        for name, fn in runs:
+            elapsed, peak = measure(fn)
+            print(f"{name:<26} waktu={elapsed:6.2f} s  peak={peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cost of the instrumentation layer: the same rent/return/search workload with it off and on.
+
+    python -m benchmarks.bench_instrumentation --cars 20000 --ops 20000
+
+Runs on an in-memory SQLite fleet, where queries take microseconds, so this is
+the worst case for relative overhead.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import instrumentation
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet, car_id_for
+from car_search import search_cars
+
+KEYWORDS = ["toyota", "suv", "avanza", "cx", "sedan"]
+
+
+def workload(n_ops, n_cars, seed):
+    rng = random.Random(seed)
+    for _ in range(n_ops):
+        roll = rng.random()
+        with rental_system.connect_db() as conn:
+            car_id = car_id_for(rng.randint(1, n_cars))
+            try:
+                if roll < 0.4:
+                    rental_system.rent_car(conn, car_id, rng.randint(1, 7))
+                elif roll < 0.8:
+                    rental_system.return_car(conn, car_id)
+                else:
+                    search_cars(conn, rng.choice(KEYWORDS), "Tersedia", limit=20)
+            except (rental_system.RentalConflictError, rental_system.CarNotFoundError):
+                pass
+
+
+def timed_run(args, enabled):
+    rental_system.set_backend(build_sqlite_fleet(args.cars))
+    rental_system.init_schema()
+    instrumentation.REGISTRY.reset()
+    if enabled:
+        instrumentation.enable(slow_query_ms=1e9, slow_log_path=os.path.join(tempfile.mkdtemp(), "slow.log"))
+    else:
+        instrumentation.disable()
+    started = time.perf_counter()
+    workload(args.ops, args.cars, args.seed)
+    elapsed = time.perf_counter() - started
+    instrumentation.disable()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=20000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    off = timed_run(args, False)
+    on = timed_run(args, True)
+    statements = len(instrumentation.snapshot()["queries"])
+    print(f"{args.ops:,} operasi pada {args.cars:,} mobil (SQLite in-memory)")
+    print(f"instrumentasi mati : {off:.2f} s ({off / args.ops * 1e6:.1f} us/operasi)")
+    print(f"instrumentasi aktif: {on:.2f} s ({on / args.ops * 1e6:.1f} us/operasi, "
+          f"+{(on - off) / args.ops * 1e6:.1f} us, {statements} bentuk statement tercatat)")
+
+
+if __name__ == "__main__":
+    main()
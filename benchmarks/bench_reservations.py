@@ -0,0 +1,138 @@
+"""Availability queries over the reservation calendar, plus a concurrent booking check.
+
+    python -m benchmarks.bench_reservations --cars 100000 --per-car 4 --threads 16
+
+Part 1 books `per-car` random future reservations for every car and times
+"which cars are busy in [start, end)" through ReservationCalendar against a
+SQL range query over the reservations table. Part 2 lets many threads book
+random overlapping windows on a few cars of a SQLite file and checks that no
+two active reservations of one car overlap. Exit status 1 on any overlap.
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import threading
+import time
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet, car_id_for
+from reservations import (MAX_RESERVATION_DAYS, ReservationCalendar, ReservationConflictError,
+                          ensure_reservation_changes, ensure_reservations)
+from storage import SQLiteBackend
+
+HORIZON_DAYS = 365
+
+
+def seed_reservations(conn, n_cars, per_car, rng):
+    today = datetime.date.today()
+    rows = []
+    for n in range(1, n_cars + 1):
+        # non-overlapping slots per car, spread over the horizon
+        slot = HORIZON_DAYS // per_car
+        for k in range(per_car):
+            start = today + datetime.timedelta(days=k * slot + rng.randint(1, max(1, slot - 15)))
+            end = start + datetime.timedelta(days=rng.randint(1, 14))
+            rows.append((car_id_for(n), None, start.isoformat(), end.isoformat(), "aktif", 1))
+    conn.cursor().executemany("INSERT INTO reservations (car_id, user_id, start_date, end_date, status, version) "
+                              "VALUES (%s,%s,%s,%s,%s,%s)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def sql_busy(conn, start, end):
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT car_id FROM reservations WHERE status='aktif' AND start_date < %s AND end_date > %s",
+                   (end.isoformat(), start.isoformat()))
+    return {r[0] for r in cursor.fetchall()}
+
+
+def bench_queries(args):
+    rng = random.Random(args.seed)
+    backend = build_sqlite_fleet(args.cars)
+    with backend.connection() as conn:
+        ensure_reservations(conn)
+        ensure_reservation_changes(conn)
+        total = seed_reservations(conn, args.cars, args.per_car, rng)
+        calendar = ReservationCalendar()
+        started = time.perf_counter()
+        calendar.sync(conn)
+        load = time.perf_counter() - started
+
+        today = datetime.date.today()
+        windows = []
+        for _ in range(args.queries):
+            start = today + datetime.timedelta(days=rng.randint(1, HORIZON_DAYS))
+            windows.append((start, start + datetime.timedelta(days=rng.randint(1, 7))))
+        started = time.perf_counter()
+        indexed = [calendar.busy_cars(s, e) for s, e in windows]
+        t_index = (time.perf_counter() - started) / len(windows) * 1000
+        started = time.perf_counter()
+        scanned = [sql_busy(conn, s, e) for s, e in windows]
+        t_sql = (time.perf_counter() - started) / len(windows) * 1000
+    backend.close()
+    if indexed != scanned:
+        raise SystemExit("Hasil kalender berbeda dari query SQL!")
+    print(f"{args.cars:,} mobil, {total:,} reservasi aktif (kalender dimuat dalam {load:.2f} s)")
+    print(f"mobil sibuk per jendela: kalender {t_index:.3f} ms, SQL range query {t_sql:.3f} ms")
+
+
+def booking_worker(car_ids, attempts, seed, outcome, lock):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    ok = conflicts = 0
+    for _ in range(attempts):
+        start = today + datetime.timedelta(days=rng.randint(1, 60))
+        end = start + datetime.timedelta(days=rng.randint(1, min(10, MAX_RESERVATION_DAYS)))
+        try:
+            with rental_system.connect_db() as conn:
+                rental_system.book_car(conn, rng.choice(car_ids), start, end)
+            ok += 1
+        except ReservationConflictError:
+            conflicts += 1
+    with lock:
+        outcome["ok"] += ok
+        outcome["conflict"] += conflicts
+
+
+def check_concurrent_booking(args):
+    path = os.path.join(tempfile.mkdtemp(), "reservations.sqlite3")
+    rental_system.set_backend(SQLiteBackend(path, pool_config={"size": args.threads, "timeout": 120}))
+    rental_system.init_schema()
+    car_ids = [car_id_for(n) for n in range(1, 6)]
+    outcome, lock = {"ok": 0, "conflict": 0}, threading.Lock()
+    threads = [threading.Thread(target=booking_worker, args=(car_ids, args.attempts // args.threads, args.seed + i, outcome, lock))
+               for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with rental_system.connect_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT a.reservation_id, b.reservation_id, a.car_id FROM reservations a JOIN reservations b "
+                       "ON a.car_id = b.car_id AND a.reservation_id < b.reservation_id "
+                       "WHERE a.status='aktif' AND b.status='aktif' AND a.start_date < b.end_date AND b.start_date < a.end_date")
+        overlaps = cursor.fetchall()
+    print(f"booking paralel: {outcome['ok']} sukses, {outcome['conflict']} ditolak karena bentrok, {len(overlaps)} overlap")
+    if overlaps:
+        raise SystemExit(1)
+    print("Konsisten: tidak ada reservasi yang tumpang tindih.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100000)
+    parser.add_argument("--per-car", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=2000, help="booking attempts over all threads")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    bench_queries(args)
+    check_concurrent_booking(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Search latency vs fleet size: trigram index (car_search) vs LIKE '%kw%' scan.
+
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import build_sqlite_fleet
+from car_search import ensure_search_index, search_cars
+
+KEYWORDS = ["toyota", "suv", "cx", "brio", "x-trail", "sedan", "innova", "zzz"]
+
+
+def like_scan(conn, keyword, limit):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM mobil_rental WHERE LOWER(car_model) LIKE %s OR LOWER(car_type) LIKE %s LIMIT %s",
+                   (f"%{keyword}%", f"%{keyword}%", limit))
+    return cursor.fetchall()
+
+
+def avg_ms(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for kw in KEYWORDS:
+            fn(kw)
+    return (time.perf_counter() - started) / (repeat * len(KEYWORDS)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--status", default="Tersedia", help="filter status ('' untuk tanpa filter)")
+    args = parser.parse_args()
+
+    print(f"{'fleet':>10} {'index (ms)':>12} {'LIKE scan (ms)':>15}")
+    for size in args.sizes:
+        backend = build_sqlite_fleet(size)
+        with backend.connection() as conn:
+            ensure_search_index(conn)
+            indexed = avg_ms(lambda kw: search_cars(conn, kw, status=args.status or None, limit=args.limit), args.repeat)
+            # the LIKE scan must read every row when few/no cars match
+            scan = avg_ms(lambda kw: like_scan(conn, kw, args.limit), args.repeat)
+        backend.close()
+        print(f"{size:>10,} {indexed:>12.2f} {scan:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Fleet snapshot vs the database for listings, car types and chart data.
+
+    python -m benchmarks.bench_snapshot --cars 1000000 --pages 500
+
+On a synthetic SQLite fleet this first checks that the snapshot gives exactly
+what the database gives: listing pages for every filter and direction, the
+car types and the five chart specs. Then it times both paths, and reports
+load time and memory. Finally it checks the invalidation rules:
+
+    patch        a rent/return/add/undo in this process shows at once, without a reload
+    other writer a second cache, standing in for another process, reloads after its ttl
+                 once the version check sees the write
+
+Exits with status 1 if a result differs or a rule does not hold.
+"""
+import argparse
+import random
+import time
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet, car_id_for
+from charts import chart_specs, snapshot_chart_specs
+from fleet_snapshot import SnapshotCache, describe_stats
+
+SESSION = {"session_id": "bench-snapshot", "user_id": "U001"}
+
+
+def filters_for(types):
+    return [None, {"status": "Tersedia"}, {"status": "Dirental"}] + [{"car_type": t} for t in types]
+
+
+def db_page(filters, anchor=None, direction="next", page_size=None):
+    where, params = rental_system.car_filter_sql(filters)
+    return rental_system.fetch_car_page(where, params, anchor, direction, page_size)
+
+
+def compare_pages(snapshot, types, n_cars, rng, samples):
+    mismatches = 0
+    for filters in filters_for(types):
+        anchors = [None] + [car_id_for(rng.randint(1, n_cars + 5)) for _ in range(samples)] + ["", "Z"]
+        for anchor in anchors:
+            for direction in ("next", "prev", "jump"):
+                for page_size in (1, 20):
+                    a, more_a = snapshot.page(filters, anchor, direction, page_size)
+                    b, more_b = db_page(filters, anchor, direction, page_size)
+                    if more_a != more_b or not a.equals(b):
+                        mismatches += 1
+                        if mismatches <= 3:
+                            print(f"   beda: {filters} {anchor!r} {direction} {page_size}")
+    return mismatches
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def walk(page_fn, filters, pages):
+    df, more = page_fn(filters)
+    for _ in range(pages):
+        if not more:
+            df, more = page_fn(filters)
+            continue
+        df, more = page_fn(filters, df["car_id"].iloc[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=200000)
+    parser.add_argument("--pages", type=int, default=200, help="halaman per pengukuran")
+    parser.add_argument("--samples", type=int, default=10, help="anchor acak per filter saat membandingkan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    failures = 0
+
+    print(f"Menyiapkan fleet sintetis {args.cars:,} mobil ...")
+    rental_system.set_backend(build_sqlite_fleet(args.cars))
+    rental_system.init_schema()
+    cache = SnapshotCache(rental_system.connect_db, background=False)
+    snapshot = cache.wait_loaded()
+    print(describe_stats(cache.snapshot_stats()))
+
+    # ---- same results ----
+    db_types = sorted(rental_system.fetch_all_to_df("SELECT DISTINCT car_type FROM mobil_rental")["car_type"])
+    same_types = snapshot.car_types() == db_types
+    mismatches = compare_pages(snapshot, db_types, args.cars, rng, args.samples)
+    with rental_system.connect_db() as conn:
+        same_charts = snapshot_chart_specs(snapshot) == chart_specs(conn)
+    print(f"{'ok' if not mismatches else 'GAGAL':<6} halaman sama dengan database ({mismatches} beda)")
+    print(f"{'ok' if same_types else 'GAGAL':<6} jenis mobil sama")
+    print(f"{'ok' if same_charts else 'GAGAL':<6} data grafik sama")
+    failures += bool(mismatches) + (not same_types) + (not same_charts)
+
+    # ---- timings ----
+    print(f"{'operasi':<28} {'database':>12} {'snapshot':>12}")
+    rows = [
+        (f"{args.pages} halaman, semua", lambda: walk(db_page, None, args.pages),
+         lambda: walk(snapshot.page, None, args.pages)),
+        (f"{args.pages} halaman, Tersedia", lambda: walk(db_page, {"status": "Tersedia"}, args.pages),
+         lambda: walk(snapshot.page, {"status": "Tersedia"}, args.pages)),
+        (f"{args.pages} halaman, jenis", lambda: walk(db_page, {"car_type": db_types[0]}, args.pages),
+         lambda: walk(snapshot.page, {"car_type": db_types[0]}, args.pages)),
+        ("daftar jenis mobil", lambda: rental_system.fetch_all_to_df("SELECT DISTINCT car_type FROM mobil_rental"),
+         snapshot.car_types),
+    ]
+    for name, db_fn, snap_fn in rows:
+        print(f"{name:<28} {timed(db_fn, 3) * 1000:>10.1f}ms {timed(snap_fn, 3) * 1000:>10.1f}ms")
+
+    def db_charts():
+        with rental_system.connect_db() as conn:
+            chart_specs(conn)
+    print(f"{'data grafik':<28} {timed(db_charts, 3) * 1000:>10.1f}ms "
+          f"{timed(lambda: snapshot_chart_specs(snapshot), 3) * 1000:>10.1f}ms")
+
+    # ---- invalidation ----
+    rental_system.SNAPSHOT_CONFIG.update(enabled=True, ttl=0.2)
+    own = rental_system.get_snapshot()
+    own.background = False
+    own.wait_loaded()
+    other = SnapshotCache(rental_system.connect_db, ttl=0.2, background=False)
+    other.wait_loaded()
+    car_id = snapshot.page({"status": "Tersedia"})[0]["car_id"].iloc[0]
+    with rental_system.connect_db() as conn:
+        rental_system.rent_car(conn, car_id, 3, SESSION)
+        added = rental_system.create_car(conn, "Toyota Avanza", "MPV", 300000, SESSION)
+    # still within the other cache's ttl: it has not looked at the database yet
+    stale_before = other.get().page(None, car_id, "jump", 1)[0]["status"].iloc[0]
+    seen = rental_system.current_snapshot().page(None, car_id, "jump", 1)[0]
+    patched = (seen["status"].iloc[0] == "Dirental" and rental_system.current_snapshot().page(
+        None, added["car_id"], "jump", 1)[0]["car_id"].iloc[0] == added["car_id"])
+    time.sleep(0.25)
+    stats = own.snapshot_stats()
+    kept = rental_system.current_snapshot() is not None and own.snapshot_stats()["loads"] == stats["loads"]
+    print(f"{'ok' if patched and kept else 'GAGAL':<6} patch: tulisan sendiri langsung terlihat, tanpa muat ulang "
+          f"({own.snapshot_stats()['patches']} patch, {own.snapshot_stats()['loads']} kali dimuat)")
+    failures += not (patched and kept)
+
+    missed = other.get() is None
+    fresh = other.get()
+    reloaded = fresh is not None and fresh.page(None, car_id, "jump", 1)[0]["status"].iloc[0] == "Dirental"
+    print(f"{'ok' if missed and reloaded else 'GAGAL':<6} writer lain: terbaca {stale_before} sampai ttl, "
+          f"lalu dimuat ulang ({other.snapshot_stats()['stale']} kedaluwarsa)")
+    failures += not (missed and reloaded)
+    print(describe_stats(own.snapshot_stats()))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Time-to-first-menu of rental_system.py, measured from process start.
+
+    python -m benchmarks.bench_startup --runs 10
+
+Launches `python rental_system.py` on a temporary SQLite database and stops
+the clock when the role menu appears on stdout. The first launch applies the
+schema migrations; later launches only read schema_version. For comparison
+the same start is timed with pandas, matplotlib and tabulate imported up
+front, as the program used to do.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_MENU = "Masuk sebagai"
+EAGER = "import pandas, numpy, tabulate, matplotlib.pyplot; "
+
+
+def time_to_menu(env, preload=""):
+    code = f"{preload}import rental_system; rental_system.main()"
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env, text=True,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for line in proc.stdout:
+        if FIRST_MENU in line:
+            elapsed = time.perf_counter() - started
+            break
+    else:
+        raise RuntimeError(f"menu tidak muncul: {proc.stderr.read()}")
+    proc.communicate("4\n")
+    return elapsed
+
+
+def loaded_heavy_modules(env):
+    code = ("import sys, rental_system; rental_system.init_schema(); "
+            "print(','.join(m for m in ('pandas', 'numpy', 'matplotlib', 'tabulate') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return out.stdout.strip() or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, RENTAL_DB_BACKEND="sqlite", RENTAL_METRICS="0",
+               RENTAL_SQLITE_PATH=os.path.join(tempfile.mkdtemp(), "startup.sqlite3"))
+    first = time_to_menu(env)
+    lazy = [time_to_menu(env) for _ in range(args.runs)]
+    eager = [time_to_menu(env, EAGER) for _ in range(args.runs)]
+    print(f"start pertama (migrasi skema)      : {first * 1000:7.0f} ms")
+    print(f"start berikutnya (median {args.runs} run)   : {statistics.median(lazy) * 1000:7.0f} ms")
+    print(f"dengan impor pandas/matplotlib awal: {statistics.median(eager) * 1000:7.0f} ms")
+    print(f"modul berat dimuat sebelum menu    : {loaded_heavy_modules(env)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare the statistics screen's summary-table path with the old seven-query path.
+
+    python -m benchmarks.bench_statistics --cars 1000000
+
+The synthetic fleet is migrated (which builds the fleet summary), then both
+paths are timed and their figures compared: totals, status counts, average
+price, rental-count range, the top lists and the price range. Prints ok or
+GAGAL and exits with status 1 on a mismatch.
+"""
+import argparse
+import math
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import build_sqlite_fleet
+from fleet_summary import load_fleet_stats
+from migrations import migrate
+
+
+def legacy_statistics(conn):
+    # the query sequence show_statistics used to send
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) as cnt FROM mobil_rental")
+    total = cursor.fetchone()["cnt"]
+    cursor.execute("SELECT status, COUNT(*) as jumlah FROM mobil_rental GROUP BY status")
+    status_counts = {r["status"]: r["jumlah"] for r in cursor.fetchall()}
+    cursor.execute("SELECT AVG(price_per_day) as avg_price FROM mobil_rental")
+    avg_price = cursor.fetchone()["avg_price"]
+    cursor.execute("SELECT car_type, AVG(price_per_day) as avg_type_price, COUNT(*) as cnt FROM mobil_rental GROUP BY car_type")
+    cursor.fetchall()
+    cursor.execute("SELECT AVG(total_rental_count) as avg_rent_count, MAX(total_rental_count) as max_rent_count, MIN(total_rental_count) as min_rent_count FROM mobil_rental")
+    rent = cursor.fetchone()
+    cursor.execute("SELECT car_id, car_model, total_rental_count FROM mobil_rental ORDER BY total_rental_count DESC LIMIT 5")
+    top_rented = cursor.fetchall()
+    cursor.execute("SELECT car_id, car_model, days_out FROM mobil_rental WHERE status='Dirental' ORDER BY days_out DESC LIMIT 5")
+    long_rentals = cursor.fetchall()
+    cursor.execute("SELECT price_per_day, car_type, status, total_rental_count, car_id, car_model FROM mobil_rental")
+    df = pd.DataFrame(cursor.fetchall())
+    return {"total": total, "status_counts": status_counts, "avg_price": avg_price,
+            "rent_range": (rent["min_rent_count"], rent["max_rent_count"]),
+            # ties are unordered here, so only the values are compared
+            "top_rented": [r["total_rental_count"] for r in top_rented],
+            "long_rentals": [r["days_out"] for r in long_rentals],
+            "price_range": (float(df["price_per_day"].min()), float(df["price_per_day"].max())) if total else None}
+
+
+def summary_statistics(conn):
+    stats = load_fleet_stats(conn)
+    return {"total": stats.total, "status_counts": stats.status_counts, "avg_price": stats.avg_price,
+            "rent_range": (stats.min_rental_count, stats.max_rental_count),
+            "top_rented": [r["total_rental_count"] for r in stats.top_rented],
+            "long_rentals": [r["days_out"] for r in stats.long_rentals],
+            "price_range": (stats.price_summary["min"], stats.price_summary["max"]) if stats.total else None}
+
+
+def same(a, b):
+    if isinstance(a, (float, int)) and isinstance(b, (float, int)):
+        return math.isclose(float(a), float(b), rel_tol=1e-9)
+    return a == b
+
+
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", default=":memory:", help="SQLite file (default in-memory)")
+    args = parser.parse_args()
+
+    print(f"Menyiapkan fleet sintetis {args.cars:,} mobil ...")
+    backend = build_sqlite_fleet(args.cars, args.db)
+    with backend.connection() as conn:
+        migrate(conn)
+        legacy, expected = timed(lambda: legacy_statistics(conn), args.repeat)
+        summary, got = timed(lambda: summary_statistics(conn), args.repeat)
+    backend.close()
+    print(f"legacy (7 query + full select): {legacy:.3f} s")
+    print(f"tabel ringkasan               : {summary:.3f} s")
+    print(f"speedup                       : {legacy / summary:.2f}x")
+
+    failures = 0
+    for key, want in expected.items():
+        if isinstance(want, (list, tuple)):
+            passed = len(want) == len(got[key]) and all(same(a, b) for a, b in zip(want, got[key]))
+        else:
+            passed = same(want, got[key])
+        print(f"{'ok' if passed else 'GAGAL':<6} {key:<14} {'' if passed else f'{want!r} != {got[key]!r}'}")
+        failures += not passed
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
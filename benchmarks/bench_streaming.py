@@ -0,0 +1,55 @@
+"""Peak memory of fetchall-into-DataFrame vs streamed chunks on a large mobil_rental.
+
+    python -m benchmarks.bench_streaming --cars 1000000 --chunk-size 10000
+"""
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet
+
+
+def legacy_fetch_all():
+    # the pre-streaming fetch_all_to_df: dict rows + DataFrame copy
+    with rental_system.connect_db() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM mobil_rental")
+        rows = cursor.fetchall()
+    return len(pd.DataFrame(rows))
+
+
+def streamed(chunk_size):
+    total = 0
+    for chunk in rental_system.iter_query_chunks("SELECT * FROM mobil_rental", chunk_size=chunk_size):
+        total += len(chunk)
+    return total
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    rental_system.set_backend(build_sqlite_fleet(args.cars))
+    for name, fn in [("fetchall + DataFrame", legacy_fetch_all),
+                     (f"iter_query_chunks({args.chunk_size})", lambda: streamed(args.chunk_size))]:
+        rows, elapsed, peak = measure(fn)
+        print(f"{name:28s} rows={rows:,} waktu={elapsed:.2f} s peak={peak / 2**20:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
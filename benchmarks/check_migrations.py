@@ -0,0 +1,123 @@
+"""Upgrade check: a database created from the original rental_db.sql, migrated to the latest schema.
+
+    python -m benchmarks.check_migrations
+
+Builds a temporary SQLite database with the first release's schema (car_id
+primary key, FLOAT prices, no clock columns) and the cars of rental_db.sql,
+then runs every migration on it. Every check prints ok or GAGAL, and the
+script exits with status 1 if any failed:
+
+    migrasi lengkap      every step applies, in order, without errors
+    skema terbaru        surrogate id, DECIMAL price and the clock columns are there
+    ringkasan konsisten  fleet summary, histograms and top buffers match mobil_rental
+    sewa setelah migrasi a rent and a return go through on the upgraded database
+    migrasi berulang     a second run finds nothing to do
+"""
+import argparse
+import os
+import tempfile
+
+import rental_system
+from fleet_summary import read_top, verify_fleet_summary
+from migrations import LATEST_VERSION, migrate
+from storage import SEED_FILE, SQLiteBackend, split_sql_script, table_columns
+
+SESSION = {"session_id": "check-migrations", "user_id": "U001"}
+# schema of the first release, before any migration existed
+ORIGINAL_DDL = """
+CREATE TABLE IF NOT EXISTS mobil_rental (
+    car_id VARCHAR(10) PRIMARY KEY,
+    car_model VARCHAR(100) NOT NULL,
+    car_type VARCHAR(50) NOT NULL,
+    price_per_day FLOAT NOT NULL,
+    status ENUM('Tersedia', 'Dirental') NOT NULL,
+    current_rental_days INT NOT NULL DEFAULT 0,
+    total_rental_count INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id VARCHAR(6) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password VARCHAR(100) NOT NULL,
+    role ENUM('manager','customer') NOT NULL
+);
+"""
+
+
+def original_seed(path):
+    # the original tables with today's seed rows (the INSERTs only name the original columns)
+    with open(SEED_FILE, encoding="utf-8") as f:
+        inserts = [s for s in split_sql_script(f.read()) if s.upper().startswith("INSERT")]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(ORIGINAL_DDL + "\n" + ";\n\n".join(inserts) + ";\n")
+
+
+class Checks:
+    def __init__(self):
+        self.failures = 0
+
+    def __call__(self, name, passed, detail=""):
+        print(f"{'ok' if passed else 'GAGAL':<6} {name:<22} {detail}")
+        if not passed:
+            self.failures += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="rental_migrations_")
+    seed = os.path.join(tmp, "rental_db_v0.sql")
+    original_seed(seed)
+    backend = SQLiteBackend(os.path.join(tmp, "v0.sqlite3"), seed_file=seed)
+    check = Checks()
+
+    with backend.connection() as conn:
+        try:
+            applied = migrate(conn, lambda n, d: print(f"Migrasi {n}: {d} ..."))
+            error = ""
+        except Exception as e:
+            applied, error = [], repr(e)
+        check("migrasi lengkap", applied == list(range(1, LATEST_VERSION + 1)), error or f"langkah {applied}")
+        if error:
+            print(f"{check.failures} pemeriksaan gagal.")
+            raise SystemExit(1)
+
+        columns = table_columns(conn, "mobil_rental")
+        wanted = ["id", "rented_on", "days_out", "overdue"]
+        check("skema terbaru", all(c in columns for c in wanted) and columns["price_per_day"].startswith("decimal"),
+              f"price_per_day {columns['price_per_day']}, kolom {sorted(columns)}")
+
+        problems = verify_fleet_summary(conn)
+        long_rentals = read_top(conn.cursor(), "days_out")
+        check("ringkasan konsisten", not problems and len(long_rentals) > 0,
+              "; ".join(problems) or f"{len(long_rentals)} mobil di top days_out")
+        conn.commit()
+
+    rental_system.set_backend(backend)
+    with rental_system.connect_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT car_id FROM mobil_rental WHERE status='Tersedia' ORDER BY car_id LIMIT 1")
+        car_id = cursor.fetchone()[0]
+        conn.commit()
+        try:
+            rental_system.rent_car(conn, car_id, 3, SESSION)
+            rental_system.return_car(conn, car_id, SESSION)
+            error = ""
+        except Exception as e:
+            error = repr(e)
+        problems = verify_fleet_summary(conn)
+        conn.commit()
+        check("sewa setelah migrasi", not error and not problems, error or "; ".join(problems) or car_id)
+
+        check("migrasi berulang", migrate(conn) == [])
+    rental_system.set_backend(None)
+
+    print(f"{check.failures} pemeriksaan gagal.")
+    if check.failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
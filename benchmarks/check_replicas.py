@@ -0,0 +1,207 @@
+"""Read/write splitting check: a primary and two local read replicas.
+
+    python -m benchmarks.check_replicas --cars 20000
+    python -m benchmarks.check_replicas --configured   # DB_CONFIG with "replicas", e.g. two local MySQL servers
+
+By default the primary is a synthetic SQLite fleet and the replicas are two
+read-only copies of it that this script refreshes with SQLite's backup API
+("replication"); not refreshing them makes them lag. Every check prints ok or
+GAGAL, and the script exits with status 1 if any failed:
+
+    laporan di replika    manager reports of a session without recent writes go to the replicas, in turn
+    read-your-writes      right after a rent the renting session reads it back; a stale replica would not
+    replika menyusul      once the replicas have the write, that session reads from them again
+    lag -> primary        replicas more than max_lag behind: reads go to the primary
+    replika mati          an unreachable replica is skipped, the other one serves
+    least_latency         every read goes to the replica with the lowest heartbeat round trip
+
+--configured runs the first three against real replication; allow the
+replicas a few heartbeats (--wait) to apply the write.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet
+from fleet_summary import load_fleet_stats
+from storage import ReplicatedBackend, SQLiteBackend
+
+SESSION = {"session_id": "check-replicas", "user_id": "U001"}
+OTHER = {"session_id": "check-replicas-other", "user_id": "U001"}
+
+
+def replicate(primary_path, replica_paths):
+    # full copy of the primary into every replica file
+    source = sqlite3.connect(primary_path)
+    try:
+        for path in replica_paths:
+            target = sqlite3.connect(path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+
+
+def reads(backend):
+    return backend.stats["primary_reads"], list(backend.stats["replica_reads"])
+
+
+def car_status(session, car_id):
+    with rental_system.connect_read(session) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status FROM mobil_rental WHERE car_id=%s", (car_id,))
+        return cursor.fetchone()[0]
+
+
+def report_reads(session, n):
+    # the statistics menu's read, n times
+    for _ in range(n):
+        with rental_system.connect_read(session) as conn:
+            load_fleet_stats(conn)
+
+
+def pick_available_car():
+    with rental_system.connect_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT car_id FROM mobil_rental WHERE status='Tersedia' ORDER BY car_id LIMIT 1")
+        return cursor.fetchone()[0]
+
+
+class Checks:
+    def __init__(self):
+        self.failures = 0
+
+    def __call__(self, name, passed, detail=""):
+        print(f"{'ok' if passed else 'GAGAL':<6} {name:<20} {detail}")
+        self.failures += not passed
+
+
+def check_routing(check, backend, sync):
+    """The three checks that also hold on real replication; sync() must bring the replicas up to date."""
+    sync()
+    before = reads(backend)
+    report_reads(OTHER, 2 * len(backend.replicas))
+    after = reads(backend)
+    spread = [b - a for a, b in zip(before[1], after[1])]
+    check("laporan di replika", after[0] == before[0] and all(spread),
+          f"primary {after[0] - before[0]}, per replika {spread}")
+
+    car_id = pick_available_car()
+    with rental_system.connect_db() as conn:
+        rental_system.rent_car(conn, car_id, 2, SESSION)
+    try:
+        before = reads(backend)
+        own = car_status(SESSION, car_id)
+        after = reads(backend)
+        check("read-your-writes", own == "Dirental" and after[0] == before[0] + 1,
+              f"{car_id} terbaca {own} dari {'primary' if after[0] > before[0] else 'replika'}; "
+              f"sesi lain melihat {car_status(OTHER, car_id)}")
+        sync()
+        before = reads(backend)
+        own = car_status(SESSION, car_id)
+        after = reads(backend)
+        check("replika menyusul", own == "Dirental" and after[0] == before[0],
+              f"{car_id} terbaca {own} dari {'primary' if after[0] > before[0] else 'replika'}")
+    finally:
+        with rental_system.connect_db() as conn:
+            rental_system.return_car(conn, car_id, SESSION)
+
+
+def run_local(args, check):
+    tmp = tempfile.mkdtemp(prefix="rental_replicas_")
+    primary_path = os.path.join(tmp, "primary.sqlite3")
+    replica_paths = [os.path.join(tmp, f"replica{i}.sqlite3") for i in (1, 2)]
+    rental_system.set_backend(build_sqlite_fleet(args.cars, primary_path))
+    rental_system.init_schema()
+    replicate(primary_path, replica_paths)
+
+    def make_backend(paths, policy="round_robin"):
+        # heartbeat only when check_replicas() is called, so each check controls the timing
+        return ReplicatedBackend(SQLiteBackend(primary_path, pool_config={"size": 4}),
+                                 [SQLiteBackend(p, read_only=True) for p in paths],
+                                 policy=policy, max_lag=args.max_lag, heartbeat_interval=3600)
+
+    def sync():
+        backend.check_replicas()
+        replicate(primary_path, replica_paths)
+        backend.check_replicas()
+
+    backend = make_backend(replica_paths)
+    rental_system.set_backend(backend)
+    print(backend.describe())
+    check_routing(check, backend, sync)
+
+    sync()
+    time.sleep(args.max_lag * 1.5)
+    lags = backend.check_replicas()
+    before = reads(backend)
+    report_reads(OTHER, 3)
+    after = reads(backend)
+    check("lag -> primary", after[0] == before[0] + 3 and after[1] == before[1],
+          f"lag {', '.join(f'{lag:.2f} s' for lag in lags)} > {args.max_lag:g} s")
+
+    backend = make_backend([os.path.join(tmp, "hilang.sqlite3"), replica_paths[1]])
+    rental_system.set_backend(backend)
+    sync()
+    report_reads(OTHER, 4)
+    check("replika mati", backend.stats["replica_reads"] == [0, 4] and backend.stats["primary_reads"] == 0,
+          f"per replika {backend.stats['replica_reads']}, primary {backend.stats['primary_reads']}")
+
+    backend = make_backend(replica_paths, "least_latency")
+    rental_system.set_backend(backend)
+    sync()
+    latencies = [status["latency_ms"] for status in backend.replica_status()]
+    fastest = latencies.index(min(latencies))
+    report_reads(OTHER, 4)
+    check("least_latency", backend.stats["replica_reads"][fastest] == 4,
+          f"per replika {backend.stats['replica_reads']}, tercepat replika {fastest + 1}")
+    rental_system.set_backend(None)
+
+
+def run_configured(args, check):
+    rental_system.init_schema()
+    backend = rental_system.get_backend()
+    if not isinstance(backend, ReplicatedBackend):
+        raise SystemExit("Tidak ada replika dikonfigurasi (DB_CONFIG['replicas'] / RENTAL_SQLITE_REPLICAS).")
+    print(backend.describe())
+
+    def sync():
+        # real replication: wait until every replica has a stamp taken after now
+        deadline = time.time() + args.wait
+        mark = time.time()
+        while time.time() < deadline:
+            backend.check_replicas()
+            if all((status["beat"] or 0) > mark for status in backend.replica_status()):
+                return
+            time.sleep(0.2)
+
+    check_routing(check, backend, sync)
+    for status in rental_system.replica_status():
+        print(f"       {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=20000, help="ukuran fleet sintetis")
+    parser.add_argument("--max-lag", type=float, default=0.5, help="detik lag maksimum replika (lokal)")
+    parser.add_argument("--configured", action="store_true", help="pakai database dan replika yang dikonfigurasi")
+    parser.add_argument("--wait", type=float, default=10.0, help="detik menunggu replikasi (--configured)")
+    args = parser.parse_args()
+
+    check = Checks()
+    if args.configured:
+        run_configured(args, check)
+    else:
+        run_local(args, check)
+    print(f"{check.failures} pemeriksaan gagal.")
+    if check.failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
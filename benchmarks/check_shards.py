@@ -0,0 +1,323 @@
+"""Multi-branch check: three local SQLite branches against one combined database.
+
+    python -m benchmarks.check_shards --cars 20000
+
+Builds three branch fleets (M..., MB..., MS...) and a reference database holding
+all of them, then checks that the sharded reads give what the single database
+gives, and how they behave when a branch is slow or down. Every check prints ok
+or GAGAL, and the script exits with status 1 if any failed:
+
+    halaman           keyset pages, every filter, anchor and direction, from the databases and the snapshots
+    cari / statistik  search scores, fleet statistics, chart data and the exported car list
+    routing           a rent of an MB car lands in the MB database, a new car gets this branch's prefix
+    undo/redo         the session's history across branches, newest first
+    cabang lambat     a branch past its timeout is left out and named, the others answer within it
+    cabang mati       a branch that is down is left out and named; none up -> ShardsUnavailableError
+    paralel           with the same latency per branch, gather costs about one branch, not all of them
+"""
+import argparse
+import csv
+import dataclasses
+import math
+import os
+import random
+import tempfile
+import time
+
+import rental_system
+from benchmarks.synthetic import build_sqlite_fleet, car_id_for, insert_fleet
+from fleet_shards import Shard, ShardSet, ShardsUnavailableError
+from fleet_summary import load_fleet_partial
+from storage import SQLiteBackend
+
+SESSION = {"session_id": "check-shards", "user_id": "U001"}
+POOL = {"size": 4, "timeout": 30}
+# name, car prefix, seed, share of --cars
+BRANCHES = [("Pusat", "M", 1, 0.5), ("Bandung", "MB", 2, 0.3), ("Surabaya", "MS", 3, 0.2)]
+KEYWORDS = ["avanza", "toyota", "suv", "a", "tidak-ada"]
+
+
+class Checks:
+    def __init__(self):
+        self.failures = 0
+
+    def __call__(self, name, passed, detail=""):
+        print(f"{'ok' if passed else 'GAGAL':<6} {name:<18} {detail}")
+        self.failures += not passed
+
+
+class FlakyBranch:
+    """A branch database behind a slow link (every checkout waits delay s first) or one that is down."""
+
+    def __init__(self, backend, delay=0.0, down=False):
+        self.backend = backend
+        self.delay = delay
+        self.down = down
+
+    def connection(self):
+        time.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("cabang tidak dapat dihubungi")
+        return self.backend.connection()
+
+    def read_connection(self, session=None):
+        return self.connection()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def shard_set(paths, timeout=5.0, wrap=None):
+    # fresh backends on the branch files; wrap(name, backend) may put a FlakyBranch in front
+    shards = []
+    for (name, prefix, _, _), path in zip(BRANCHES, paths):
+        backend = SQLiteBackend(path, seed_file=None, pool_config=POOL)
+        if wrap:
+            backend = wrap(name, backend)
+        shards.append(Shard(name, prefix, backend, timeout, home=not shards))
+    return ShardSet(shards)
+
+
+def approx_equal(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(approx_equal(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(approx_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def page_cases(types, counts, rng, samples):
+    anchors = [None, "", "M", "MB", "MZ", "Z"]
+    for _, prefix, _, _ in BRANCHES:
+        anchors += [car_id_for(rng.randint(1, counts[prefix] + 2), prefix) for _ in range(samples)]
+    for filters in [None, {"status": "Tersedia"}, {"status": "Dirental"}] + [{"car_type": t} for t in types]:
+        for anchor in anchors:
+            for direction in ("next", "prev", "jump"):
+                for page_size in (1, 20):
+                    yield filters, anchor, direction, page_size
+
+
+def read_pages(cases):
+    pages = []
+    for filters, anchor, direction, page_size in cases:
+        df, more, errors = rental_system.car_page(filters, anchor, direction, page_size)
+        pages.append((df, more, errors))
+    return pages
+
+
+def compare_pages(cases, reference, pages):
+    mismatches = 0
+    for case, (a, more_a, _), (b, more_b, errors) in zip(cases, reference, pages):
+        if errors or more_a != more_b or not a.equals(b):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"   beda: {case} {errors or ''}")
+    return mismatches
+
+
+def search_results():
+    return {k: rental_system.search_fleet(k)[0] for k in KEYWORDS}
+
+
+def export_rows(tmp, name):
+    path = os.path.join(tmp, f"{name}.csv")
+    report = rental_system.export_all(rental_system.fleet_stats()[0], path)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = sorted(tuple(r) for r in csv.reader(f))
+    return rows, report
+
+
+def wait_snapshots():
+    rental_system.SNAPSHOT_CONFIG["enabled"] = True
+    for shard in rental_system.get_shards().shards:
+        rental_system.get_snapshot(shard).wait_loaded()
+
+
+def tick():
+    # event times have second resolution: the next action goes into the next second
+    time.sleep(1.02 - time.time() % 1)
+
+
+def check_routing(check):
+    shards = rental_system.get_shards()
+    bandung = shards.by_name("Bandung")
+    with bandung.backend.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT car_id FROM mobil_rental WHERE status='Tersedia' ORDER BY car_id LIMIT 1")
+        car_id = cursor.fetchone()[0]
+    with rental_system.connect_car(car_id) as conn:
+        rental_system.rent_car(conn, car_id, 2, SESSION)
+    status = {}
+    for shard in shards.shards:
+        with shard.backend.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status FROM mobil_rental WHERE car_id=%s", (car_id,))
+            row = cursor.fetchone()
+            status[shard.name] = row[0] if row else None
+    seen = rental_system.car_page(None, car_id, "jump", 1)[0]
+    check("routing sewa", status == {"Pusat": None, "Bandung": "Dirental", "Surabaya": None}
+          and seen["status"].iloc[0] == "Dirental", f"{car_id} di {status}")
+    with rental_system.connect_car(car_id) as conn:
+        rental_system.return_car(conn, car_id, SESSION)
+
+    with rental_system.connect_db() as conn:
+        added = rental_system.create_car(conn, "Toyota Avanza", "MPV", 300000, SESSION)
+    home = shards.shard_for(added["car_id"]).home
+    check("routing baru", home and added["car_id"].startswith("M") and added["car_id"][1:].isdigit(),
+          f"{added['car_id']} di {shards.shard_for(added['car_id']).name}")
+    return added
+
+
+def check_undo(check):
+    shards = rental_system.get_shards()
+    picks = {}
+    for name in ("Bandung", "Pusat"):
+        with shards.by_name(name).backend.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT car_id FROM mobil_rental WHERE status='Tersedia' ORDER BY car_id DESC LIMIT 1")
+            picks[name] = cursor.fetchone()[0]
+    session = {"session_id": "check-shards-undo", "user_id": "U001"}
+    order = []
+    for name in ("Bandung", "Pusat"):
+        tick()
+        with rental_system.connect_car(picks[name]) as conn:
+            rental_system.rent_car(conn, picks[name], 1, session)
+    for action in ("undo", "undo", "redo", "redo"):
+        tick()
+        event, _ = rental_system.session_event(session, action)
+        order.append(f"{action} {event['car_id']}" if event else f"{action} -")
+        if event:
+            with rental_system.connect_car(event["car_id"]) as conn:
+                rental_system.revert_event(conn, session, event, action)
+    expected = [f"undo {picks['Pusat']}", f"undo {picks['Bandung']}", f"redo {picks['Bandung']}",
+                f"redo {picks['Pusat']}"]
+    check("undo/redo", order == expected, ", ".join(order))
+    for name in ("Bandung", "Pusat"):
+        with rental_system.connect_car(picks[name]) as conn:
+            rental_system.return_car(conn, picks[name], session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=20000, help="mobil di semua cabang bersama")
+    parser.add_argument("--samples", type=int, default=4, help="anchor acak per cabang saat membandingkan halaman")
+    parser.add_argument("--latency", type=float, default=0.1, help="detik latensi per cabang untuk uji paralel")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    check = Checks()
+    tmp = tempfile.mkdtemp(prefix="rental_shards_")
+    rental_system.SNAPSHOT_CONFIG.update(enabled=False, ttl=0.2)
+
+    print(f"Menyiapkan {len(BRANCHES)} cabang, {args.cars:,} mobil ...")
+    counts = {prefix: max(1, int(args.cars * share)) for _, prefix, _, share in BRANCHES}
+    paths = [os.path.join(tmp, f"{name.lower()}.sqlite3") for name, _, _, _ in BRANCHES]
+    reference = SQLiteBackend(os.path.join(tmp, "gabungan.sqlite3"), seed_file=None, pool_config=POOL)
+    with reference.connection() as conn:
+        for (_, prefix, seed, _), path in zip(BRANCHES, paths):
+            build_sqlite_fleet(counts[prefix], path, seed, prefix, POOL).close()
+            insert_fleet(conn, counts[prefix], seed, prefix=prefix)
+
+    # ---- the combined database: what the answers must be ----
+    rental_system.set_backend(reference)
+    rental_system.init_schema()
+    types = rental_system.fleet_car_types()[0]
+    cases = list(page_cases(types, counts, rng, args.samples))
+    ref_pages = read_pages(cases)
+    ref_search = search_results()
+    ref_stats = rental_system.fleet_stats()[0]
+    ref_charts = rental_system.fleet_chart_specs()[0]
+    ref_rows, _ = export_rows(tmp, "gabungan")
+
+    # ---- three branches ----
+    rental_system.set_shards(shard_set(paths))
+    rental_system.init_schema()
+    pages = read_pages(cases)
+    mismatches = compare_pages(cases, ref_pages, pages)
+    check("halaman", not mismatches, f"{len(cases)} halaman, {mismatches} beda")
+    search = search_results()
+    same_search = all([c["score"] for c in search[k]] == [c["score"] for c in ref_search[k]] and
+                      (len(ref_search[k]) >= rental_system.SEARCH_LIMIT or
+                       {c["car_id"] for c in search[k]} == {c["car_id"] for c in ref_search[k]}) for k in KEYWORDS)
+    check("cari", same_search, ", ".join(f"{k}: {len(search[k])}" for k in KEYWORDS))
+    stats, errors = rental_system.fleet_stats()
+    check("statistik", not errors and approx_equal(dataclasses.asdict(stats), dataclasses.asdict(ref_stats)),
+          f"{stats.total:,} mobil, {stats.rented:,} dirental")
+    charts, errors = rental_system.fleet_chart_specs()
+    check("grafik", not errors and approx_equal(charts, ref_charts), f"{len(charts)} grafik")
+    rows, report = export_rows(tmp, "cabang")
+    check("ekspor", rows == ref_rows and not report.missing, f"{report.rows:,} baris, {len(report.paths)} file")
+
+    wait_snapshots()
+    mismatches = compare_pages(cases, ref_pages, read_pages(cases))
+    check("halaman snapshot", not mismatches, f"{len(cases)} halaman, {mismatches} beda")
+    charts, errors = rental_system.fleet_chart_specs()
+    check("grafik snapshot", not errors and approx_equal(charts, ref_charts), f"{len(charts)} grafik")
+
+    added = check_routing(check)
+    seen = rental_system.car_page(None, added["car_id"], "jump", 1)[0]
+    check("snapshot patch", seen["car_id"].iloc[0] == added["car_id"], "mobil baru langsung terlihat")
+    check_undo(check)
+
+    # ---- a slow branch and a dead one ----
+    rental_system.SNAPSHOT_CONFIG["enabled"] = False
+    rental_system.set_shards(shard_set(
+        paths, timeout=0.3, wrap=lambda name, b: FlakyBranch(b, delay=2.0) if name == "Surabaya" else b))
+    started = time.perf_counter()
+    df, _, errors = rental_system.car_page(None, "MR", "jump", 20)
+    elapsed = time.perf_counter() - started
+    check("cabang lambat", list(errors) == ["Surabaya"] and elapsed < 1.0 and not df["car_id"].str.startswith("MS").any(),
+          f"{elapsed:.2f} s, tanpa {', '.join(errors)} ({errors.get('Surabaya')})")
+    started = time.perf_counter()
+    _, report = export_rows(tmp, "lambat")
+    elapsed = time.perf_counter() - started
+    expected = sum(v for k, v in counts.items() if k != "MS") + 1
+    check("ekspor lambat", list(report.missing) == ["Surabaya"] and report.rows == expected,
+          f"{report.rows:,} baris dalam {elapsed:.2f} s, tanpa {', '.join(report.missing)}")
+
+    rental_system.set_shards(shard_set(
+        paths, wrap=lambda name, b: FlakyBranch(b, down=True) if name == "Bandung" else b))
+    stats, errors = rental_system.fleet_stats()
+    expected = sum(v for k, v in counts.items() if k != "MB") + 1
+    check("cabang mati", list(errors) == ["Bandung"] and stats.total == expected,
+          f"{stats.total:,} mobil, tanpa Bandung ({errors.get('Bandung')})")
+    rental_system.set_shards(shard_set(paths, wrap=lambda name, b: FlakyBranch(b, down=True)))
+    try:
+        rental_system.fleet_stats()
+        check("semua mati", False, "tidak ada error")
+    except ShardsUnavailableError as e:
+        check("semua mati", True, str(e)[:90])
+
+    # ---- parallel vs one branch after another ----
+    rental_system.set_shards(shard_set(paths, wrap=lambda name, b: FlakyBranch(b, delay=args.latency)))
+    shards = rental_system.get_shards()
+    rental_system.fleet_stats()  # pool threads and connections warm
+
+    def sequential():
+        for shard in shards.shards:
+            with shard.backend.connection() as conn:
+                load_fleet_partial(conn)
+
+    started = time.perf_counter()
+    sequential()
+    one_by_one = time.perf_counter() - started
+    started = time.perf_counter()
+    rental_system.fleet_stats()
+    parallel = time.perf_counter() - started
+    check("paralel", parallel < one_by_one * 0.7,
+          f"statistik {parallel * 1000:.0f} ms paralel vs {one_by_one * 1000:.0f} ms berurutan "
+          f"({args.latency * 1000:.0f} ms latensi per cabang)")
+    rental_system.print_table(rental_system.branch_status())
+    rental_system.set_backend(None)
+
+    print(f"{check.failures} pemeriksaan gagal.")
+    if check.failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
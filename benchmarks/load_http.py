@@ -0,0 +1,171 @@
+"""Load generator for http_service against an embedded SQLite database.
+
+    python -m benchmarks.load_http --clients 64 --requests 20000 --cars 10000
+
+Starts the service in a background thread on a temporary SQLite file filled
+with synthetic cars, then runs `clients` keep-alive connections that each log
+in as a customer and send a mix of search, listing, availability and
+rent/return requests. Reports requests per second and p50/p99 latency per
+endpoint as seen by the client, next to the server's own /metrics.
+
+Afterwards it sends out-of-range page sizes and limits to the public
+endpoints. Each must get a 400, not a full-fleet answer or a 500; the script
+exits with status 1 if one does not.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import rental_system
+from benchmarks.synthetic import car_id_for, insert_fleet
+from http_service import RentalService, percentile
+from storage import SQLiteBackend
+
+KEYWORDS = ["toyota", "suv", "avanza", "honda", "cx", "sedan", "xpander", "jazz"]
+BAD_PARAMS = [
+    "/cars?page_size=-2",
+    "/cars?page_size=0",
+    "/cars?page_size=abc",
+    "/cars/available?end={end}&limit=-1",
+    "/cars/search?q=toy&limit=-3",
+]
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.token = None
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        headers = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+        if self.token:
+            headers += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write((headers + "\r\n").encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+
+def next_request(rng, n_cars):
+    roll = rng.random()
+    if roll < 0.4:
+        return "search", "GET", f"/cars/search?q={rng.choice(KEYWORDS)}&status=Tersedia", None
+    if roll < 0.6:
+        return "list", "GET", f"/cars?status=Tersedia&after={car_id_for(rng.randint(1, n_cars))}", None
+    if roll < 0.7:
+        start = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 30))
+        return "available", "GET", f"/cars/available?start={start}&end={start + datetime.timedelta(days=3)}&type=SUV", None
+    car_id = car_id_for(rng.randint(1, min(n_cars, 200)))
+    if roll < 0.85:
+        return "rent", "POST", "/rent", {"car_id": car_id, "days": rng.randint(1, 7)}
+    return "return", "POST", "/return", {"car_id": car_id}
+
+
+async def run_client(port, n_requests, n_cars, seed, samples, statuses):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    client = Client(reader, writer)
+    _, login = await client.request("POST", "/login", {"email": "customer@rental.com", "password": "admin"})
+    client.token = login["token"]
+    for _ in range(n_requests):
+        name, method, path, body = next_request(rng, n_cars)
+        started = time.perf_counter()
+        status, _ = await client.request(method, path, body)
+        samples[name].append(time.perf_counter() - started)
+        statuses[status] += 1
+    writer.close()
+
+
+def start_service(workers):
+    loop = asyncio.new_event_loop()
+    service = RentalService(workers)
+    ready = loop.create_future()
+    thread = threading.Thread(target=lambda: loop.run_until_complete(service.serve("127.0.0.1", 0, ready)), daemon=True)
+    thread.start()
+    while not ready.done():
+        time.sleep(0.01)
+    return service, ready.result()
+
+
+async def drive(args, port):
+    samples, statuses = defaultdict(list), defaultdict(int)
+    per_client = max(1, args.requests // args.clients)
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(port, per_client, args.cars, args.seed + i, samples, statuses)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    client = Client(reader, writer)
+    _, server_metrics = await client.request("GET", "/metrics")
+    end = datetime.date.today() + datetime.timedelta(days=3)
+    rejected = []
+    for path in BAD_PARAMS:
+        path = path.format(end=end)
+        status, payload = await client.request("GET", path)
+        rejected.append((path, status, payload))
+    writer.close()
+    return samples, statuses, elapsed, server_metrics, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000, help="total requests over all clients")
+    parser.add_argument("--cars", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8, help="DB threads = connection pool size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "http_load.sqlite3")
+    backend = SQLiteBackend(path, seed_file=None, pool_config={"size": args.workers, "timeout": 60})
+    with backend.connection() as conn:
+        insert_fleet(conn, args.cars)
+    rental_system.set_backend(backend)
+    rental_system.init_schema()
+    service, port = start_service(args.workers)
+
+    samples, statuses, elapsed, server_metrics, rejected = asyncio.run(drive(args, port))
+    total = sum(len(v) for v in samples.values())
+    print(f"{total:,} request oleh {args.clients} klien dalam {elapsed:.2f} s = {total / elapsed:,.0f} req/detik "
+          f"({args.cars:,} mobil, {args.workers} thread DB)")
+    print(f"status: {dict(sorted(statuses.items()))}")
+    print(f"{'endpoint':<10} {'n':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    everything = []
+    for name, values in sorted(samples.items()):
+        ordered = sorted(values)
+        everything.extend(values)
+        print(f"{name:<10} {len(values):>7} {percentile(ordered, 0.5) * 1000:>9.2f} {percentile(ordered, 0.99) * 1000:>9.2f}")
+    everything.sort()
+    print(f"{'semua':<10} {total:>7} {percentile(everything, 0.5) * 1000:>9.2f} {percentile(everything, 0.99) * 1000:>9.2f}")
+    print("server /metrics:")
+    for route, m in sorted(server_metrics["routes"].items()):
+        print(f"  {route:<22} n={m['count']:<7} p50={m['p50_ms']:.2f} ms p99={m['p99_ms']:.2f} ms error={m['errors']}")
+    service.close()
+    failures = 0
+    for path, status, payload in rejected:
+        passed = status == 400
+        failures += not passed
+        print(f"{'ok' if passed else 'GAGAL':<6} {path:<40} {status} {(payload or {}).get('error', '')}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Benchmark suite over synthetic fleets: time and peak memory per user-facing operation.
+
+    python -m benchmarks.suite --sizes 10000 100000 --output results.json
+    python -m benchmarks.suite --sizes 10000 100000 --baseline results.json
+    python -m benchmarks.suite --compare old.json new.json
+
+For each fleet size a seeded dataset (cars, users, rental history) is generated
+into a SQLite file, migrated to the current schema, and every scenario runs
+`--repeat` times for timing plus once under tracemalloc for peak Python memory
+(SQLite's own page cache is not counted). Scenarios drive the same functions as
+the menus, without the prompts:
+
+    show_all_cars      first page, 20 pages forward, a jump and a page back
+    filter_cars        distinct types, then 5 pages per type and per status
+    search             customer search for a fixed keyword set
+    rent_return        --ops rent + return pairs on random cars
+    show_statistics    load_fleet_stats
+    export_excel       export_fleet to xlsx incl. the full_data sheet(s)
+    visualization_data the data behind the five charts, without drawing
+
+With --data-dir the generated files are kept and reused by later runs with the
+same size/seed/history (rent_return adds a few rentals to them each run).
+Results are written as JSON; --baseline or --compare flags every time or memory
+figure that grew by more than --threshold, and exits with status 1 if any did.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import rental_system
+from benchmarks.synthetic import build_dataset, car_id_for
+from car_search import search_cars
+from charts import chart_specs
+from fleet_export import export_fleet
+from fleet_summary import load_fleet_stats
+from storage import SQLiteBackend
+
+KEYWORDS = ["toyota", "suv", "avanza", "honda", "cx", "sedan", "xpander", "zzz"]
+
+
+# ---------- Scenarios ----------
+def show_all_cars(ctx):
+    df, has_more = rental_system.fetch_car_page()
+    for _ in range(20):
+        if not has_more:
+            break
+        df, has_more = rental_system.fetch_car_page(anchor=df['car_id'].iloc[-1])
+    df, _ = rental_system.fetch_car_page(anchor=car_id_for(ctx["cars"] // 2), direction="jump")
+    rental_system.fetch_car_page(anchor=df['car_id'].iloc[0], direction="prev")
+
+
+def filter_cars(ctx):
+    types = rental_system.fetch_all_to_df("SELECT DISTINCT car_type FROM mobil_rental")['car_type'].tolist()
+    filters = [("car_type = %s", (t,)) for t in types] + [("status = %s", (s,)) for s in ("Tersedia", "Dirental")]
+    for where, params in filters:
+        df, has_more = rental_system.fetch_car_page(where, params)
+        for _ in range(4):
+            if not has_more:
+                break
+            df, has_more = rental_system.fetch_car_page(where, params, df['car_id'].iloc[-1])
+
+
+def search(ctx):
+    with rental_system.connect_db() as conn:
+        for keyword in KEYWORDS:
+            search_cars(conn, keyword, "Tersedia", limit=rental_system.SEARCH_LIMIT)
+            search_cars(conn, keyword, limit=rental_system.SEARCH_LIMIT)
+
+
+def rent_return(ctx):
+    rng = ctx["rng"]
+    session = {"session_id": "bench-suite", "user_id": "U002"}
+    with rental_system.connect_db() as conn:
+        for _ in range(ctx["ops"]):
+            car_id = car_id_for(rng.randint(1, ctx["cars"]))
+            try:
+                rental_system.rent_car(conn, car_id, rng.randint(1, 7), session)
+                rental_system.return_car(conn, car_id, session)
+            except rental_system.RentalConflictError:
+                pass
+
+
+def show_statistics(ctx):
+    with rental_system.connect_db() as conn:
+        load_fleet_stats(conn)
+
+
+def export_excel(ctx):
+    with rental_system.connect_db() as conn:
+        export_fleet(load_fleet_stats(conn), os.path.join(ctx["tmp"], "stats.xlsx"), conn)
+
+
+def visualization_data(ctx):
+    with rental_system.connect_db() as conn:
+        chart_specs(conn)
+
+
+# rent_return last: it is the only scenario that changes the data
+SCENARIOS = {
+    "show_all_cars": show_all_cars,
+    "filter_cars": filter_cars,
+    "search": search,
+    "show_statistics": show_statistics,
+    "export_excel": export_excel,
+    "visualization_data": visualization_data,
+    "rent_return": rent_return,
+}
+
+
+def measure(fn, ctx, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(ctx)
+        times.append(time.perf_counter() - started)
+    # separate run for memory: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    try:
+        fn(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(times), 6), "median_seconds": round(statistics.median(times), 6),
+            "peak_mib": round(peak / 2**20, 3), "repeat": repeat}
+
+
+# ---------- Dataset ----------
+def open_dataset(args, size, tmp):
+    directory = args.data_dir or tmp
+    path = os.path.join(directory, f"fleet_{size}_s{args.seed}_h{args.history}.sqlite3")
+    started = time.perf_counter()
+    if os.path.exists(path):
+        backend, counts = SQLiteBackend(path, seed_file=None, pool_config={"size": 4, "timeout": 600}), None
+    else:
+        os.makedirs(directory, exist_ok=True)
+        backend, counts = build_dataset(size, path, args.seed, args.users, args.history)
+    rental_system.set_backend(backend)
+    # also brings files kept in --data-dir by older versions to the current schema
+    rental_system.init_schema()
+    if counts is None:
+        with rental_system.connect_db() as conn:
+            cursor = conn.cursor()
+            counts = {}
+            for key, table in (("cars", "mobil_rental"), ("users", "users"), ("events", "rental_events")):
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[key] = cursor.fetchone()[0]
+    counts["setup_seconds"] = round(time.perf_counter() - started, 3)
+    return backend, counts
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(args):
+    results = {"meta": {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+                        "commit": _git_commit(), "python": platform.python_version(),
+                        "platform": platform.platform(), "sqlite": sqlite3.sqlite_version,
+                        "seed": args.seed, "history": args.history, "repeat": args.repeat, "ops": args.ops},
+               "sizes": {}}
+    tmp = tempfile.mkdtemp(prefix="rental_bench_")
+    try:
+        for size in args.sizes:
+            print(f"== {size:,} mobil", file=sys.stderr)
+            backend, counts = open_dataset(args, size, tmp)
+            print(f"   dataset: {counts['users']:,} user, {counts['events']:,} event, "
+                  f"siap dalam {counts['setup_seconds']:.1f} s", file=sys.stderr)
+            entry = {"dataset": counts, "scenarios": {}}
+            ctx = {"cars": size, "ops": args.ops, "tmp": tmp, "rng": random.Random(args.seed)}
+            for name in args.scenarios:
+                result = measure(SCENARIOS[name], ctx, args.repeat)
+                entry["scenarios"][name] = result
+                print("   " + format_result(name, result), file=sys.stderr)
+            results["sizes"][str(size)] = entry
+            backend.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def format_result(name, result):
+    return (f"{name:<20} {result['seconds'] * 1000:>10.1f} ms (median {result['median_seconds'] * 1000:.1f})"
+            f" {result['peak_mib']:>9.1f} MiB")
+
+
+# ---------- Comparison ----------
+def compare(old, new, threshold, min_seconds=0.005):
+    """Return (rows, regressions); a row is (size, scenario, metric, old, new, ratio, flag)."""
+    rows, regressions = [], 0
+    for size, entry in new["sizes"].items():
+        before = old["sizes"].get(size)
+        if before is None:
+            continue
+        for name, result in entry["scenarios"].items():
+            base = before["scenarios"].get(name)
+            if base is None:
+                continue
+            for metric, floor in (("seconds", min_seconds), ("peak_mib", 0.5)):
+                a, b = base[metric], result[metric]
+                ratio = b / a if a else float("inf")
+                # tiny absolute numbers are mostly noise
+                flag = ""
+                if ratio > 1 + threshold and b - a > floor:
+                    flag = "REGRESI"
+                    regressions += 1
+                elif ratio < 1 - threshold and a - b > floor:
+                    flag = "lebih baik"
+                rows.append((size, name, metric, a, b, ratio, flag))
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, threshold):
+    print(f"{'fleet':>10} {'skenario':<20} {'metrik':<8} {'lama':>10} {'baru':>10} {'rasio':>7}")
+    for size, name, metric, a, b, ratio, flag in rows:
+        unit = 1000 if metric == "seconds" else 1
+        print(f"{int(size):>10,} {name:<20} {'ms' if unit == 1000 else 'MiB':<8} "
+              f"{a * unit:>10.1f} {b * unit:>10.1f} {ratio:>6.2f}x {flag}")
+    print(f"{regressions} regresi (ambang +{threshold:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, help="default: 1 per 10 cars (max 99,997)")
+    parser.add_argument("--history", type=int, default=2, help="rent/return pairs per car in the event log")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ops", type=int, default=200, help="rent+return pairs in rent_return")
+    parser.add_argument("--data-dir", help="keep generated databases here and reuse them")
+    parser.add_argument("--output", help="JSON results file (default bench_<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier results to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="only compare two results files")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative growth flagged as regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+    else:
+        new = run_suite(args)
+        output = args.output or f"bench_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(new, f, indent=2)
+        print(f"Hasil disimpan ke {output}")
+        if not args.baseline:
+            return
+        with open(args.baseline, encoding="utf-8") as f:
+            old = json.load(f)
+    rows, regressions = compare(old, new, args.threshold)
+    print_comparison(rows, regressions, args.threshold)
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import datetime
+
+import numpy as np
+
+from car_catalog import CAR_OPTIONS as CAR_CATALOG
+from event_log import EVENT_DDL
+from storage import SQLiteBackend
+
+PRICE_RANGE = {
+    "Hatchback": (190000, 340000),
+    "MPV": (250000, 400000),
+    "Sedan": (290000, 450000),
+    "SUV": (365000, 625000),
+}
+
+
+def car_id_for(n, prefix="M"):
+    return f"{prefix}{n:03d}"
+
+
+def generate_fleet_rows(n_cars, seed=42, start=1, prefix="M"):
+    rng = np.random.default_rng(seed)
+    models = rng.integers(0, len(CAR_CATALOG), n_cars)
+    rented = rng.random(n_cars) < 0.25
+    days = np.where(rented, rng.integers(1, 15, n_cars), 0)
+    totals = rng.poisson(15, n_cars)
+    unit = rng.random(n_cars)
+    for i in range(n_cars):
+        model, car_type = CAR_CATALOG[models[i]]
+        lo, hi = PRICE_RANGE[car_type]
+        price = float(round((lo + (hi - lo) * unit[i]) / 5000) * 5000)
+        yield (car_id_for(start + i, prefix), model, car_type, price,
+               "Dirental" if rented[i] else "Tersedia", int(days[i]), int(totals[i]))
+
+
+def insert_fleet(conn, n_cars, seed=42, batch_size=50000, prefix="M"):
+    cursor = conn.cursor()
+    batch = []
+    for row in generate_fleet_rows(n_cars, seed, prefix=prefix):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany("INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count) VALUES (%s,%s,%s,%s,%s,%s,%s)", batch)
+            batch = []
+    if batch:
+        cursor.executemany("INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count) VALUES (%s,%s,%s,%s,%s,%s,%s)", batch)
+    conn.commit()
+
+
+def build_sqlite_fleet(n_cars, path=":memory:", seed=42, prefix="M", pool_config=None):
+    # empty schema from rental_db.sql, then n_cars synthetic rows (car IDs prefix001, ...)
+    backend = SQLiteBackend(path, seed_file=None, pool_config=pool_config)
+    with backend.connection() as conn:
+        insert_fleet(conn, n_cars, seed, prefix=prefix)
+    return backend
+
+
+# ---------- Users and rental history ----------
+MAX_USERS = 99997  # user_id is VARCHAR(6): U003 .. U99999
+
+
+def generate_user_rows(n_users, seed=42, start=3):
+    # U001/U002 are the built-in accounts; roughly one manager per 50 users
+    rng = np.random.default_rng(seed + 1)
+    managers = rng.random(n_users) < 0.02
+    for i in range(n_users):
+        num = start + i
+        yield (f"U{num:03d}", f"Pengguna {num}", f"user{num}@bench.rental", "bench",
+               "manager" if managers[i] else "customer")
+
+
+def insert_users(conn, n_users, seed=42, batch_size=50000):
+    cursor = conn.cursor()
+    rows = list(generate_user_rows(min(n_users, MAX_USERS), seed))
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)",
+                           rows[i:i + batch_size])
+    conn.commit()
+    return len(rows)
+
+
+def generate_history_rows(n_cars, pairs_per_car, n_users, seed=42):
+    """Event log rows that replay to exactly the rows generate_fleet_rows produces.
+
+    Per car: a baseline with the count before history, then up to pairs_per_car
+    rent/return pairs (the last rent stays open when the car is Dirental).
+    """
+    rng = np.random.default_rng(seed + 2)
+    base = datetime.datetime.now() - datetime.timedelta(days=365)
+    user_ids = [f"U{n:03d}" for n in range(1, n_users + 3)]
+    for n, (car_id, model, car_type, price, status, days, total) in enumerate(generate_fleet_rows(n_cars, seed), 1):
+        rented = status == "Dirental"
+        pairs = min(pairs_per_car, total)
+        if rented and pairs == 0 and total > 0:
+            pairs = 1
+        t = total - pairs
+        when = base + datetime.timedelta(seconds=int(rng.integers(0, 86400)))
+        stamp = when.strftime("%Y-%m-%d %H:%M:%S")
+        if pairs == 0:
+            yield (stamp, None, None, "baseline", car_id, model, car_type, price, None, None, None, status, days, total)
+            continue
+        yield (stamp, None, None, "baseline", car_id, model, car_type, price, None, None, None, "Tersedia", 0, t)
+        for j in range(pairs):
+            user = user_ids[int(rng.integers(0, len(user_ids)))]
+            session = f"bench-{user}"
+            rent_days = days if rented and j == pairs - 1 else int(rng.integers(1, 15))
+            when += datetime.timedelta(days=int(rng.integers(1, 30)))
+            yield (when.strftime("%Y-%m-%d %H:%M:%S"), session, user, "rent", car_id, model, car_type, price,
+                   "Tersedia", 0, t, "Dirental", rent_days, t + 1)
+            t += 1
+            if rented and j == pairs - 1:
+                break
+            when += datetime.timedelta(days=rent_days)
+            yield (when.strftime("%Y-%m-%d %H:%M:%S"), session, user, "return", car_id, model, car_type, price,
+                   "Dirental", rent_days, t, "Tersedia", 0, t)
+
+
+HISTORY_SQL = """
+    INSERT INTO rental_events (created_at, session_id, user_id, action, car_id, car_model, car_type, price_per_day,
+                               prev_status, prev_days, prev_total, new_status, new_days, new_total)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+
+def insert_history(conn, n_cars, pairs_per_car, n_users, seed=42, batch_size=50000):
+    # creates rental_events before ensure_event_log runs, so no second baseline is written
+    cursor = conn.cursor()
+    cursor.execute(EVENT_DDL)
+    batch, count = [], 0
+    for row in generate_history_rows(n_cars, pairs_per_car, n_users, seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(HISTORY_SQL, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(HISTORY_SQL, batch)
+        count += len(batch)
+    conn.commit()
+    return count
+
+
+def build_dataset(n_cars, path, seed=42, n_users=None, history=2):
+    """SQLite file with n_cars cars, users and rental history, support tables built.
+
+    Everything derives from `seed`, so the same arguments give the same data.
+    Returns (backend, counts).
+    """
+    if n_users is None:
+        n_users = max(10, n_cars // 10)
+    backend = SQLiteBackend(path, seed_file=None, pool_config={"size": 4, "timeout": 600})
+    with backend.connection() as conn:
+        insert_fleet(conn, n_cars, seed)
+        n_users = insert_users(conn, n_users, seed)
+        events = insert_history(conn, n_cars, history, n_users, seed)
+    return backend, {"cars": n_cars, "users": n_users, "events": events}
@@ -0,0 +1,41 @@
+# Models and types a manager may add (used by add_car and the bulk importer)
+CAR_OPTIONS = [
+    ("Toyota Avanza", "MPV"),
+    ("Daihatsu Xenia", "MPV"),
+    ("Honda Brio", "Hatchback"),
+    ("Suzuki Ertiga", "MPV"),
+    ("Mitsubishi Pajero", "SUV"),
+    ("Toyota Fortuner", "SUV"),
+    ("Honda Jazz", "Hatchback"),
+    ("Toyota Yaris", "Hatchback"),
+    ("Honda HRV", "SUV"),
+    ("Toyota Innova", "MPV"),
+    ("Honda Civic", "Sedan"),
+    ("Toyota Camry", "Sedan"),
+    ("Mazda CX-5", "SUV"),
+    ("Nissan X-Trail", "SUV"),
+    ("Mitsubishi Xpander", "MPV"),
+]
+MIN_PRICE = 0
+# mobil_rental columns shown to users, in table order (everything but the surrogate id)
+CAR_FIELDS = ["car_id", "car_model", "car_type", "price_per_day", "status",
+              "current_rental_days", "total_rental_count"]
+
+_MODEL_TYPES = {model.lower(): (model, tipe) for model, tipe in CAR_OPTIONS}
+
+
+def validate_car(car_model, car_type, price_per_day):
+    """Return (car_model, car_type, price) normalized to the catalog, or raise ValueError."""
+    entry = _MODEL_TYPES.get(str(car_model or "").strip().lower())
+    if entry is None:
+        raise ValueError(f"model '{car_model}' tidak ada di daftar mobil")
+    model, tipe = entry
+    if car_type not in (None, "") and str(car_type).strip().lower() != tipe.lower():
+        raise ValueError(f"jenis '{car_type}' tidak cocok untuk {model} (seharusnya {tipe})")
+    try:
+        price = float(price_per_day)
+    except (TypeError, ValueError):
+        raise ValueError(f"harga '{price_per_day}' bukan angka desimal")
+    if price != price or price < MIN_PRICE:
+        raise ValueError(f"harga harus >= {MIN_PRICE}")
+    return model, tipe, price
@@ -0,0 +1,177 @@
+"""Trigram search over car_model and car_type for the customer "Cari mobil" feature.
+
+The fleet has many cars but few distinct model/type strings, so the index maps
+trigrams to *terms* (search_trigrams) and keeps a car count per term
+(search_terms). A query resolves the keyword to matching terms through the
+trigram index, ranks them, and then pulls cars per term through the
+mobil_rental(car_model) / (car_type) indexes with a LIMIT, so latency does not
+grow with the fleet. write_car and the bulk importer keep the index in sync.
+"""
+import re
+
+from car_catalog import CAR_FIELDS
+from storage import create_index, upsert_add
+
+SEARCH_FIELDS = ["car_model", "car_type"]
+DEFAULT_LIMIT = 50
+
+SEARCH_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_terms (
+        field VARCHAR(10) NOT NULL,
+        term VARCHAR(100) NOT NULL,
+        car_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (field, term)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS search_trigrams (
+        gram VARCHAR(3) NOT NULL,
+        field VARCHAR(10) NOT NULL,
+        term VARCHAR(100) NOT NULL,
+        PRIMARY KEY (gram, field, term)
+    )
+    """,
+]
+# car_type lookups use the (car_type, car_id) index from migrations.CAR_INDEXES
+SEARCH_INDEXES = [
+    ("idx_mobil_model", "mobil_rental", "car_model"),
+]
+
+
+def trigrams(text):
+    # ^ and $ mark the word boundaries so 1-2 character terms still get grams
+    padded = f"^{text.lower()}$"
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+# ---------- Maintenance ----------
+def _adjust_term(cursor, field, term, delta):
+    upsert_add(cursor, "search_terms", {"field": field, "term": term}, {"car_count": delta})
+    if delta > 0:
+        # no-op unless the term is new (or came back)
+        cursor.executemany("INSERT IGNORE INTO search_trigrams (gram, field, term) VALUES (%s,%s,%s)",
+                           [(g, field, term) for g in trigrams(term)])
+        return
+    # the term row is locked by the upsert until commit, so no other writer counts it up meanwhile
+    cursor.execute("DELETE FROM search_terms WHERE field=%s AND term=%s AND car_count <= 0", (field, term))
+    if cursor.rowcount:
+        cursor.execute("DELETE FROM search_trigrams WHERE field=%s AND term=%s", (field, term))
+
+
+def _apply_deltas(conn, deltas):
+    cursor = conn.cursor()
+    for (field, term), delta in deltas.items():
+        if delta:
+            _adjust_term(cursor, field, term, delta)
+
+
+def apply_search_change(conn, old, new):
+    """Keep the index in sync with one row change (insert: old=None, delete: new=None)."""
+    deltas = {}
+    for car, sign in ((old, -1), (new, +1)):
+        if car is None:
+            continue
+        for field in SEARCH_FIELDS:
+            key = (field, car[field])
+            deltas[key] = deltas.get(key, 0) + sign
+    _apply_deltas(conn, deltas)
+
+
+def apply_search_inserts(conn, cars):
+    deltas = {}
+    for car in cars:
+        for field in SEARCH_FIELDS:
+            key = (field, car[field])
+            deltas[key] = deltas.get(key, 0) + 1
+    _apply_deltas(conn, deltas)
+
+
+def rebuild_search_index(conn):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM search_terms")
+    cursor.execute("DELETE FROM search_trigrams")
+    for field in SEARCH_FIELDS:
+        cursor.execute(f"SELECT {field}, COUNT(*) FROM mobil_rental GROUP BY {field}")
+        for term, count in cursor.fetchall():
+            _adjust_term(conn.cursor(), field, term, count)
+    cursor.execute("DELETE FROM search_terms WHERE field='_built'")
+    cursor.execute("INSERT INTO search_terms (field, term, car_count) VALUES ('_built', '', 0)")
+    conn.commit()
+
+
+def ensure_search_index(conn):
+    cursor = conn.cursor()
+    for ddl in SEARCH_DDL:
+        cursor.execute(ddl)
+    conn.commit()
+    for name, table, columns in SEARCH_INDEXES:
+        create_index(conn, name, table, columns)
+    cursor.execute("SELECT COUNT(*) FROM search_terms WHERE field='_built'")
+    if cursor.fetchone()[0] == 0:
+        rebuild_search_index(conn)
+
+
+# ---------- Query ----------
+def _match_terms(cursor, keyword):
+    if len(keyword) >= 3:
+        grams = [g for g in trigrams(keyword) if "^" not in g and "$" not in g]
+        placeholders = ",".join(["%s"] * len(grams))
+        cursor.execute(f"SELECT field, term FROM search_trigrams WHERE gram IN ({placeholders}) "
+                       f"GROUP BY field, term HAVING COUNT(DISTINCT gram) = %s", tuple(grams) + (len(grams),))
+    else:
+        # too short for a full trigram: any gram containing it (the gram table is small)
+        cursor.execute("SELECT DISTINCT field, term FROM search_trigrams WHERE gram LIKE %s",
+                       ("%" + keyword + "%",))
+    # the trigram test can yield false positives; confirm the substring
+    return [(f, t) for f, t in cursor.fetchall() if f in SEARCH_FIELDS and keyword in t.lower()]
+
+
+def _term_rank(field, term, keyword):
+    text = term.lower()
+    if text == keyword:
+        quality = 3
+    elif text.startswith(keyword) or any(w.startswith(keyword) for w in re.split(r"[\s-]+", text)):
+        quality = 2
+    else:
+        quality = 1
+    # a model hit is more specific than a type hit
+    return quality + (3 if field == "car_model" else 0)
+
+
+def search_cars(conn, keyword, status=None, min_price=None, max_price=None, limit=DEFAULT_LIMIT):
+    """Return up to `limit` car rows (dicts, best match first) whose model or type contains keyword."""
+    keyword = re.sub(r"[%_^$]", "", (keyword or "").strip().lower())
+    if not keyword:
+        return []
+    cursor = conn.cursor()
+    terms = sorted(_match_terms(cursor, keyword),
+                   key=lambda ft: (-_term_rank(ft[0], ft[1], keyword), ft[1]))
+    filters, params = "", ()
+    if status:
+        filters += " AND status = %s"
+        params += (status,)
+    if min_price is not None:
+        filters += " AND price_per_day >= %s"
+        params += (min_price,)
+    if max_price is not None:
+        filters += " AND price_per_day <= %s"
+        params += (max_price,)
+
+    results, seen = [], set()
+    dict_cursor = conn.cursor(dictionary=True)
+    for field, term in terms:
+        remaining = limit - len(results)
+        if remaining <= 0:
+            break
+        dict_cursor.execute(f"SELECT {', '.join(CAR_FIELDS)} FROM mobil_rental WHERE {field} = %s{filters} LIMIT %s",
+                            (term,) + params + (remaining + len(seen),))
+        for car in dict_cursor.fetchall():
+            if car["car_id"] in seen:
+                continue
+            seen.add(car["car_id"])
+            car["score"] = _term_rank(field, term, keyword)
+            results.append(car)
+            if len(results) >= limit:
+                break
+    return results
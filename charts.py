@@ -0,0 +1,227 @@
+"""Fleet charts from aggregates, rendered headless to PNG/SVG.
+
+    python charts.py --out charts --format svg --workers 4
+
+The five charts of the visualization menu are described as small plain-data
+specs: charts 1-4 from the fleet summary tables, the price vs rental-count
+scatter from one GROUP BY over (price bin, rental count). No chart reads
+mobil_rental row by row.
+
+render_charts() draws the specs with the Agg backend in a process pool and
+skips every chart whose spec, format and renderer version hash to the same
+value as the file already in the output directory (recorded in
+.chart_cache.json there), so an unchanged fleet costs no drawing at all.
+The interactive menu draws from the same specs via draw_chart(), built by
+snapshot_chart_specs() from the in-process fleet snapshot when it is loaded.
+With several branches every branch's chart_data is gathered and added up by
+merge_chart_data() before the specs are built.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fleet_summary import TOP_N, load_fleet_stats, load_price_histogram
+
+CHART_NAMES = ["status_pie", "type_bar", "price_hist", "top_rented", "price_vs_rentals"]
+FORMATS = ("png", "svg")
+# bump when draw_chart changes, so cached images are redrawn
+RENDER_VERSION = 1
+SCATTER_PRICE_BIN = 5000
+CACHE_FILE = ".chart_cache.json"
+
+
+# ---------- Specs from aggregates ----------
+def chart_data(conn):
+    """The aggregates behind the five charts (build_specs arguments), or None when the fleet is empty."""
+    stats = load_fleet_stats(conn)
+    if stats.total == 0:
+        return None
+    price_hist = load_price_histogram(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT ROUND(price_per_day / %s) * %s, total_rental_count, COUNT(*) FROM mobil_rental "
+                   "GROUP BY 1, 2 ORDER BY 1, 2", (SCATTER_PRICE_BIN, SCATTER_PRICE_BIN))
+    points = [(float(p), int(r), int(c)) for p, r, c in cursor.fetchall()]
+    type_counts = {t.car_type: t.count for t in sorted(stats.by_type, key=lambda t: t.car_type)}
+    return {"status_counts": stats.status_counts, "type_counts": type_counts, "price_hist": price_hist,
+            "top_rented": stats.top_rented, "points": points}
+
+
+def snapshot_chart_data(snapshot):
+    """chart_data from an in-memory FleetSnapshot instead of the database."""
+    return snapshot.chart_data(SCATTER_PRICE_BIN, TOP_N)
+
+
+def _add_counts(target, pairs):
+    for key, count in pairs:
+        target[key] = target.get(key, 0) + count
+    return target
+
+
+def merge_chart_data(parts):
+    """chart_data of several databases (branches) added up; None when all of them are empty."""
+    parts = [p for p in parts if p]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+    status_counts, type_counts, price_hist, points = {}, {}, {}, {}
+    for part in parts:
+        _add_counts(status_counts, part["status_counts"].items())
+        _add_counts(type_counts, part["type_counts"].items())
+        _add_counts(price_hist, part["price_hist"])
+        _add_counts(points, (((p, r), c) for p, r, c in part["points"]))
+    top = sorted((car for part in parts for car in part["top_rented"]),
+                 key=lambda car: (-car["total_rental_count"], car["car_id"]))[:TOP_N]
+    return {"status_counts": status_counts, "type_counts": dict(sorted(type_counts.items())),
+            "price_hist": sorted(price_hist.items()), "top_rented": top,
+            "points": [(p, r, c) for (p, r), c in sorted(points.items())]}
+
+
+def specs_from(data):
+    return build_specs(**data) if data else {}
+
+
+def chart_specs(conn):
+    """Return {name: spec} for the five charts, or {} when the fleet is empty."""
+    return specs_from(chart_data(conn))
+
+
+def snapshot_chart_specs(snapshot):
+    """chart_specs from an in-memory FleetSnapshot instead of the database."""
+    return specs_from(snapshot_chart_data(snapshot))
+
+
+def build_specs(status_counts, type_counts, price_hist, top_rented, points):
+    return {
+        "status_pie": {"kind": "pie", "title": "Perbandingan Mobil Tersedia vs Dirental",
+                       "labels": list(status_counts), "values": list(status_counts.values())},
+        "type_bar": {"kind": "bar", "title": "Jumlah Mobil per Jenis", "xlabel": "Jenis Mobil", "ylabel": "Jumlah",
+                     "labels": list(type_counts), "values": list(type_counts.values())},
+        "price_hist": {"kind": "hist", "title": "Distribusi Harga Sewa Mobil", "xlabel": "Harga Sewa per Hari",
+                       "ylabel": "Frekuensi", "bins": 12,
+                       "values": [v for v, _ in price_hist], "weights": [c for _, c in price_hist]},
+        "top_rented": {"kind": "bar", "title": "Top 5 Mobil Paling Sering Dirental (CarID - Model)",
+                       "xlabel": "Mobil (ID - Model)", "ylabel": "Jumlah Rental", "rotate": True,
+                       "labels": [f"{c['car_id']} - {c['car_model']}" for c in top_rented],
+                       "values": [c["total_rental_count"] for c in top_rented]},
+        "price_vs_rentals": {"kind": "scatter", "title": "Harga vs Total Rental Count",
+                             "xlabel": f"Harga per Hari (kelompok Rp {SCATTER_PRICE_BIN:,})",
+                             "ylabel": "Total Rental Count",
+                             "x": [p for p, _, _ in points], "y": [r for _, r, _ in points],
+                             "counts": [c for _, _, c in points]},
+    }
+
+
+# ---------- Drawing ----------
+def draw_chart(ax, spec):
+    from matplotlib.ticker import MaxNLocator
+
+    kind = spec["kind"]
+    if kind == "pie":
+        ax.pie(spec["values"], labels=spec["labels"], autopct='%1.1f%%')
+    elif kind == "bar":
+        ax.bar(spec["labels"], spec["values"])
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        if spec.get("rotate"):
+            ax.tick_params(axis="x", labelrotation=45)
+            for label in ax.get_xticklabels():
+                label.set_horizontalalignment("right")
+    elif kind == "hist":
+        ax.hist(spec["values"], bins=spec["bins"], weights=spec["weights"])
+    elif kind == "scatter":
+        # one marker per (price bin, count) pair, area grows with the number of cars there
+        largest = max(spec["counts"])
+        ax.scatter(spec["x"], spec["y"], s=[12 + 100 * (c / largest) ** 0.5 for c in spec["counts"]], alpha=0.6)
+    else:
+        raise ValueError(f"jenis grafik tidak dikenal: {kind}")
+    ax.set_title(spec["title"])
+    ax.set_xlabel(spec.get("xlabel", ""))
+    ax.set_ylabel(spec.get("ylabel", ""))
+
+
+def render_chart(spec, path):
+    # runs in a worker process; Agg needs no display
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    try:
+        draw_chart(ax, spec)
+        fig.tight_layout()
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def spec_hash(spec, fmt):
+    payload = json.dumps({"spec": spec, "format": fmt, "version": RENDER_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _load_cache(out_dir):
+    try:
+        with open(os.path.join(out_dir, CACHE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_charts(specs, out_dir, fmt="png", workers=None):
+    """Write every spec to out_dir/<name>.<fmt>; returns [(name, path, "cache" | "baru")]."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format harus salah satu dari {', '.join(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    cache = _load_cache(out_dir)
+    results, todo = [], {}
+    for name, spec in specs.items():
+        filename = f"{name}.{fmt}"
+        path = os.path.join(out_dir, filename)
+        digest = spec_hash(spec, fmt)
+        if cache.get(filename) == digest and os.path.exists(path):
+            results.append((name, path, "cache"))
+        else:
+            todo[name] = (spec, path, filename, digest)
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(render_chart, spec, path) for name, (spec, path, _, _) in todo.items()}
+            for future in futures.values():
+                future.result()
+    else:
+        for spec, path, _, _ in todo.values():
+            render_chart(spec, path)
+    for name, (_, path, filename, digest) in todo.items():
+        cache[filename] = digest
+        results.append((name, path, "baru"))
+    with open(os.path.join(out_dir, CACHE_FILE), "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    results.sort(key=lambda r: CHART_NAMES.index(r[0]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render grafik fleet ke file PNG/SVG (tanpa layar)")
+    parser.add_argument("--out", default="charts", help="folder output (default charts)")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--workers", type=int, help="jumlah proses render (default: jumlah CPU)")
+    args = parser.parse_args()
+
+    import rental_system
+    rental_system.init_schema()
+    started = time.perf_counter()
+    specs, errors = rental_system.fleet_chart_specs()
+    rental_system.report_unavailable(errors)
+    if not specs:
+        print("Tidak ada data untuk divisualisasikan.")
+        return
+    results = render_charts(specs, args.out, args.format, args.workers)
+    for name, path, source in results:
+        print(f"{name:<18} {path} ({source})")
+    print(f"{len(results)} grafik dalam {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+def default_health_check(conn):
+    # mysql.connector pings the server inside is_connected()
+    checker = getattr(conn, "is_connected", None)
+    if checker is None:
+        return True
+    try:
+        return checker()
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    """Fixed-size pool of database connections.
+
+    Connections are created lazily up to `size`, checked with `health_check`
+    on every checkout and handed out through the `connection()` context manager.
+    """
+
+    def __init__(self, factory, size=5, timeout=10.0, health_check=default_health_check):
+        if size < 1:
+            raise ValueError("Pool size harus >= 1")
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "new_connections": 0,
+            "health_failures": 0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _new_connection(self):
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        self._count("new_connections")
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if self._closed:
+            raise PoolTimeoutError("Pool sudah ditutup.")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                conn = self._new_connection()
+            else:
+                self._count("waits")
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._count("timeouts")
+                    raise PoolTimeoutError(
+                        f"Tidak ada koneksi database yang tersedia dalam {self.timeout} detik."
+                    )
+                finally:
+                    self._count("wait_seconds", time.perf_counter() - started)
+        if not self.health_check(conn):
+            self._count("health_failures")
+            self._discard(conn)
+            with self._lock:
+                self._created += 1
+            conn = self._new_connection()
+        self._count("checkouts")
+        return conn
+
+    def release(self, conn):
+        try:
+            # end any transaction left open so the next user gets a fresh snapshot
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.stats)
+            data["size"] = self.size
+            data["open_connections"] = self._created
+        data["idle_connections"] = self._idle.qsize()
+        return data
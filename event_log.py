@@ -0,0 +1,260 @@
+"""Append-only rental event log.
+
+Every add, rent, return, undo and redo is written to rental_events with the
+car's state before and after the change. The event row is inserted in the same
+transaction as the change it describes, so it shares that commit (no extra
+flush per event) and can never disagree with mobil_rental; bulk writers insert
+their events with one executemany per batch.
+
+Undo/redo stacks are derived per login session from the log, to any depth.
+The counters in mobil_rental can be rebuilt by replaying the log:
+
+    python event_log.py --verify     # replay and report cars whose state differs
+    python event_log.py --rebuild    # replay and write the replayed state back
+"""
+import argparse
+import datetime
+
+from storage import create_index
+
+DO_ACTIONS = ("add", "rent", "return")
+STATE_FIELDS = ("status", "current_rental_days", "total_rental_count")
+
+EVENT_DDL = """
+    CREATE TABLE IF NOT EXISTS rental_events (
+        event_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        created_at DATETIME NOT NULL,
+        session_id VARCHAR(40),
+        user_id VARCHAR(6),
+        action VARCHAR(10) NOT NULL,
+        car_id VARCHAR(10) NOT NULL,
+        ref_event_id BIGINT,
+        car_model VARCHAR(100),
+        car_type VARCHAR(50),
+        price_per_day DECIMAL(12,2),
+        prev_status VARCHAR(10),
+        prev_days INT,
+        prev_total INT,
+        new_status VARCHAR(10),
+        new_days INT,
+        new_total INT
+    )
+"""
+EVENT_INDEXES = [
+    ("idx_events_car", "rental_events", "car_id, event_id"),
+    ("idx_events_session", "rental_events", "session_id, event_id"),
+]
+EVENT_COLUMNS = ["event_id", "created_at", "session_id", "user_id", "action", "car_id", "ref_event_id",
+                 "car_model", "car_type", "price_per_day", "prev_status", "prev_days", "prev_total",
+                 "new_status", "new_days", "new_total"]
+INSERT_EVENT_SQL = """
+    INSERT INTO rental_events (created_at, session_id, user_id, action, car_id, ref_event_id, car_model, car_type,
+                               price_per_day, prev_status, prev_days, prev_total, new_status, new_days, new_total)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _event_row(session, action, old, new, ref_event_id=None, created_at=None):
+    car = new or old
+    prev = old or {}
+    cur = new or {}
+    return (created_at or _now(),
+            (session or {}).get("session_id"), (session or {}).get("user_id"),
+            action, car["car_id"], ref_event_id,
+            car["car_model"], car["car_type"], float(car["price_per_day"]),
+            prev.get("status"), prev.get("current_rental_days"), prev.get("total_rental_count"),
+            cur.get("status"), cur.get("current_rental_days"), cur.get("total_rental_count"))
+
+
+def log_event(conn, session, action, old, new, ref_event_id=None):
+    """Append one event inside the caller's transaction; returns its event_id."""
+    cursor = conn.cursor()
+    cursor.execute(INSERT_EVENT_SQL, _event_row(session, action, old, new, ref_event_id))
+    return cursor.lastrowid
+
+
+def log_events(conn, session, action, changes):
+    # one executemany for a whole batch of (old, new) pairs
+    created_at = _now()
+    conn.cursor().executemany(INSERT_EVENT_SQL, [_event_row(session, action, old, new, created_at=created_at)
+                                                 for old, new in changes])
+
+
+def ensure_event_log(conn):
+    cursor = conn.cursor()
+    cursor.execute(EVENT_DDL)
+    conn.commit()
+    for name, table, columns in EVENT_INDEXES:
+        create_index(conn, name, table, columns)
+    cursor.execute("SELECT event_id FROM rental_events LIMIT 1")
+    if cursor.fetchone() is None:
+        # baseline: the state of every car when logging started, so replay has a starting point
+        cursor.execute("""
+            INSERT INTO rental_events (created_at, session_id, user_id, action, car_id, car_model, car_type,
+                                       price_per_day, new_status, new_days, new_total)
+            SELECT %s, NULL, NULL, 'baseline', car_id, car_model, car_type, price_per_day,
+                   status, current_rental_days, total_rental_count
+            FROM mobil_rental
+        """, (_now(),))
+        conn.commit()
+
+
+# ---------- Per-session undo / redo ----------
+def fetch_event(conn, event_id):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(EVENT_COLUMNS)} FROM rental_events WHERE event_id=%s", (event_id,))
+    row = cursor.fetchone()
+    return None if row is None else dict(zip(EVENT_COLUMNS, row))
+
+
+def session_log(conn, session_id):
+    """(event_id, created_at, action, ref_event_id) of one session's events, oldest first."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT event_id, created_at, action, ref_event_id FROM rental_events WHERE session_id=%s "
+                   "ORDER BY event_id", (session_id,))
+    return cursor.fetchall()
+
+
+def session_stacks(conn, session_id):
+    """Return (undo_stack, redo_stack) of event_ids for one session, most recent last."""
+    return build_stacks((event_id, action, ref) for event_id, _, action, ref in session_log(conn, session_id))
+
+
+def build_stacks(entries):
+    # entries: (key, action, ref_key) oldest first; keys only need to be comparable with ==,
+    # so the merged logs of several branches can use (branch, event_id)
+    undo_stack, redo_stack = [], []
+    for event_id, action, ref in entries:
+        if action in DO_ACTIONS:
+            undo_stack.append(event_id)
+            redo_stack.clear()
+        elif action == "undo" and ref in undo_stack:
+            undo_stack.remove(ref)
+            redo_stack.append(ref)
+        elif action == "redo" and ref in redo_stack:
+            redo_stack.remove(ref)
+            undo_stack.append(ref)
+    return undo_stack, redo_stack
+
+
+def state_before(event):
+    if event["prev_status"] is None:
+        return None
+    return {"car_id": event["car_id"], "car_model": event["car_model"], "car_type": event["car_type"],
+            "price_per_day": event["price_per_day"], "status": event["prev_status"],
+            "current_rental_days": event["prev_days"], "total_rental_count": event["prev_total"]}
+
+
+def state_after(event):
+    if event["new_status"] is None:
+        return None
+    return {"car_id": event["car_id"], "car_model": event["car_model"], "car_type": event["car_type"],
+            "price_per_day": event["price_per_day"], "status": event["new_status"],
+            "current_rental_days": event["new_days"], "total_rental_count": event["new_total"]}
+
+
+def state_matches(car, state):
+    # compare only the fields rent/return/undo change
+    if car is None or state is None:
+        return car is None and state is None
+    return all(car[f] == state[f] for f in STATE_FIELDS)
+
+
+def describe_event(event):
+    labels = {"add": "tambah mobil", "rent": "rental", "return": "pengembalian"}
+    return f"{labels.get(event['action'], event['action'])} {event['car_id']} ({event['created_at']})"
+
+
+# ---------- Replay ----------
+def replay_state(conn, chunk_size=10000):
+    """Replay the whole log in order; returns {car_id: row dict, or None if the car was deleted}."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT car_id, car_model, car_type, price_per_day, new_status, new_days, new_total "
+                   "FROM rental_events ORDER BY event_id")
+    state = {}
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for car_id, model, car_type, price, status, days, total in rows:
+            state[car_id] = None if status is None else {
+                "car_model": model, "car_type": car_type, "price_per_day": price,
+                "status": status, "current_rental_days": days, "total_rental_count": total}
+    return state
+
+
+def _counters(row):
+    return None if row is None else {f: row[f] for f in STATE_FIELDS}
+
+
+def replay_drift(conn):
+    """Return [(car_id, table state, replayed state)] for every car where the two differ."""
+    replayed = replay_state(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT car_id, status, current_rental_days, total_rental_count FROM mobil_rental")
+    actual = {r[0]: dict(zip(STATE_FIELDS, r[1:])) for r in cursor.fetchall()}
+    drift = []
+    for car_id in sorted(set(replayed) | set(actual)):
+        if car_id not in replayed:
+            # cars inserted outside the program (e.g. by hand) have no history to replay
+            drift.append((car_id, actual[car_id], "tidak ada di log"))
+        elif _counters(replayed[car_id]) != actual.get(car_id):
+            drift.append((car_id, actual.get(car_id), _counters(replayed[car_id])))
+    return drift, replayed
+
+
+def rebuild_counters(conn):
+    """Bring mobil_rental in line with the replayed log; returns the number of corrected cars."""
+    drift, replayed = replay_drift(conn)
+    cursor = conn.cursor()
+    fixed = 0
+    for car_id, actual, _ in drift:
+        if car_id not in replayed:
+            continue
+        row = replayed[car_id]
+        if row is None:
+            cursor.execute("DELETE FROM mobil_rental WHERE car_id=%s", (car_id,))
+        elif actual is None:
+            cursor.execute("INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count) "
+                           "VALUES (%s,%s,%s,%s,%s,%s,%s)",
+                           (car_id, row["car_model"], row["car_type"], row["price_per_day"], row["status"],
+                            row["current_rental_days"], row["total_rental_count"]))
+        else:
+            cursor.execute("UPDATE mobil_rental SET status=%s, current_rental_days=%s, total_rental_count=%s WHERE car_id=%s",
+                           (row["status"], row["current_rental_days"], row["total_rental_count"], car_id))
+        fixed += 1
+    conn.commit()
+    return fixed
+
+
+def main():
+    import rental_system
+    from car_search import rebuild_search_index
+    from fleet_summary import rebuild_fleet_summary
+
+    parser = argparse.ArgumentParser(description="Replay log event rental")
+    parser.add_argument("--rebuild", action="store_true", help="tulis ulang counter mobil_rental dari hasil replay")
+    parser.add_argument("--verify", action="store_true", help="bandingkan hasil replay dengan mobil_rental")
+    args = parser.parse_args()
+    rental_system.init_schema()
+    with rental_system.connect_db() as conn:
+        if args.rebuild:
+            fixed = rebuild_counters(conn)
+            rebuild_fleet_summary(conn)
+            rebuild_search_index(conn)
+            print(f"{fixed} mobil diperbarui dari hasil replay log.")
+        drift, _ = replay_drift(conn)
+        if drift:
+            print(f"{len(drift)} mobil berbeda dari hasil replay log:")
+            for car_id, actual, expected in drift[:20]:
+                print(f"- {car_id}: tabel {actual}, log {expected}")
+            raise SystemExit(1)
+        print("mobil_rental konsisten dengan log event.")
+
+
+if __name__ == "__main__":
+    main()
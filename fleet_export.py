@@ -0,0 +1,273 @@
+"""Streaming export of the fleet statistics and the full car list.
+
+    python fleet_export.py rental_stats.xlsx
+    python fleet_export.py fleet.csv --chunk-size 50000
+    python fleet_export.py fleet.parquet            (needs pyarrow)
+
+Rows go from one cursor straight to the file, chunk_size at a time, so memory
+stays flat whatever the fleet size:
+
+  xlsx     openpyxl write-only workbook: summary sheets, then full_data; past
+           Excel's 1,048,576 rows per sheet it continues in full_data_2, ...
+  csv      full data in the file itself, split into name_part2.csv, ... at the
+           same row limit so every part still opens in Excel; the summary
+           tables go next to it as name_summary.csv, name_by_type.csv, ...
+  parquet  one file, one row group per chunk; summary tables as with csv
+
+With several branches export_sharded() streams every branch's cars into the
+same file as they arrive (fleet_shards.ShardStream); a branch that fails or
+times out is left out and named in the report's missing.
+
+ExportJob runs an export on its own pooled connection in a background thread,
+so the menu stays usable while a large fleet is written.
+"""
+import argparse
+import csv
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+FORMATS = ("xlsx", "csv", "parquet")
+EXCEL_MAX_ROWS = 1048576
+EXPORT_CHUNK_SIZE = 10000
+FULL_DATA_COLUMNS = ["price_per_day", "car_type", "status", "total_rental_count", "car_id", "car_model"]
+FULL_DATA_QUERY = f"SELECT {', '.join(FULL_DATA_COLUMNS)} FROM mobil_rental"
+
+
+@dataclass
+class ExportReport:
+    paths: list = field(default_factory=list)
+    rows: int = 0
+    elapsed: float = 0.0
+    missing: dict = field(default_factory=dict)  # branch -> why its cars are not in the file
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def format_for(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"Format file harus salah satu dari: {', '.join('.' + f for f in FORMATS)}")
+    return ext
+
+
+def summary_tables(stats):
+    # (name, header, rows) for the small statistics tables, same sheets as before
+    tables = [("summary", stats.summary_frame()), ("by_type", stats.by_type_frame())]
+    if stats.top_rented:
+        tables.append(("top5", stats.top_rented_frame()))
+    if stats.long_rentals:
+        tables.append(("long_rentals", stats.long_rentals_frame()))
+    return [(name, list(frame.columns), [list(r) for r in frame.itertuples(index=False)]) for name, frame in tables]
+
+
+def iter_chunks(conn, chunk_size):
+    cursor = conn.cursor()
+    cursor.execute(FULL_DATA_QUERY)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+def _part_path(path, part):
+    if part == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_part{part}{ext}"
+
+
+# ---------- Writers ----------
+def _write_xlsx(stats, path, chunks, max_rows, report, progress):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for name, header, rows in summary_tables(stats):
+        ws = wb.create_sheet(name)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+    part, ws, used = 0, None, max_rows
+    for rows in chunks:
+        for row in rows:
+            if used >= max_rows:
+                part += 1
+                ws = wb.create_sheet("full_data" if part == 1 else f"full_data_{part}")
+                ws.append(FULL_DATA_COLUMNS)
+                used = 1
+            ws.append(list(row))
+            used += 1
+        report.rows += len(rows)
+        if progress:
+            progress(report)
+    if ws is None:
+        wb.create_sheet("full_data").append(FULL_DATA_COLUMNS)
+    wb.save(path)
+    report.paths.append(path)
+
+
+def _write_summary_csvs(stats, path, report):
+    stem = os.path.splitext(path)[0]
+    for name, header, rows in summary_tables(stats):
+        table_path = f"{stem}_{name}.csv"
+        with open(table_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        report.paths.append(table_path)
+
+
+def _write_csv(stats, path, chunks, max_rows, report, progress):
+    part, f, writer, used = 0, None, None, max_rows
+    try:
+        for rows in chunks:
+            for row in rows:
+                if used >= max_rows:
+                    if f is not None:
+                        f.close()
+                    part += 1
+                    f = open(_part_path(path, part), "w", newline="", encoding="utf-8")
+                    report.paths.append(f.name)
+                    writer = csv.writer(f)
+                    writer.writerow(FULL_DATA_COLUMNS)
+                    used = 1
+                writer.writerow(row)
+                used += 1
+            report.rows += len(rows)
+            if progress:
+                progress(report)
+        if f is None:
+            with open(path, "w", newline="", encoding="utf-8") as empty:
+                csv.writer(empty).writerow(FULL_DATA_COLUMNS)
+            report.paths.append(path)
+    finally:
+        if f is not None:
+            f.close()
+    _write_summary_csvs(stats, path, report)
+
+
+def _write_parquet(stats, path, chunks, max_rows, report, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Ekspor Parquet membutuhkan paket pyarrow (pip install pyarrow).") from None
+
+    schema = pa.schema([("price_per_day", pa.float64()), ("car_type", pa.string()), ("status", pa.string()),
+                        ("total_rental_count", pa.int64()), ("car_id", pa.string()), ("car_model", pa.string())])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            columns[0] = [float(v) for v in columns[0]]
+            writer.write_table(pa.Table.from_arrays([pa.array(c, type=t) for c, t in zip(columns, schema.types)],
+                                                    schema=schema))
+            report.rows += len(rows)
+            if progress:
+                progress(report)
+    report.paths.append(path)
+    _write_summary_csvs(stats, path, report)
+
+
+WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def write_export(stats, path, chunks, fmt=None, max_rows=EXCEL_MAX_ROWS, progress=None):
+    """Write the statistics tables and the rows of chunks to path; returns an ExportReport."""
+    fmt = fmt or format_for(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Format harus salah satu dari: {', '.join(FORMATS)}")
+    report = ExportReport()
+    started = time.perf_counter()
+    WRITERS[fmt](stats, path, chunks, max_rows, report, progress)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def export_fleet(stats, path, conn, fmt=None, chunk_size=EXPORT_CHUNK_SIZE, max_rows=EXCEL_MAX_ROWS, progress=None):
+    """Write the statistics tables and every car of one database to path; returns an ExportReport."""
+    return write_export(stats, path, iter_chunks(conn, chunk_size), fmt, max_rows, progress)
+
+
+def export_sharded(stats, path, shards, fmt=None, chunk_size=EXPORT_CHUNK_SIZE, max_rows=EXCEL_MAX_ROWS,
+                   progress=None, connect=None):
+    """export_fleet over every branch of a fleet_shards.ShardSet; connect(shard) gives the branch's
+    connection (default: one from its pool)."""
+    connect = connect or (lambda shard: shard.backend.connection())
+
+    def shard_chunks(shard):
+        with connect(shard) as conn:
+            yield from iter_chunks(conn, chunk_size)
+
+    chunks = shards.stream(shard_chunks)
+    report = write_export(stats, path, chunks, fmt, max_rows, progress)
+    report.missing = dict(chunks.errors)
+    return report
+
+
+# ---------- Background jobs ----------
+class ExportJob:
+    """export(progress), e.g. export_sharded, in a daemon thread; poll .done / .report / .error."""
+
+    def __init__(self, path, export):
+        self.path = path
+        self.report = ExportReport()
+        self.error = None
+        self.done = False
+        self._export = export
+        self._thread = threading.Thread(target=self._run, name=f"export-{os.path.basename(path)}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.report = self._export(self._progress)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+    def _progress(self, report):
+        self.report = report
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+
+def describe_report(report):
+    files = ", ".join(report.paths)
+    text = (f"{report.rows:,} mobil diekspor dalam {report.elapsed:.2f} s "
+            f"({report.rows_per_second:,.0f} baris/detik) ke {files}")
+    if report.missing:
+        text += "\nTIDAK LENGKAP, tanpa mobil cabang " + "; ".join(f"{b} ({why})" for b, why in report.missing.items())
+    return text
+
+
+def main():
+    import rental_system
+    from fleet_shards import ShardsUnavailableError
+
+    parser = argparse.ArgumentParser(description="Ekspor statistik dan seluruh data mobil (xlsx/csv/parquet)")
+    parser.add_argument("path", help="file tujuan .xlsx, .csv atau .parquet")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--max-rows", type=int, default=EXCEL_MAX_ROWS, help="baris per sheet / bagian file")
+    args = parser.parse_args()
+    rental_system.init_schema()
+    try:
+        stats, errors = rental_system.fleet_stats()
+        rental_system.report_unavailable(errors)
+        report = rental_system.export_all(stats, args.path, chunk_size=args.chunk_size, max_rows=args.max_rows,
+                                          progress=lambda r: print(f"\r{r.rows:,} baris ...", end="", flush=True))
+    except (ValueError, ShardsUnavailableError) as e:
+        raise SystemExit(str(e))
+    print("\r" + describe_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Bulk fleet import from CSV or Excel.
+
+    python fleet_import.py armada_cabang.csv --batch-size 1000
+
+Rows are streamed from the file, validated against the same catalog and price
+rules as add_car (car_catalog.validate_car) and inserted in batches, each batch in
+its own transaction together with its ID block, fleet-summary, search-index and
+event-log update.
+Required columns: car_model, price_per_day (car_type is optional, checked if present).
+"""
+import argparse
+import csv
+import os
+import time
+from dataclasses import dataclass, field
+
+from car_catalog import validate_car
+from car_search import apply_search_inserts
+from event_log import log_events
+from fleet_summary import apply_car_inserts
+from id_sequence import allocate_ids
+
+INSERT_CAR_SQL = """
+    INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count)
+    VALUES (%s,%s,%s,%s,%s,%s,%s)
+"""
+# .xls (Excel 97-2003) is not readable by openpyxl; it has to be saved as .xlsx or .csv first
+SOURCE_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    rejected: list = field(default_factory=list)  # (row number, reason, raw row)
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+
+def _normalize_header(name):
+    return str(name or "").strip().lower()
+
+
+def check_source(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SOURCE_EXTENSIONS:
+        raise ValueError(f"Format file {ext or '(tanpa ekstensi)'} tidak didukung. "
+                         f"Gunakan {', '.join(SOURCE_EXTENSIONS)} (simpan ulang file .xls sebagai .xlsx).")
+    return ext
+
+
+def iter_source_rows(path):
+    """Yield (row number, {column: value}) from a CSV or xlsx file without loading it whole."""
+    ext = check_source(path)
+    if ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [_normalize_header(h) for h in next(rows, [])]
+            for i, values in enumerate(rows, start=2):
+                if values is None or all(v is None for v in values):
+                    continue
+                yield i, dict(zip(header, values))
+        finally:
+            wb.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = [_normalize_header(h) for h in next(reader, [])]
+            for i, values in enumerate(reader, start=2):
+                if not any(v.strip() for v in values):
+                    continue
+                yield i, dict(zip(header, values))
+
+
+def _insert_batch(connect, batch, report, session=None, car_prefix="M"):
+    with connect() as conn:
+        car_ids = allocate_ids(conn, "car", len(batch), prefix=car_prefix)
+        cars = []
+        for car_id, (_, _, (model, tipe, price)) in zip(car_ids, batch):
+            cars.append({"car_id": car_id, "car_model": model, "car_type": tipe,
+                         "price_per_day": price, "status": "Tersedia",
+                         "current_rental_days": 0, "total_rental_count": 0})
+        try:
+            conn.start_transaction()
+            conn.cursor().executemany(INSERT_CAR_SQL, [
+                (c["car_id"], c["car_model"], c["car_type"], c["price_per_day"], c["status"],
+                 c["current_rental_days"], c["total_rental_count"]) for c in cars])
+            apply_car_inserts(conn, cars)
+            apply_search_inserts(conn, cars)
+            log_events(conn, session, "add", [(None, c) for c in cars])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for row_no, raw, _ in batch:
+                report.rejected.append((row_no, f"batch gagal disimpan: {e}", raw))
+            return
+    report.inserted += len(batch)
+    report.batches += 1
+
+
+def import_fleet(path, connect, batch_size=1000, progress=None, session=None, car_prefix="M"):
+    if batch_size < 1:
+        raise ValueError("batch_size harus >= 1")
+    check_source(path)
+    report = ImportReport()
+    started = time.perf_counter()
+    batch = []
+    for row_no, raw in iter_source_rows(path):
+        try:
+            car = validate_car(raw.get("car_model"), raw.get("car_type"), raw.get("price_per_day"))
+        except ValueError as e:
+            report.rejected.append((row_no, str(e), raw))
+            continue
+        batch.append((row_no, raw, car))
+        if len(batch) >= batch_size:
+            _insert_batch(connect, batch, report, session, car_prefix)
+            batch = []
+            if progress:
+                progress(report)
+    if batch:
+        _insert_batch(connect, batch, report, session, car_prefix)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def write_rejected(report, path):
+    columns = []
+    for _, _, raw in report.rejected:
+        columns.extend(c for c in raw if c not in columns)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["row", "reason"] + columns)
+        for row_no, reason, raw in report.rejected:
+            writer.writerow([row_no, reason] + [raw.get(c, "") for c in columns])
+
+
+def print_report(report, source_path):
+    print(f"\nImpor selesai: {report.inserted} mobil ditambahkan dalam {report.batches} batch, "
+          f"{len(report.rejected)} baris ditolak.")
+    print(f"Waktu: {report.elapsed:.2f} s ({report.rows_per_second:,.0f} baris/detik)")
+    if report.rejected:
+        for row_no, reason, _ in report.rejected[:10]:
+            print(f"- baris {row_no}: {reason}")
+        if len(report.rejected) > 10:
+            print(f"... dan {len(report.rejected) - 10} baris lainnya")
+        rejected_path = os.path.splitext(source_path)[0] + "_rejected.csv"
+        write_rejected(report, rejected_path)
+        print(f"Daftar baris yang ditolak disimpan di {rejected_path}")
+
+
+def main():
+    import rental_system
+
+    parser = argparse.ArgumentParser(description="Impor armada mobil dari CSV/Excel")
+    parser.add_argument("path", help="file .csv, .xlsx atau .xlsm")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    try:
+        check_source(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+    rental_system.init_schema()
+    report = import_fleet(args.path, rental_system.connect_db, args.batch_size,
+                          progress=lambda r: print(f"\r{r.inserted} baris diimpor ...", end=""),
+                          car_prefix=rental_system.BRANCH_CONFIG["car_prefix"])
+    print_report(report, args.path)
+
+
+if __name__ == "__main__":
+    main()
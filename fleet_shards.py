@@ -0,0 +1,387 @@
+"""Multi-branch fleet: one database per branch, queried in parallel.
+
+    python fleet_shards.py        # every branch: reachable?, cars, car IDs outside its prefix
+
+Every branch keeps its own cars in its own rental_db, a shard of the whole
+fleet. A car belongs to the branch whose car_prefix its car_id starts with
+(MB017 -> "MB"), so shard_for() routes rent, return, undo and single-car reads
+to the owning branch without a lookup. The program's own branch is the home
+shard: it holds the users, and new cars get its prefix. An ID with a prefix no
+branch has stays at home.
+
+Fleet-wide reads go to every shard at once (ShardSet.gather). The home shard
+runs in the calling thread, so a connection the caller already holds can be
+reused; the other branches run on a thread pool and are merged here or next
+to the data they merge:
+
+    merge_pages                    keyset pages ordered by car_id: k-way merge, then cut
+    merge_ranked                   search results, best first: k-way merge by score
+    fleet_summary.merge_fleet_partials   statistics from partial aggregates
+    charts.merge_chart_data        chart aggregates
+    ShardSet.stream                export rows, chunk by chunk as they arrive
+
+Every remote branch has a timeout. A branch that fails or does not answer in
+time is left out and named in the result's errors, so a slow branch costs at
+most its timeout and the others still answer. ShardsUnavailableError is raised
+only when no branch answered. With a single database everything runs inline,
+without threads or timeouts, as before.
+"""
+import heapq
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from itertools import islice
+
+from storage import create_backend
+
+SHARD_TIMEOUT = 5.0
+# chunks a remote branch may read ahead of the export writer
+STREAM_DEPTH = 2
+_PREFIX_RE = re.compile(r"^([A-Za-z]*)")
+
+
+class ShardsUnavailableError(Exception):
+    pass
+
+
+@dataclass
+class Shard:
+    name: str
+    car_prefix: str
+    backend: object
+    timeout: float = SHARD_TIMEOUT
+    home: bool = False
+
+
+@dataclass
+class Gathered:
+    results: dict = field(default_factory=dict)  # branch name -> result, in shard order
+    errors: dict = field(default_factory=dict)   # branch name -> why it is missing
+    elapsed: dict = field(default_factory=dict)  # branch name -> seconds, for those that answered
+
+
+def car_prefix(car_id):
+    return _PREFIX_RE.match(str(car_id or "")).group(1).upper()
+
+
+def describe_errors(errors):
+    return "; ".join(f"{name}: {reason}" for name, reason in errors.items())
+
+
+def _failure(e):
+    return f"{type(e).__name__}: {e}"
+
+
+class ShardSet:
+    """The shards of the fleet, home first, and the thread pool that queries them.
+
+    workers bounds the remote queries running at once; by default one per
+    pooled connection of every remote branch, since each query holds one.
+    close() closes the remote branches' backends, not the home one.
+    """
+
+    def __init__(self, shards, workers=None):
+        self.shards = list(shards)
+        if not self.shards or not self.shards[0].home or any(s.home for s in self.shards[1:]):
+            raise ValueError("Shard pertama harus cabang sendiri (home), dan hanya itu.")
+        prefixes = [s.car_prefix.upper() for s in self.shards]
+        if any(not p.isalpha() for p in prefixes) or len(set(prefixes)) != len(prefixes):
+            raise ValueError(f"Prefix Car ID cabang harus huruf dan unik: {', '.join(prefixes)}")
+        self.home = self.shards[0]
+        self._by_prefix = dict(zip(prefixes, self.shards))
+        self._by_name = {s.name: s for s in self.shards}
+        self.workers = workers or sum(s.backend.pool.size for s in self.shards[1:]) or 1
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {s.name: {"queries": 0, "errors": 0, "timeouts": 0, "last_ms": None} for s in self.shards}
+
+    def __len__(self):
+        return len(self.shards)
+
+    def shard_for(self, car_id):
+        return self._by_prefix.get(car_prefix(car_id), self.home)
+
+    def by_name(self, name):
+        return self._by_name[name]
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fleet-shard")
+            return self._executor
+
+    def _record(self, name, seconds=None, error=None, timed_out=False):
+        with self._lock:
+            stats = self.stats[name]
+            stats["queries"] += 1
+            if seconds is not None:
+                stats["last_ms"] = round(seconds * 1000, 3)
+            stats["errors"] += error is not None and not timed_out
+            stats["timeouts"] += timed_out
+
+    @staticmethod
+    def _timed(fn, shard):
+        started = time.perf_counter()
+        result = fn(shard)
+        return result, time.perf_counter() - started
+
+    # ----- scatter-gather -----
+    def gather(self, fn):
+        """Run fn(shard) on every shard at once; returns a Gathered of what answered in time."""
+        gathered = Gathered()
+        if len(self.shards) == 1:
+            # one database: inline, and its errors propagate as they always did
+            gathered.results[self.home.name], seconds = self._timed(fn, self.home)
+            gathered.elapsed[self.home.name] = seconds
+            self._record(self.home.name, seconds)
+            return gathered
+        started = time.perf_counter()
+        futures = {s.name: self._pool().submit(self._timed, fn, s) for s in self.shards[1:]}
+        for shard in self.shards:
+            try:
+                if shard.home:
+                    result, seconds = self._timed(fn, shard)
+                else:
+                    remaining = shard.timeout - (time.perf_counter() - started)
+                    result, seconds = futures[shard.name].result(timeout=max(0.0, remaining))
+            except FutureTimeout:
+                # left running: its connection goes back to the pool when the query ends
+                futures[shard.name].cancel()
+                gathered.errors[shard.name] = f"tidak menjawab dalam {shard.timeout:g} s"
+                self._record(shard.name, error=gathered.errors[shard.name], timed_out=True)
+                continue
+            except Exception as e:
+                gathered.errors[shard.name] = _failure(e)
+                self._record(shard.name, error=gathered.errors[shard.name])
+                continue
+            gathered.results[shard.name] = result
+            gathered.elapsed[shard.name] = seconds
+            self._record(shard.name, seconds)
+        if not gathered.results:
+            raise ShardsUnavailableError(f"Tidak ada cabang yang menjawab ({describe_errors(gathered.errors)})")
+        return gathered
+
+    def stream(self, fn, depth=STREAM_DEPTH):
+        """Iterate the chunks of fn(shard), a generator, over every shard; see ShardStream."""
+        return ShardStream(self, fn, depth)
+
+    def status(self):
+        with self._lock:
+            return [{"branch": s.name, "car_prefix": s.car_prefix, "home": s.home, "backend": s.backend.describe(),
+                     "timeout": s.timeout, **self.stats[s.name]} for s in self.shards]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for shard in self.shards[1:]:
+            shard.backend.close()
+
+
+class ShardStream:
+    """The chunks fn(shard) yields on every shard, as one iterator.
+
+    The home shard is read first, in the consuming thread. Every remote branch
+    reads in its own thread into a small shared queue, so memory stays at a few
+    chunks per branch and a fast branch is not held up by a slow one. A branch
+    whose database takes longer than its timeout for one chunk is dropped and
+    named in .errors; time spent waiting for the consumer does not count.
+    """
+
+    def __init__(self, shard_set, fn, depth=STREAM_DEPTH):
+        self.shard_set = shard_set
+        self.fn = fn
+        self.depth = depth
+        self.errors = {}
+
+    def __iter__(self):
+        home, remote = self.shard_set.home, self.shard_set.shards[1:]
+        if not remote:
+            yield from self.fn(home)
+            return
+        q = queue.Queue(maxsize=self.depth * len(remote))
+        stop = threading.Event()
+        # branch -> when it started waiting on its database, None while handing over a chunk
+        busy = {}
+        for shard in remote:
+            threading.Thread(target=self._produce, args=(shard, q, stop, busy), daemon=True,
+                             name=f"fleet-shard-stream-{shard.name}").start()
+        try:
+            started = time.perf_counter()
+            try:
+                yield from self.fn(home)
+                self.shard_set._record(home.name, time.perf_counter() - started)
+            except Exception as e:
+                self.errors[home.name] = _failure(e)
+                self.shard_set._record(home.name, error=self.errors[home.name])
+            pending = {s.name for s in remote}
+            while pending:
+                try:
+                    name, kind, payload = q.get(timeout=0.1)
+                except queue.Empty:
+                    name = None
+                if name in pending:
+                    if kind == "chunk":
+                        yield payload
+                    elif kind == "done":
+                        pending.discard(name)
+                        self.shard_set._record(name, payload)
+                    else:
+                        pending.discard(name)
+                        self.errors[name] = payload
+                        self.shard_set._record(name, error=payload)
+                now = time.perf_counter()
+                for shard in remote:
+                    since = busy.get(shard.name)
+                    if shard.name in pending and since is not None and now - since > shard.timeout:
+                        pending.discard(shard.name)
+                        self.errors[shard.name] = f"tidak menjawab dalam {shard.timeout:g} s"
+                        self.shard_set._record(shard.name, error=self.errors[shard.name], timed_out=True)
+        finally:
+            stop.set()
+        if len(self.errors) == len(self.shard_set.shards):
+            raise ShardsUnavailableError(f"Tidak ada cabang yang menjawab ({describe_errors(self.errors)})")
+
+    def _produce(self, shard, q, stop, busy):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        started = time.perf_counter()
+        busy[shard.name] = started
+        chunks = None
+        try:
+            chunks = self.fn(shard)
+            for chunk in chunks:
+                busy[shard.name] = None
+                if not put((shard.name, "chunk", chunk)):
+                    return
+                busy[shard.name] = time.perf_counter()
+            busy[shard.name] = None
+            put((shard.name, "done", time.perf_counter() - started))
+        except Exception as e:
+            busy[shard.name] = None
+            put((shard.name, "error", _failure(e)))
+        finally:
+            if chunks is not None:
+                chunks.close()
+
+
+# ---------- Merging ----------
+def merge_pages(pages, direction="next", page_size=20):
+    """k-way merge of per-shard keyset pages, each (DataFrame ordered by car_id, has_more), into one.
+
+    Every shard's page holds its page_size cars nearest the anchor on the
+    requested side, so the page_size nearest of their union form the fleet's page.
+    """
+    pages = list(pages)
+    if len(pages) == 1:
+        return pages[0]
+    import pandas as pd
+
+    frames = [df for df, _ in pages if len(df)] or [pages[0][0]]
+    combined = pd.concat(frames, ignore_index=True)
+    runs, start = [], 0
+    for df in frames:
+        positions = range(start, start + len(df))
+        if direction == "prev":
+            runs.append(zip(reversed(df["car_id"].tolist()), reversed(positions)))
+        else:
+            runs.append(zip(df["car_id"].tolist(), positions))
+        start += len(df)
+    merged = heapq.merge(*runs, reverse=direction == "prev")
+    picked = [position for _, position in islice(merged, page_size + 1)]
+    has_more = len(picked) > page_size or any(more for _, more in pages)
+    picked = picked[:page_size]
+    if direction == "prev":
+        picked.reverse()
+    return combined.iloc[picked].reset_index(drop=True), has_more
+
+
+def merge_ranked(results, limit, key):
+    """k-way merge of per-shard result lists, each already sorted by key; the first limit.
+
+    Ties keep the shard order, so this branch's cars come first among equals.
+    """
+    return list(islice(heapq.merge(*results, key=key), limit))
+
+
+# ---------- Configuration ----------
+def parse_sqlite_branches(text):
+    """Branches from "name:prefix:path,...", e.g. RENTAL_SQLITE_BRANCHES for local runs."""
+    branches = []
+    for entry in (e.strip() for e in (text or "").split(",")):
+        if not entry:
+            continue
+        name, prefix, path = entry.split(":", 2)
+        # a new branch database starts without the sample cars (their M IDs belong to the home branch)
+        branches.append({"name": name, "car_prefix": prefix, "backend": "sqlite",
+                         "config": {"path": path, "seed_file": None}})
+    return branches
+
+
+def create_shards(home_backend, branch_config, branches, pool_config=None, replica_config=None, workers=None):
+    """ShardSet of this branch (home_backend, branch_config) and the other branches' configs.
+
+    Each branch: {"name", "car_prefix", "backend": "mysql" | "sqlite", "config", optional "timeout"};
+    config is what create_backend takes for that kind, replicas included.
+    """
+    timeout = branch_config.get("timeout", SHARD_TIMEOUT)
+    shards = [Shard(branch_config["name"], branch_config["car_prefix"], home_backend, timeout, home=True)]
+    for branch in branches:
+        config = dict(branch.get("config") or {})
+        backend = create_backend(branch.get("backend", "mysql"), mysql_config=config, sqlite_config=config,
+                                 pool_config=pool_config, replica_config=replica_config)
+        shards.append(Shard(branch["name"], branch["car_prefix"], backend, branch.get("timeout", timeout)))
+    return ShardSet(shards, workers)
+
+
+# ---------- Check ----------
+def shard_report(conn, prefix):
+    """Cars in one branch database and how many of them carry an ID outside its prefix."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM mobil_rental")
+    cars = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM mobil_rental WHERE NOT (car_id LIKE %s AND SUBSTR(car_id, %s, 1) BETWEEN '0' AND '9')",
+                   (prefix + "%", len(prefix) + 1))
+    return {"cars": cars, "outside_prefix": cursor.fetchone()[0]}
+
+
+def _report_shard(shard):
+    with shard.backend.connection() as conn:
+        return shard_report(conn, shard.car_prefix)
+
+
+def main():
+    import rental_system
+
+    rental_system.init_schema()
+    shards = rental_system.get_shards()
+    gathered = shards.gather(_report_shard)
+    rows = []
+    for shard in shards.shards:
+        row = {"cabang": shard.name + (" (sendiri)" if shard.home else ""), "prefix": shard.car_prefix,
+               "database": shard.backend.describe()}
+        if shard.name in gathered.results:
+            row.update(gathered.results[shard.name], ms=round(gathered.elapsed[shard.name] * 1000, 1))
+        else:
+            row["error"] = gathered.errors[shard.name]
+        rows.append(row)
+    rental_system.print_table(rows)
+    misplaced = sum(r.get("outside_prefix", 0) for r in rows)
+    if misplaced:
+        print(f"{misplaced} mobil memakai Car ID di luar prefix cabangnya dan tidak akan dirutekan ke sana; "
+              f"ganti ID-nya atau pindahkan ke cabang pemilik prefix.")
+    if gathered.errors or misplaced:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
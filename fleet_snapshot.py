@@ -0,0 +1,425 @@
+"""In-process columnar snapshot of mobil_rental for the listing and chart menus.
+
+    python fleet_snapshot.py      # load once, print rows, memory and load time
+
+FleetSnapshot holds the CAR_FIELDS of every car as numpy arrays in car_id
+order. car_id is fixed-width UTF-8 bytes (which sort like the database's
+binary order), model/type/status are small integer
+codes into lookup lists, and price and counters are plain numbers. Listing
+pages (keyset on car_id, the same result as fetch_car_page), the list of car
+types and the chart data are answered from the arrays without a query.
+
+SnapshotCache keeps one snapshot per process:
+
+  - rent_car, return_car, create_car and revert_event hand their committed
+    row change to patch(), so this process sees its own writes at once;
+  - every `ttl` seconds the first read compares MAX(rental_events.event_id)
+    with the event the snapshot is at. Every car write is logged there in the
+    same transaction, so a different value means another process wrote;
+  - a missing or stale snapshot is (re)loaded in a background thread while
+    reads fall back to the database, and after `max_age` seconds it is
+    reloaded even if nothing seems to have changed.
+
+A change made elsewhere therefore shows after at most `ttl` seconds plus a
+reload. snapshot_stats() reports hits, misses, loads, patches and the memory
+held.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from car_catalog import CAR_FIELDS
+
+SNAPSHOT_TTL = 2.0
+SNAPSHOT_MAX_AGE = 300.0
+LOAD_CHUNK = 50000
+STATUSES = ["Tersedia", "Dirental"]
+# array type per column; car_model, car_type and status hold codes into SnapshotCodes
+COLUMN_TYPES = {
+    "car_id": "S10",
+    "car_model": "int32",
+    "car_type": "int16",
+    "price_per_day": "float64",
+    "status": "int8",
+    "current_rental_days": "int32",
+    "total_rental_count": "int32",
+}
+# the dtypes fetch_car_page gives its frames (rental_system.COLUMN_DTYPES)
+FRAME_DTYPES = {"price_per_day": "float64", "current_rental_days": "int64", "total_rental_count": "int64"}
+
+
+def _key(car_id):
+    # car_id as stored in the array; an array of its own width, so searchsorted never truncates it
+    import numpy as np
+    return np.array([car_id.encode("utf-8")])
+
+
+def read_version(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(event_id) FROM rental_events")
+    return cursor.fetchone()[0] or 0
+
+
+class SnapshotCodes:
+    """Dictionary encoding of one text column: values[code] is the text."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {v: i for i, v in enumerate(self.values)}
+        self._lookup = None
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+            self._lookup = None
+        return code
+
+    def lookup(self):
+        # values as an object array, to decode a whole column slice at once
+        if self._lookup is None:
+            import numpy as np
+            self._lookup = np.array(self.values, dtype=object)
+        return self._lookup
+
+
+class FleetSnapshot:
+    """Columnar copy of mobil_rental at rental_events `version`; use load_snapshot()."""
+
+    def __init__(self, version, columns, codes):
+        self.version = version
+        self.columns = columns
+        self.codes = codes
+        self.loaded_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.columns["car_id"])
+
+    def memory_bytes(self):
+        arrays = sum(a.nbytes for a in self.columns.values())
+        return arrays + sum(sys.getsizeof(v) for c in self.codes.values() for v in c.values)
+
+    # ----- reads -----
+    def _matching(self, filters, lo, hi, want, reverse):
+        # positions in [lo, hi) that pass every filter: the first `want`, or the last with reverse.
+        # Scans outward from the anchor in growing blocks, so a page touches few rows.
+        import numpy as np
+
+        checks = []
+        for field, value in (filters or {}).items():
+            if field not in self.codes:
+                raise ValueError(f"Filter snapshot tidak didukung: {field}")
+            code = self.codes[field].index.get(value)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            checks.append((self.columns[field], code))
+        if not checks:
+            return np.arange(max(lo, hi - want), hi) if reverse else np.arange(lo, min(hi, lo + want))
+        found, count, step = [], 0, 1024
+        while lo < hi and count < want:
+            if reverse:
+                start, stop = max(lo, hi - step), hi
+                hi = start
+            else:
+                start, stop = lo, min(hi, lo + step)
+                lo = stop
+            mask = checks[0][0][start:stop] == checks[0][1]
+            for column, code in checks[1:]:
+                mask &= column[start:stop] == code
+            block = np.flatnonzero(mask) + start
+            found.append(block)
+            count += len(block)
+            step *= 4
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        if reverse:
+            return np.concatenate(found[::-1])[-want:]
+        return np.concatenate(found)[:want]
+
+    def _frame(self, positions):
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for field in CAR_FIELDS:
+            values = self.columns[field][positions]
+            if field in self.codes:
+                values = self.codes[field].lookup()[values]
+            elif field == "car_id":
+                values = np.array([v.decode("utf-8") for v in values], dtype=object)
+            else:
+                # converted in numpy: DataFrame.astype costs more than building the frame
+                values = values.astype(FRAME_DTYPES.get(field, object))
+            data[field] = values
+        return pd.DataFrame(data, columns=CAR_FIELDS, copy=False)
+
+    def page(self, filters=None, anchor=None, direction="next", page_size=20):
+        """Same (DataFrame, has_more) as fetch_car_page with WHERE field = value for each filter."""
+        import numpy as np
+
+        with self._lock:
+            ids = self.columns["car_id"]
+            lo, hi, reverse = 0, len(ids), False
+            if anchor is not None:
+                if direction == "prev":
+                    hi, reverse = int(np.searchsorted(ids, _key(anchor), "left")[0]), True
+                else:
+                    lo = int(np.searchsorted(ids, _key(anchor), "left" if direction == "jump" else "right")[0])
+            positions = self._matching(filters, lo, hi, page_size + 1, reverse)
+            has_more = len(positions) > page_size
+            positions = positions[-page_size:] if reverse else positions[:page_size]
+            return self._frame(positions), has_more
+
+    def car_types(self):
+        import numpy as np
+
+        with self._lock:
+            types = self.codes["car_type"]
+            present = np.bincount(self.columns["car_type"], minlength=len(types.values))
+            return sorted(types.values[code] for code in np.flatnonzero(present))
+
+    def chart_data(self, price_bin, top_n):
+        """The aggregates charts.chart_specs reads from the summary tables, from the arrays."""
+        import numpy as np
+
+        with self._lock:
+            cols = self.columns
+            n = len(self)
+            if n == 0:
+                return None
+            types, statuses = self.codes["car_type"].values, self.codes["status"].values
+            pairs = np.bincount(cols["car_type"].astype(np.int64) * len(statuses) + cols["status"],
+                                minlength=len(types) * len(statuses))
+            # same order as load_fleet_stats: car_type ascending, then status descending
+            status_counts, type_counts = {}, {}
+            for t in sorted(range(len(types)), key=types.__getitem__):
+                for s in sorted(range(len(statuses)), key=statuses.__getitem__, reverse=True):
+                    count = int(pairs[t * len(statuses) + s])
+                    if count:
+                        status_counts[statuses[s]] = status_counts.get(statuses[s], 0) + count
+                        type_counts[types[t]] = type_counts.get(types[t], 0) + count
+            prices, price_counts = np.unique(cols["price_per_day"], return_counts=True)
+            totals = cols["total_rental_count"]
+            floor = np.partition(totals, n - top_n)[n - top_n] if n > top_n else totals.min()
+            candidates = np.flatnonzero(totals >= floor)
+            top = candidates[np.argsort(-totals[candidates], kind="stable")][:top_n]
+            models = self.codes["car_model"].values
+            top_rented = [{"car_id": cols["car_id"][i].decode("utf-8"), "car_model": models[cols["car_model"][i]],
+                           "total_rental_count": int(totals[i])} for i in top]
+            # ROUND(price / bin) * bin, halves away from zero like SQL; (bin, total) packed into one key
+            bins = np.floor(cols["price_per_day"] / price_bin + 0.5).astype(np.int64)
+            width = int(totals.max()) + 1
+            keys, grid_counts = np.unique(bins * width + totals, return_counts=True)
+            grid = zip((keys // width) * price_bin, keys % width)
+            return {
+                "status_counts": status_counts,
+                "type_counts": type_counts,
+                "price_hist": [(float(v), int(c)) for v, c in zip(prices, price_counts)],
+                "top_rented": top_rented,
+                "points": [(float(p), int(r), int(c)) for (p, r), c in zip(grid, grid_counts)],
+            }
+
+    # ----- writes -----
+    def apply(self, old, new, event_id=None):
+        """Fold one committed row change (read_car dicts; None = no row) into the arrays."""
+        import numpy as np
+
+        car_id = (new or old)["car_id"]
+        with self._lock:
+            if event_id is not None and event_id <= self.version:
+                # already part of what was loaded
+                return
+            key = _key(car_id)
+            ids = self.columns["car_id"]
+            i = int(np.searchsorted(ids, key)[0])
+            present = i < len(ids) and ids[i] == key[0]
+            if new is None:
+                if present:
+                    self.columns = {f: np.delete(a, i) for f, a in self.columns.items()}
+            else:
+                if key.dtype.itemsize > ids.dtype.itemsize:
+                    self.columns["car_id"] = ids = ids.astype(key.dtype)
+                values = {f: np.array(self.codes[f].code(new[f]) if f in self.codes else new[f],
+                                       dtype=self.columns[f].dtype) for f in CAR_FIELDS if f != "car_id"}
+                values["car_id"] = key[0]
+                if present:
+                    for field, value in values.items():
+                        self.columns[field][i] = value
+                else:
+                    self.columns = {f: np.insert(a, i, values[f]) for f, a in self.columns.items()}
+            # a gap in event ids means another writer: leave the version so the next check reloads
+            if event_id == self.version + 1:
+                self.version = event_id
+
+
+def load_snapshot(conn, chunk_size=LOAD_CHUNK):
+    import numpy as np
+
+    # version first: the rows read afterwards are at least that recent
+    version = read_version(conn)
+    codes = {"car_model": SnapshotCodes(), "car_type": SnapshotCodes(), "status": SnapshotCodes(STATUSES)}
+    parts = {field: [] for field in CAR_FIELDS}
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(CAR_FIELDS)} FROM mobil_rental ORDER BY car_id")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for field, values in zip(CAR_FIELDS, zip(*rows)):
+            if field == "car_id":
+                # width of the longest id; concatenate widens to the longest chunk
+                parts[field].append(np.array([v.encode("utf-8") for v in values]))
+                continue
+            if field in codes:
+                code = codes[field].code
+                values = [code(v) for v in values]
+            parts[field].append(np.array(values, dtype=COLUMN_TYPES[field]))
+    columns = {f: np.concatenate(p) if p else np.empty(0, dtype=COLUMN_TYPES[f]) for f, p in parts.items()}
+    return FleetSnapshot(version, columns, codes)
+
+
+class SnapshotCache:
+    """One FleetSnapshot per process, kept current as described at the top of this module."""
+
+    def __init__(self, connect, ttl=SNAPSHOT_TTL, max_age=SNAPSHOT_MAX_AGE, background=True):
+        self.connect = connect
+        self.ttl = ttl
+        self.max_age = max_age
+        self.background = background
+        self._snapshot = None
+        self._checked = 0.0
+        self._loader = None
+        # changes committed while a load runs, applied to its result
+        self._pending = []
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "load_seconds": 0.0, "load_errors": 0,
+                      "version_checks": 0, "stale": 0, "patches": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get(self, conn=None):
+        """The current snapshot, or None (a miss: read the database) while it is missing or reloading.
+
+        A caller that already holds a connection passes it for the version check.
+        """
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot
+            # one reader re-validates, the others keep using the snapshot meanwhile
+            check = snapshot is not None and now - self._checked >= self.ttl
+            if check:
+                self._checked = now
+        if check:
+            stale = now - snapshot.loaded_at >= self.max_age
+            if not stale:
+                self._count("version_checks")
+                if conn is not None:
+                    stale = read_version(conn) != snapshot.version
+                else:
+                    with self.connect() as conn:
+                        stale = read_version(conn) != snapshot.version
+            if stale:
+                with self._lock:
+                    if self._snapshot is snapshot:
+                        self._snapshot = None
+                    self.stats["stale"] += 1
+                snapshot = None
+        if snapshot is None:
+            self._count("misses")
+            self._start_load()
+            return None
+        self._count("hits")
+        return snapshot
+
+    def _start_load(self):
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._load, name="fleet-snapshot", daemon=True)
+            loader = self._loader
+        loader.start()
+        if not self.background:
+            loader.join()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            with self.connect() as conn:
+                snapshot = load_snapshot(conn)
+        except Exception:
+            # the database answers the reads; the next miss tries again
+            self._count("load_errors")
+            with self._lock:
+                self._pending = []
+            return
+        with self._lock:
+            for old, new, event_id in self._pending:
+                snapshot.apply(old, new, event_id)
+            self._pending = []
+            self._snapshot = snapshot
+            self._checked = time.monotonic()
+            self.stats["loads"] += 1
+            self.stats["load_seconds"] += time.perf_counter() - started
+
+    def wait_loaded(self, timeout=None):
+        # for scripts and benchmarks: load now and block until the snapshot is there
+        if self._snapshot is None:
+            self._start_load()
+        loader = self._loader
+        if loader is not None:
+            loader.join(timeout)
+        return self._snapshot
+
+    def patch(self, old, new, event_id=None):
+        """A committed car change of this process; keeps the snapshot current without a reload."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                if self._loader is not None and self._loader.is_alive():
+                    self._pending.append((old, new, event_id))
+                return
+            self.stats["patches"] += 1
+        snapshot.apply(old, new, event_id)
+
+    def invalidate(self):
+        # e.g. after a bulk import: the next read reloads
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot_stats(self):
+        with self._lock:
+            data = dict(self.stats)
+            snapshot = self._snapshot
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 4) if lookups else None
+        data["load_seconds"] = round(data["load_seconds"], 3)
+        data["rows"] = len(snapshot) if snapshot is not None else 0
+        data["memory_bytes"] = snapshot.memory_bytes() if snapshot is not None else 0
+        data["version"] = snapshot.version if snapshot is not None else None
+        return data
+
+
+def describe_stats(data):
+    ratio = "-" if data["hit_ratio"] is None else f"{data['hit_ratio']:.1%}"
+    return (f"Snapshot fleet: {data['rows']:,} mobil, {data['memory_bytes'] / 2**20:.1f} MiB, "
+            f"hit {data['hits']:,} / miss {data['misses']:,} ({ratio}), {data['loads']} kali dimuat "
+            f"({data['load_seconds']:.2f} s), {data['patches']:,} patch, {data['stale']} kedaluwarsa")
+
+
+def main():
+    import rental_system
+
+    argparse.ArgumentParser(description="Muat snapshot kolumnar fleet dan tampilkan ukurannya").parse_args()
+    rental_system.init_schema()
+    cache = SnapshotCache(rental_system.connect_db, background=False)
+    cache.wait_loaded()
+    print(describe_stats(cache.snapshot_stats()))
+
+
+if __name__ == "__main__":
+    main()
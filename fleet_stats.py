@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field
+
+# pandas is imported inside the methods that build frames, so loading
+# FleetStats (every program start, via fleet_summary) stays cheap
+# the figures themselves come from the summary tables: fleet_summary.load_fleet_partial
+
+
+@dataclass
+class TypeSummary:
+    car_type: str
+    count: int
+    avg_price: float
+
+
+@dataclass
+class FleetPartial:
+    # one database's share of FleetStats as raw aggregates, which add up across
+    # databases (fleet_summary.merge_fleet_partials); averages and quantiles do not
+    summary: list = field(default_factory=list)       # (car_type, status, car_count, price_sum, rental_count_sum)
+    rent_hist: list = field(default_factory=list)     # (total_rental_count, car_count), ascending
+    price_hist: list = field(default_factory=list)    # (price_per_day, car_count), ascending
+    top_rented: list = field(default_factory=list)    # (car_id, car_model, total_rental_count), best first
+    long_rentals: list = field(default_factory=list)  # (car_id, car_model, days_out), best first
+    overdue: int = 0
+
+
+@dataclass
+class FleetStats:
+    total: int = 0
+    status_counts: dict = field(default_factory=dict)
+    avg_price: float = None
+    by_type: list = field(default_factory=list)
+    avg_rental_count: float = None
+    max_rental_count: int = None
+    min_rental_count: int = None
+    top_rented: list = field(default_factory=list)
+    long_rentals: list = field(default_factory=list)
+    overdue: int = 0
+    price_summary: dict = field(default_factory=dict)
+
+    @property
+    def available(self):
+        return self.status_counts.get("Tersedia", 0)
+
+    @property
+    def rented(self):
+        return self.status_counts.get("Dirental", 0)
+
+    def summary_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "total_mobil": [self.total],
+            "tersedia": [self.available],
+            "dirental": [self.rented],
+            "avg_price": [self.avg_price if self.avg_price is not None else 0],
+        })
+
+    def by_type_frame(self):
+        import pandas as pd
+        return pd.DataFrame([(t.car_type, t.count, t.avg_price) for t in self.by_type],
+                            columns=["car_type", "cnt", "avg_type_price"])
+
+    def top_rented_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.top_rented, columns=["car_id", "car_model", "total_rental_count"])
+
+    def long_rentals_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.long_rentals, columns=["car_id", "car_model", "days_out"])
+
+    def price_summary_series(self):
+        import pandas as pd
+        return pd.Series(self.price_summary, name="price_per_day", dtype="float64")
+
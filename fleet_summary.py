@@ -0,0 +1,448 @@
+"""Materialized fleet summary kept in sync with every write to mobil_rental.
+
+Tables
+  fleet_summary     counters per (car_type, status): car count, price sum, rental count sum,
+                    overdue cars
+  fleet_value_hist  value -> car count for price_per_day and total_rental_count
+  fleet_top         top-N buffers per metric (total_rental_count, days_out)
+  fleet_summary_meta  bookkeeping (buffer floors)
+
+Write paths call apply_car_change(conn, old_row, new_row) inside their own
+transaction; dashboard reads (load_fleet_stats) then cost O(#types + #distinct values).
+The same aggregates from several databases (branches) add up: load_fleet_partial
+on each, then merge_fleet_partials.
+
+    python fleet_summary.py --verify      # compare with a full scan, report drift
+    python fleet_summary.py --rebuild     # recompute everything from mobil_rental
+"""
+import argparse
+
+from fleet_stats import FleetPartial, FleetStats, TypeSummary
+from storage import table_columns, upsert_add
+
+TOP_N = 5
+TOP_BUFFER = 20
+CAR_COLUMNS = ["car_id", "car_model", "car_type", "status", "price_per_day",
+               "total_rental_count", "current_rental_days", "days_out", "overdue"]
+HIST_METRICS = ["price_per_day", "total_rental_count"]
+# metric -> predicate deciding whether a car takes part in that ranking
+TOP_METRICS = {
+    "total_rental_count": lambda car: True,
+    "days_out": lambda car: car["status"] == "Dirental",
+}
+# the same eligibility as SQL, for rebuilds and verification
+TOP_WHERE = {"days_out": "WHERE status='Dirental'"}
+# _is_overdue as an aggregate
+OVERDUE_SUM = "SUM(CASE WHEN status='Dirental' AND overdue=1 THEN 1 ELSE 0 END)"
+
+SUMMARY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS fleet_summary (
+        car_type VARCHAR(50) NOT NULL,
+        status VARCHAR(10) NOT NULL,
+        car_count INT NOT NULL DEFAULT 0,
+        price_sum DOUBLE NOT NULL DEFAULT 0,
+        rental_count_sum BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (car_type, status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fleet_value_hist (
+        metric VARCHAR(30) NOT NULL,
+        value DOUBLE NOT NULL,
+        car_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (metric, value)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fleet_top (
+        metric VARCHAR(30) NOT NULL,
+        car_id VARCHAR(10) NOT NULL,
+        car_model VARCHAR(100) NOT NULL,
+        value INT NOT NULL,
+        PRIMARY KEY (metric, car_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fleet_summary_meta (
+        name VARCHAR(50) PRIMARY KEY,
+        value VARCHAR(50)
+    )
+    """,
+]
+
+
+def read_car(conn, car_id, for_update=False):
+    cursor = conn.cursor()
+    sql = f"SELECT {', '.join(CAR_COLUMNS)} FROM mobil_rental WHERE car_id=%s"
+    if for_update:
+        sql += " FOR UPDATE"
+    cursor.execute(sql, (car_id,))
+    row = cursor.fetchone()
+    return None if row is None else dict(zip(CAR_COLUMNS, row))
+
+
+# ---------- Incremental maintenance ----------
+def _add_counter(cursor, table, keys, deltas):
+    upsert_add(cursor, table, keys, deltas)
+    if deltas["car_count"] < 0:
+        # the row is locked by the upsert until commit
+        where = " AND ".join(f"{k}=%s" for k in keys)
+        cursor.execute(f"DELETE FROM {table} WHERE {where} AND car_count <= 0", tuple(keys.values()))
+
+
+def _is_overdue(car):
+    # freshly inserted rows (bulk import) come without clock columns
+    return 1 if car["status"] == "Dirental" and int(car.get("overdue") or 0) else 0
+
+
+def _apply_counters(cursor, car, sign):
+    _add_counter(cursor, "fleet_summary",
+                 {"car_type": car["car_type"], "status": car["status"]},
+                 {"car_count": sign, "price_sum": sign * float(car["price_per_day"]),
+                  "rental_count_sum": sign * int(car["total_rental_count"]),
+                  "overdue_count": sign * _is_overdue(car)})
+    for metric in HIST_METRICS:
+        _add_counter(cursor, "fleet_value_hist",
+                     {"metric": metric, "value": float(car[metric])},
+                     {"car_count": sign})
+
+
+def _get_floor(cursor, metric):
+    cursor.execute("SELECT value FROM fleet_summary_meta WHERE name=%s", (f"top_floor:{metric}",))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    value = row[0]
+    return None if value is None else float(value)
+
+
+def _set_floor(cursor, metric, floor):
+    name = f"top_floor:{metric}"
+    cursor.execute("DELETE FROM fleet_summary_meta WHERE name=%s", (name,))
+    cursor.execute("INSERT INTO fleet_summary_meta (name, value) VALUES (%s,%s)",
+                   (name, None if floor is None else str(floor)))
+
+
+def _top_size(cursor, metric):
+    cursor.execute("SELECT COUNT(*) FROM fleet_top WHERE metric=%s", (metric,))
+    return cursor.fetchone()[0]
+
+
+def _update_top(cursor, metric, old, new):
+    # Invariant: every member of the buffer has value >= floor and every
+    # eligible car outside it has value <= floor (floor NULL: nobody is outside).
+    eligible = TOP_METRICS[metric]
+    floor = _get_floor(cursor, metric)
+    car_id = (new or old)["car_id"]
+    if old is not None:
+        cursor.execute("DELETE FROM fleet_top WHERE metric=%s AND car_id=%s", (metric, car_id))
+        was_member = cursor.rowcount > 0
+    else:
+        was_member = False
+    if new is not None and eligible(new):
+        value = int(new[metric])
+        if floor is None or value > floor or (was_member and value >= floor):
+            cursor.execute("INSERT INTO fleet_top (metric, car_id, car_model, value) VALUES (%s,%s,%s,%s)",
+                           (metric, car_id, new["car_model"], value))
+    size = _top_size(cursor, metric)
+    if size > TOP_BUFFER:
+        cursor.execute("SELECT car_id, value FROM fleet_top WHERE metric=%s ORDER BY value ASC, car_id DESC LIMIT %s",
+                       (metric, size - TOP_BUFFER))
+        dropped = cursor.fetchall()
+        for dropped_id, _ in dropped:
+            cursor.execute("DELETE FROM fleet_top WHERE metric=%s AND car_id=%s", (metric, dropped_id))
+        highest = max(v for _, v in dropped)
+        _set_floor(cursor, metric, highest if floor is None else max(floor, highest))
+    elif size < TOP_N and floor is not None:
+        # cars outside the buffer may now belong to the top-N
+        rebuild_top(cursor, metric)
+
+
+def apply_car_change(conn, old, new):
+    """Fold one row change of mobil_rental (insert: old=None, delete: new=None) into the summary.
+
+    Must run inside the transaction that wrote the row; the caller commits.
+    """
+    if old is None and new is None:
+        return
+    cursor = conn.cursor()
+    if old is not None:
+        _apply_counters(cursor, old, -1)
+    if new is not None:
+        _apply_counters(cursor, new, +1)
+    for metric in TOP_METRICS:
+        _update_top(cursor, metric, old, new)
+
+
+def apply_overdue_changes(conn, deltas):
+    """Add {car_type: change in overdue rented cars} from a set-based clock UPDATE; the caller commits."""
+    cursor = conn.cursor()
+    for car_type, delta in deltas.items():
+        if delta:
+            _add_counter(cursor, "fleet_summary", {"car_type": car_type, "status": "Dirental"},
+                         {"car_count": 0, "overdue_count": delta})
+
+
+def apply_car_inserts(conn, cars):
+    """Batched apply_car_change for freshly inserted rows (bulk import)."""
+    cursor = conn.cursor()
+    summary, hist = {}, {}
+    for car in cars:
+        key = (car["car_type"], car["status"])
+        count, p_sum, r_sum = summary.get(key, (0, 0.0, 0))
+        summary[key] = (count + 1, p_sum + float(car["price_per_day"]), r_sum + int(car["total_rental_count"]))
+        for metric in HIST_METRICS:
+            hkey = (metric, float(car[metric]))
+            hist[hkey] = hist.get(hkey, 0) + 1
+    for (car_type, status), (count, p_sum, r_sum) in summary.items():
+        _add_counter(cursor, "fleet_summary", {"car_type": car_type, "status": status},
+                     {"car_count": count, "price_sum": p_sum, "rental_count_sum": r_sum})
+    for (metric, value), count in hist.items():
+        _add_counter(cursor, "fleet_value_hist", {"metric": metric, "value": value}, {"car_count": count})
+    for metric, eligible in TOP_METRICS.items():
+        floor = _get_floor(cursor, metric)
+        for car in cars:
+            if eligible(car) and (floor is None or int(car[metric]) > floor):
+                _update_top(cursor, metric, None, car)
+                floor = _get_floor(cursor, metric)
+
+
+# ---------- Rebuild & verify ----------
+def ensure_summary_tables(conn):
+    cursor = conn.cursor()
+    for ddl in SUMMARY_DDL:
+        cursor.execute(ddl)
+    cursor.execute("SELECT value FROM fleet_summary_meta WHERE name='built'")
+    built = cursor.fetchone() is not None
+    conn.commit()
+    if not built:
+        rebuild_fleet_summary(conn)
+
+
+def ensure_overdue_counter(conn):
+    # migration 8: overdue cars per (car_type, status), so stats reads skip mobil_rental
+    if "overdue_count" not in table_columns(conn, "fleet_summary"):
+        conn.cursor().execute("ALTER TABLE fleet_summary ADD COLUMN overdue_count INT NOT NULL DEFAULT 0")
+        conn.commit()
+    rebuild_fleet_summary(conn)
+
+
+def rebuild_top(cursor, metric):
+    where = TOP_WHERE.get(metric, "")
+    cursor.execute("DELETE FROM fleet_top WHERE metric=%s", (metric,))
+    cursor.execute(f"SELECT car_id, car_model, {metric} FROM mobil_rental {where} "
+                   f"ORDER BY {metric} DESC, car_id ASC LIMIT %s", (TOP_BUFFER + 1,))
+    rows = cursor.fetchall()
+    members = rows[:TOP_BUFFER]
+    for car_id, car_model, value in members:
+        cursor.execute("INSERT INTO fleet_top (metric, car_id, car_model, value) VALUES (%s,%s,%s,%s)",
+                       (metric, car_id, car_model, int(value)))
+    _set_floor(cursor, metric, int(rows[TOP_BUFFER][2]) if len(rows) > TOP_BUFFER else None)
+
+
+def rebuild_fleet_summary(conn):
+    # a database older than migration 5 has no clock columns yet, one older than 8 no overdue counter
+    columns = table_columns(conn, "mobil_rental")
+    counted = "overdue" in columns and "overdue_count" in table_columns(conn, "fleet_summary")
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM fleet_summary")
+    cursor.execute("DELETE FROM fleet_value_hist")
+    cursor.execute("DELETE FROM fleet_summary_meta")
+    cursor.execute(f"""
+        INSERT INTO fleet_summary (car_type, status, car_count, price_sum, rental_count_sum{', overdue_count' if counted else ''})
+        SELECT car_type, status, COUNT(*), SUM(price_per_day), SUM(total_rental_count){f', {OVERDUE_SUM}' if counted else ''}
+        FROM mobil_rental GROUP BY car_type, status
+    """)
+    for metric in HIST_METRICS:
+        cursor.execute(f"""
+            INSERT INTO fleet_value_hist (metric, value, car_count)
+            SELECT %s, {metric}, COUNT(*) FROM mobil_rental GROUP BY {metric}
+        """, (metric,))
+    for metric in TOP_METRICS:
+        if metric in columns:
+            rebuild_top(cursor, metric)
+    cursor.execute("INSERT INTO fleet_summary_meta (name, value) VALUES ('built', '1')")
+    conn.commit()
+
+
+def _fetch_rows(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return [tuple(r) for r in cursor.fetchall()]
+
+
+def verify_fleet_summary(conn):
+    """Return a list of human readable differences between the summary and mobil_rental."""
+    cursor = conn.cursor()
+    problems = []
+    stored = {(t, s): (c, round(p, 2), r, o) for t, s, c, p, r, o in _fetch_rows(
+        cursor, "SELECT car_type, status, car_count, price_sum, rental_count_sum, overdue_count FROM fleet_summary")}
+    actual = {(t, s): (c, round(float(p), 2), int(r), int(o)) for t, s, c, p, r, o in _fetch_rows(
+        cursor, f"SELECT car_type, status, COUNT(*), SUM(price_per_day), SUM(total_rental_count), {OVERDUE_SUM} "
+                "FROM mobil_rental GROUP BY car_type, status")}
+    for key in sorted(set(stored) | set(actual)):
+        if stored.get(key) != actual.get(key):
+            problems.append(f"fleet_summary {key}: tersimpan {stored.get(key)}, seharusnya {actual.get(key)}")
+    for metric in HIST_METRICS:
+        stored = dict(_fetch_rows(cursor, "SELECT value, car_count FROM fleet_value_hist WHERE metric=%s", (metric,)))
+        actual = {float(v): c for v, c in _fetch_rows(
+            cursor, f"SELECT {metric}, COUNT(*) FROM mobil_rental GROUP BY {metric}")}
+        if stored != actual:
+            diff = sorted(k for k in set(stored) | set(actual) if stored.get(k) != actual.get(k))
+            problems.append(f"fleet_value_hist {metric}: {len(diff)} nilai berbeda (mis. {diff[:3]})")
+    for metric in TOP_METRICS:
+        where = TOP_WHERE.get(metric, "")
+        stored = [v for _, _, v in read_top(cursor, metric)]
+        actual = [int(r[0]) for r in _fetch_rows(
+            cursor, f"SELECT {metric} FROM mobil_rental {where} ORDER BY {metric} DESC LIMIT %s", (TOP_N,))]
+        if stored != actual:
+            problems.append(f"fleet_top {metric}: tersimpan {stored}, seharusnya {actual}")
+    return problems
+
+
+# ---------- Reads ----------
+def read_top(cursor, metric, n=TOP_N):
+    return _fetch_rows(cursor, "SELECT car_id, car_model, value FROM fleet_top WHERE metric=%s "
+                               "ORDER BY value DESC, car_id ASC LIMIT %s", (metric, n))
+
+
+def _hist_quantile(hist, total, q):
+    # linear interpolation between order statistics, same as numpy/pandas
+    pos = q * (total - 1)
+    lo_idx, frac = int(pos), pos - int(pos)
+    lo = hi = None
+    seen = 0
+    for value, count in hist:
+        if lo is None and lo_idx < seen + count:
+            lo = value
+        if lo_idx + 1 < seen + count:
+            hi = value
+            break
+        seen += count
+    if hi is None:
+        hi = lo
+    return lo + (hi - lo) * frac
+
+
+def load_fleet_partial(conn):
+    """This database's summary aggregates as a FleetPartial, without touching mobil_rental rows."""
+    cursor = conn.cursor()
+    partial = FleetPartial()
+    partial.summary = _fetch_rows(cursor, "SELECT car_type, status, car_count, price_sum, rental_count_sum "
+                                          "FROM fleet_summary ORDER BY car_type, status DESC")
+    if not partial.summary:
+        return partial
+    partial.rent_hist = _fetch_rows(cursor, "SELECT value, car_count FROM fleet_value_hist "
+                                            "WHERE metric='total_rental_count' ORDER BY value")
+    partial.top_rented = read_top(cursor, "total_rental_count")
+    partial.long_rentals = read_top(cursor, "days_out")
+    cursor.execute("SELECT SUM(overdue_count) FROM fleet_summary")
+    partial.overdue = int(cursor.fetchone()[0] or 0)
+    partial.price_hist = _fetch_rows(cursor, "SELECT value, car_count FROM fleet_value_hist "
+                                             "WHERE metric='price_per_day' ORDER BY value")
+    return partial
+
+
+def _merge_hist(hists):
+    if len(hists) == 1:
+        return hists[0]
+    merged = {}
+    for hist in hists:
+        for value, count in hist:
+            merged[value] = merged.get(value, 0) + count
+    return sorted(merged.items())
+
+
+def _merge_top(tops):
+    # every database's top-N holds the fleet's top-N members it has
+    if len(tops) == 1:
+        return tops[0]
+    return sorted((row for top in tops for row in top), key=lambda r: (-r[2], r[0]))[:TOP_N]
+
+
+def merge_fleet_partials(partials):
+    """FleetStats of the union of the databases behind partials (one FleetPartial each)."""
+    partials = [p for p in partials if p.summary]
+    stats = FleetStats()
+    summary = {}
+    for partial in partials:
+        for car_type, status, count, p_sum, r_sum in partial.summary:
+            c, p, r = summary.get((car_type, status), (0, 0.0, 0))
+            summary[(car_type, status)] = (c + count, p + float(p_sum), r + int(r_sum))
+    type_count, type_price = {}, {}
+    price_sum = 0.0
+    rent_sum = 0
+    for (car_type, status), (count, p_sum, r_sum) in summary.items():
+        stats.total += count
+        stats.status_counts[status] = stats.status_counts.get(status, 0) + count
+        type_count[car_type] = type_count.get(car_type, 0) + count
+        type_price[car_type] = type_price.get(car_type, 0.0) + p_sum
+        price_sum += p_sum
+        rent_sum += r_sum
+    if stats.total == 0:
+        return stats
+    stats.avg_price = price_sum / stats.total
+    stats.by_type = [TypeSummary(t, type_count[t], type_price[t] / type_count[t]) for t in sorted(type_count)]
+    stats.avg_rental_count = rent_sum / stats.total
+
+    rent_hist = _merge_hist([p.rent_hist for p in partials])
+    stats.min_rental_count = int(rent_hist[0][0])
+    stats.max_rental_count = int(rent_hist[-1][0])
+    stats.top_rented = [{"car_id": c, "car_model": m, "total_rental_count": v}
+                        for c, m, v in _merge_top([p.top_rented for p in partials])]
+    stats.long_rentals = [{"car_id": c, "car_model": m, "days_out": v}
+                          for c, m, v in _merge_top([p.long_rentals for p in partials])]
+    stats.overdue = sum(p.overdue for p in partials)
+
+    price_hist = [(float(v), c) for v, c in _merge_hist([p.price_hist for p in partials])]
+    mean = stats.avg_price
+    n = stats.total
+    var = sum(c * (v - mean) ** 2 for v, c in price_hist) / (n - 1) if n > 1 else float("nan")
+    stats.price_summary = {
+        "count": float(n),
+        "mean": mean,
+        "std": var ** 0.5,
+        "min": price_hist[0][0],
+        "25%": _hist_quantile(price_hist, n, 0.25),
+        "50%": _hist_quantile(price_hist, n, 0.50),
+        "75%": _hist_quantile(price_hist, n, 0.75),
+        "max": price_hist[-1][0],
+    }
+    return stats
+
+
+def load_fleet_stats(conn):
+    """Build FleetStats from the summary tables without touching mobil_rental."""
+    return merge_fleet_partials([load_fleet_partial(conn)])
+
+
+def load_price_histogram(conn):
+    cursor = conn.cursor()
+    return [(float(v), c) for v, c in _fetch_rows(
+        cursor, "SELECT value, car_count FROM fleet_value_hist WHERE metric='price_per_day' ORDER BY value")]
+
+
+def main():
+    import rental_system
+
+    parser = argparse.ArgumentParser(description="Verifikasi / rebuild tabel ringkasan fleet")
+    parser.add_argument("--rebuild", action="store_true", help="hitung ulang seluruh ringkasan dari mobil_rental")
+    parser.add_argument("--verify", action="store_true", help="bandingkan ringkasan dengan mobil_rental")
+    args = parser.parse_args()
+    with rental_system.connect_db() as conn:
+        ensure_summary_tables(conn)
+        if args.rebuild:
+            rebuild_fleet_summary(conn)
+            print("Ringkasan fleet berhasil dibangun ulang.")
+        if args.verify or not args.rebuild:
+            problems = verify_fleet_summary(conn)
+            if problems:
+                print("Ditemukan drift pada ringkasan fleet:")
+                for p in problems:
+                    print("-", p)
+                raise SystemExit(1)
+            print("Ringkasan fleet konsisten dengan mobil_rental.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""HTTP/JSON service for many concurrent customers (asyncio, standard library only).
+
+    python http_service.py --port 8080
+
+Endpoints (JSON bodies and responses):
+
+    POST /login              {"email", "password"} -> {"token", "user"}
+    POST /logout             ends the session of the token                     (login)
+    GET  /cars               ?status=Tersedia&after=M020&page_size=20   (keyset pages)
+    GET  /cars/available     ?start=YYYY-MM-DD&end=YYYY-MM-DD&type=SUV
+    GET  /cars/search        ?q=avanza&status=&min_price=&max_price=
+    POST /rent               {"car_id", "days"} or {"car_id", "start", "end"}   (login)
+    POST /return             {"car_id"}                                        (login)
+    GET  /stats              fleet statistics                                 (manager)
+    GET  /metrics            request count and p50/p99 latency per endpoint, plus the
+                             instrumentation snapshot (?format=prometheus for text)
+    POST /instrumentation    {"enabled": true, "slow_query_ms": 100}          (manager)
+
+Send the login token as "Authorization: Bearer <token>"; a token unused for
+SESSION_IDLE seconds expires. The event loop only
+parses requests; every database call runs on a thread pool no larger than the
+connection pool, on the same functions the console menus use.
+
+With several branches (rental_system.BRANCHES) the fleet-wide reads answer
+from every branch; branches left out (down or past their timeout) are listed
+under "unavailable" in the response, and when none answers the status is 503.
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import instrumentation
+import rental_system
+from batch_runner import cmd_rent, cmd_return
+from fleet_shards import ShardsUnavailableError
+from reservations import ReservationConflictError
+
+MAX_BODY = 1 << 20
+LATENCY_WINDOW = 10000  # most recent samples kept per endpoint
+SESSION_IDLE = 8 * 3600  # seconds a login token stays valid without requests
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, status):
+        self.samples[route].append(seconds)
+        self.counts[route] += 1
+        if status >= 400:
+            self.errors[route] += 1
+
+    def snapshot(self):
+        result = {}
+        for route, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[route] = {"count": self.counts[route], "errors": self.errors[route],
+                             "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                             "p99_ms": round(percentile(ordered, 0.99) * 1000, 3)}
+        return result
+
+
+class SessionStore:
+    # token -> user, least recently used first, so expired sessions are pruned from the front.
+    # Logins run on the DB thread pool and lookups on the event loop, hence the lock
+    def __init__(self, idle=SESSION_IDLE):
+        self.idle = idle
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def _prune(self, now):
+        while self._users:
+            token, (_, last_used) = next(iter(self._users.items()))
+            if now - last_used < self.idle:
+                break
+            del self._users[token]
+
+    def open(self, user):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._users[user["session_id"]] = (user, now)
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            entry = self._users.get(token)
+            if entry is None:
+                return None
+            self._users[token] = (entry[0], now)
+            self._users.move_to_end(token)
+            return entry[0]
+
+    def close(self, token):
+        with self._lock:
+            return self._users.pop(token, None) is not None
+
+    def __len__(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._users)
+
+
+# ---------- Handlers (run on the DB thread pool) ----------
+def _records(df):
+    return df.astype(object).to_dict("records")
+
+
+def _partial(payload, errors):
+    # name the branches a fleet-wide result is missing
+    if errors:
+        payload["unavailable"] = errors
+    return payload
+
+
+def _date_param(query, name, default=None):
+    if not query.get(name):
+        if default is None:
+            raise ValueError(f"parameter {name} wajib diisi (YYYY-MM-DD)")
+        return default
+    return datetime.date.fromisoformat(query[name])
+
+
+def _count_param(query, name, default, maximum=500):
+    # page sizes and limits: a whole number from 1 to maximum
+    value = query.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"parameter {name} harus bilangan bulat >= 1")
+    return min(number, maximum)
+
+
+def handle_login(service, conn, req):
+    user = rental_system.authenticate(conn, req["body"].get("email"), str(req["body"].get("password") or ""))
+    if not user:
+        raise HTTPError(401, "Email atau password salah.")
+    service.sessions.open(user)
+    return {"token": user["session_id"],
+            "user": {k: user[k] for k in ("user_id", "name", "email", "role")}}
+
+
+def handle_logout(service, conn, req):
+    return {"logged_out": service.sessions.close(req["user"]["session_id"])}
+
+
+def handle_list_cars(service, conn, req):
+    q = req["query"]
+    filters = {}
+    if q.get("status"):
+        if q["status"] not in ("Tersedia", "Dirental"):
+            raise ValueError("status harus Tersedia atau Dirental")
+        filters["status"] = q["status"]
+    page_size = _count_param(q, "page_size", rental_system.PAGE_SIZE)
+    df, has_more, errors = rental_system.car_page(filters, q.get("after"), "next", page_size, conn=conn)
+    cars = _records(df)
+    return _partial({"cars": cars, "has_more": has_more, "next": cars[-1]["car_id"] if has_more and cars else None},
+                    errors)
+
+
+def handle_available(service, conn, req):
+    q = req["query"]
+    start = _date_param(q, "start", datetime.date.today())
+    end = _date_param(q, "end")
+    limit = _count_param(q, "limit", rental_system.SEARCH_LIMIT)
+    cars, errors = rental_system.available_fleet(start, end, q.get("type") or None, limit, conn)
+    return _partial({"cars": cars}, errors)
+
+
+def handle_search(service, conn, req):
+    q = req["query"]
+    min_price = float(q["min_price"]) if q.get("min_price") else None
+    max_price = float(q["max_price"]) if q.get("max_price") else None
+    limit = _count_param(q, "limit", rental_system.SEARCH_LIMIT)
+    cars, errors = rental_system.search_fleet(q.get("q", ""), q.get("status") or None, min_price, max_price, limit, conn)
+    return _partial({"cars": cars}, errors)
+
+
+def handle_rent(service, conn, req):
+    return cmd_rent(conn, req["user"], req["body"])
+
+
+def handle_return(service, conn, req):
+    return cmd_return(conn, req["user"], req["body"])
+
+
+def handle_stats(service, conn, req):
+    stats, errors = rental_system.fleet_stats(req["user"], conn)
+    return _partial(dataclasses.asdict(stats), errors)
+
+
+def handle_instrumentation(service, conn, req):
+    body = req["body"]
+    if body.get("enabled") is True:
+        instrumentation.enable(body.get("slow_query_ms"))
+    elif body.get("enabled") is False:
+        instrumentation.disable()
+    elif body.get("slow_query_ms") is not None:
+        instrumentation.STATE.slow_query_ms = float(body["slow_query_ms"])
+    return {"enabled": instrumentation.STATE.enabled, "slow_query_ms": instrumentation.STATE.slow_query_ms}
+
+
+# (method, path): (handler, role required: None = public, "any" = logged in, or a role name)
+ROUTES = {
+    ("POST", "/login"): (handle_login, None),
+    ("POST", "/logout"): (handle_logout, "any"),
+    ("GET", "/cars"): (handle_list_cars, None),
+    ("GET", "/cars/available"): (handle_available, None),
+    ("GET", "/cars/search"): (handle_search, None),
+    ("POST", "/rent"): (handle_rent, "any"),
+    ("POST", "/return"): (handle_return, "any"),
+    ("GET", "/stats"): (handle_stats, "manager"),
+    ("POST", "/instrumentation"): (handle_instrumentation, "manager"),
+}
+# reports that may be served by a read replica (rental_system.connect_read)
+REPLICA_READS = {handle_stats}
+
+
+class RentalService:
+    def __init__(self, workers=None, session_idle=SESSION_IDLE):
+        workers = workers or rental_system.pool_stats()["size"]
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rental-db")
+        self.sessions = SessionStore(session_idle)
+        self.latency = LatencyStats()
+
+    def _run(self, handler, req):
+        with instrumentation.span(f"http.{handler.__name__.removeprefix('handle_')}"):
+            if handler in REPLICA_READS:
+                connection = rental_system.connect_read(req["user"])
+            else:
+                connection = rental_system.connect_db()
+            with connection as conn:
+                return handler(self, conn, req)
+
+    def _authorize(self, role, headers):
+        if role is None:
+            return None
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        user = self.sessions.get(token)
+        if user is None:
+            raise HTTPError(401, "Login diperlukan.")
+        if role != "any" and user["role"] != role:
+            raise HTTPError(403, f"Hanya untuk {role}.")
+        return user
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        if (method, url.path) == ("GET", "/metrics"):
+            if dict(parse_qsl(url.query)).get("format") == "prometheus":
+                return 200, instrumentation.prometheus_text()
+            return 200, {"routes": self.latency.snapshot(), "instrumentation": instrumentation.snapshot()}
+        if (method, url.path) == ("GET", "/health"):
+            cache = rental_system.get_snapshot()
+            return 200, {"status": "ok", "pool": rental_system.pool_stats(), "replicas": rental_system.replica_status(),
+                         "sessions": len(self.sessions),
+                         "snapshot": cache.snapshot_stats() if cache else None,
+                         "branches": rental_system.branch_status()}
+        route = ROUTES.get((method, url.path))
+        if route is None:
+            raise HTTPError(404, f"Endpoint {method} {url.path} tidak ada.")
+        handler, role = route
+        try:
+            payload = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            raise HTTPError(400, "Body harus JSON.")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body harus objek JSON.")
+        req = {"query": dict(parse_qsl(url.query)), "body": payload, "user": self._authorize(role, headers)}
+        loop = asyncio.get_running_loop()
+        return 200, await loop.run_in_executor(self.executor, self._run, handler, req)
+
+    async def respond(self, method, target, headers, body):
+        started = time.perf_counter()
+        try:
+            status, payload = await self.dispatch(method, target, headers, body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except rental_system.CarNotFoundError as e:
+            status, payload = 404, {"error": str(e)}
+        except (rental_system.RentalConflictError, ReservationConflictError) as e:
+            status, payload = 409, {"error": str(e)}
+        except ShardsUnavailableError as e:
+            status, payload = 503, {"error": str(e)}
+        except (ValueError, KeyError) as e:
+            status, payload = 400, {"error": str(e) if isinstance(e, ValueError) else f"field {e} wajib diisi"}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        path = urlsplit(target).path
+        self.latency.record(f"{method} {path}" if (method, path) in ROUTES else "other", time.perf_counter() - started, status)
+        return status, payload
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "request line tidak valid"}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, {"error": "Content-Length tidak valid"}, close=True)
+                    break
+                if length > MAX_BODY:
+                    await self._write(writer, 413, {"error": "body terlalu besar"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.respond(method.upper(), target, headers, body)
+                close = headers.get("connection", "").lower() == "close"
+                await self._write(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, payload, close=False):
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload, default=str).encode(), "application/json"
+        writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                     f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layanan HTTP/JSON rental mobil")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="thread DB (default: ukuran connection pool)")
+    parser.add_argument("--session-idle", type=float, default=SESSION_IDLE,
+                        help="detik sampai token login yang tidak dipakai kedaluwarsa")
+    args = parser.parse_args()
+    rental_system.init_schema()
+    service = RentalService(args.workers, args.session_idle)
+    print(f"Melayani di http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Counter-table ID allocation for car and user IDs.
+
+Each sequence is one row in id_sequences. Allocation bumps the counter with a
+single UPDATE in its own short transaction, so concurrent sessions never get the
+same number and the cost does not depend on table size. IDs keep the M001/U001
+format (numbers above 999 simply get more digits). Cancelled additions leave gaps,
+the same as an auto-increment column. A branch database numbers its cars with
+its own prefix (MB001, ...), see fleet_shards.
+"""
+import re
+
+SEQUENCES = {
+    # name: (table, column, prefix, column width)
+    "car": ("mobil_rental", "car_id", "M", 10),
+    "user": ("users", "user_id", "U", 20),
+}
+
+SEQUENCE_DDL = """
+    CREATE TABLE IF NOT EXISTS id_sequences (
+        name VARCHAR(20) PRIMARY KEY,
+        next_value BIGINT NOT NULL
+    )
+"""
+
+
+_ID_RE = re.compile(r"^[A-Za-z]*(\d+)$")
+
+
+def format_id(prefix, num):
+    return f"{prefix}{num:03d}"
+
+
+def parse_id_number(value):
+    # the digits after the letter prefix: M017 and MB017 are both 17
+    match = _ID_RE.match(value) if isinstance(value, str) else None
+    return int(match.group(1)) if match else None
+
+
+def _highest_used(cursor, name):
+    # one-off scan when a sequence is created; numeric compare, not string order
+    table, column, _, _ = SEQUENCES[name]
+    cursor.execute(f"SELECT {column} FROM {table}")
+    numbers = [parse_id_number(row[0]) for row in cursor.fetchall()]
+    return max([n for n in numbers if n is not None], default=0)
+
+
+def ensure_id_sequences(conn):
+    cursor = conn.cursor()
+    cursor.execute(SEQUENCE_DDL)
+    conn.commit()
+    for name in SEQUENCES:
+        _seed_sequence(conn, name)
+
+
+def _seed_sequence(conn, name):
+    # no locking read first: on InnoDB two FOR UPDATE reads of a missing row both get the gap
+    # lock and one of the INSERTs then dies in a deadlock. INSERT IGNORE lets the loser of the
+    # race simply keep the row the winner wrote
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM id_sequences WHERE name=%s", (name,))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT IGNORE INTO id_sequences (name, next_value) VALUES (%s,%s)",
+                       (name, _highest_used(cursor, name) + 1))
+    conn.commit()
+
+
+def reserve_ids(conn, name, count=1):
+    """Reserve `count` consecutive numbers; returns the first one.
+
+    Commits on `conn`, so call it on a connection without pending work.
+    """
+    if count < 1:
+        raise ValueError("Jumlah ID yang dipesan harus >= 1")
+    cursor = conn.cursor()
+    for _ in range(2):
+        conn.start_transaction()
+        cursor.execute("UPDATE id_sequences SET next_value = next_value + %s WHERE name=%s", (count, name))
+        if cursor.rowcount:
+            cursor.execute("SELECT next_value FROM id_sequences WHERE name=%s", (name,))
+            end = cursor.fetchone()[0]
+            conn.commit()
+            return int(end) - count
+        conn.rollback()
+        cursor.execute(SEQUENCE_DDL)
+        _seed_sequence(conn, name)
+    raise RuntimeError(f"Sequence {name} tidak dapat diinisialisasi.")
+
+
+def allocate_ids(conn, name, count=1, prefix=None):
+    first = reserve_ids(conn, name, count)
+    _, column, default_prefix, width = SEQUENCES[name]
+    ids = [format_id(prefix or default_prefix, n) for n in range(first, first + count)]
+    # the column would truncate (MySQL strict mode: reject) a longer ID
+    if len(ids[-1]) > width:
+        raise ValueError(f"{column} {ids[-1]} melebihi {width} karakter; perlebar kolom {column} dengan migrasi baru.")
+    return ids
@@ -0,0 +1,310 @@
+"""Optional timing of database calls and user actions.
+
+Off by default; switch it on with RENTAL_METRICS=1 or enable() at runtime (the
+manager menu and the HTTP service both can). While it is off, backends hand out
+plain pooled connections and span()/timed() return at the first check, so the
+hot path pays one attribute lookup.
+
+While on, every checkout is wrapped: each execute/executemany is timed per
+statement (SQL text with the values already out, as %s placeholders), rows
+fetched are counted, and pool wait time is recorded. Statements slower than
+slow_query_ms are appended to the slow-query log. Metrics can be exported as a
+Prometheus text file or a JSON snapshot.
+"""
+import bisect
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Settings:
+    def __init__(self):
+        self.enabled = os.environ.get("RENTAL_METRICS", "") == "1"
+        self.slow_query_ms = float(os.environ.get("RENTAL_SLOW_QUERY_MS", 200))
+        self.slow_log_path = os.environ.get("RENTAL_SLOW_QUERY_LOG", "slow_queries.log")
+
+
+STATE = Settings()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.n:
+            return None
+        rank, seen = q * self.n, 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = {}       # statement -> Histogram
+            self.rows = {}          # statement -> rows fetched
+            self.actions = {}       # action name -> Histogram
+            self.pool_wait = Histogram()
+            self.slow_queries = 0
+
+    def observe_query(self, statement, seconds):
+        with self._lock:
+            self.queries.setdefault(statement, Histogram()).observe(seconds)
+
+    def add_rows(self, statement, n):
+        with self._lock:
+            self.rows[statement] = self.rows.get(statement, 0) + n
+
+    def observe_action(self, name, seconds):
+        with self._lock:
+            self.actions.setdefault(name, Histogram()).observe(seconds)
+
+    def observe_pool_wait(self, seconds):
+        with self._lock:
+            self.pool_wait.observe(seconds)
+
+
+REGISTRY = Registry()
+
+
+def enable(slow_query_ms=None, slow_log_path=None):
+    if slow_query_ms is not None:
+        STATE.slow_query_ms = float(slow_query_ms)
+    if slow_log_path is not None:
+        STATE.slow_log_path = slow_log_path
+    STATE.enabled = True
+
+
+def disable():
+    STATE.enabled = False
+
+
+_SPACES = re.compile(r"\s+")
+_VALUE_LISTS = re.compile(r"\(\s*%s(\s*,\s*%s)+\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_key(sql):
+    # one label per statement shape: collapse whitespace and variable-length IN/VALUES lists
+    sql = _SPACES.sub(" ", sql).strip()
+    return _VALUE_LISTS.sub("(%s, ...)", sql)[:160]
+
+
+# ---------- Slow-query log ----------
+_slow_lock = threading.Lock()
+
+
+def _log_slow(statement, params, seconds):
+    if isinstance(params, list):
+        shown = f"<executemany, {len(params)} baris>"
+    else:
+        shown = repr(params)
+    if len(shown) > 200:
+        shown = shown[:200] + "..."
+    line = (f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\t{seconds * 1000:.1f} ms\t"
+            f"{threading.current_thread().name}\t{statement}\t{shown}\n")
+    with _slow_lock:
+        REGISTRY.slow_queries += 1
+        with open(STATE.slow_log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# ---------- Connection / cursor wrappers ----------
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._statement = None
+
+    def _timed(self, method, query, params):
+        statement = statement_key(query)
+        started = time.perf_counter()
+        try:
+            return method(query, params)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._statement = statement
+            REGISTRY.observe_query(statement, elapsed)
+            if elapsed * 1000 >= STATE.slow_query_ms:
+                _log_slow(statement, params, elapsed)
+
+    def execute(self, query, params=()):
+        self._timed(self._cursor.execute, query, params)
+        return self
+
+    def executemany(self, query, seq_params):
+        seq_params = list(seq_params)
+        self._timed(self._cursor.executemany, query, seq_params)
+        return self
+
+    def _count(self, rows):
+        if self._statement is not None:
+            REGISTRY.add_rows(self._statement, len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None and self._statement is not None:
+            REGISTRY.add_rows(self._statement, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        return self._count(self._cursor.fetchmany(size) if size else self._cursor.fetchmany())
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            if self._statement is not None:
+                REGISTRY.add_rows(self._statement, 1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def instrumented_checkout(pool):
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        REGISTRY.observe_pool_wait(time.perf_counter() - started)
+        yield InstrumentedConnection(conn)
+
+
+# ---------- Spans for actions ----------
+_NOOP = nullcontext()
+
+
+@contextmanager
+def _span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe_action(name, time.perf_counter() - started)
+
+
+def span(name):
+    """Context manager timing a named action (menu entry, HTTP route, batch command)."""
+    if not STATE.enabled:
+        return _NOOP
+    return _span(name)
+
+
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not STATE.enabled:
+                return fn(*args, **kwargs)
+            with _span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------- Export ----------
+def _bound(value):
+    # JSON has no infinity; the overflow bucket is reported by its Prometheus name
+    return "+Inf" if value == float("inf") else value
+
+
+def _hist_dict(h):
+    return {"count": h.n, "sum_seconds": round(h.total, 6),
+            "p50_seconds": _bound(h.quantile(0.5)), "p99_seconds": _bound(h.quantile(0.99)),
+            "buckets": {str(b): c for b, c in zip(BUCKETS + ("+Inf",), h.counts)}}
+
+
+def snapshot():
+    with REGISTRY._lock:
+        return {
+            "enabled": STATE.enabled,
+            "slow_query_ms": STATE.slow_query_ms,
+            "slow_queries": REGISTRY.slow_queries,
+            "pool_wait": _hist_dict(REGISTRY.pool_wait),
+            "queries": {s: dict(_hist_dict(h), rows=REGISTRY.rows.get(s, 0)) for s, h in REGISTRY.queries.items()},
+            "actions": {a: _hist_dict(h) for a, h in REGISTRY.actions.items()},
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _prom_histogram(lines, name, labels, h):
+    cumulative = 0
+    for bound, count in zip(BUCKETS + ("+Inf",), h.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+    plain = f"{{{labels.rstrip(',')}}}" if labels else ""
+    lines.append(f"{name}_sum{plain} {h.total}")
+    lines.append(f"{name}_count{plain} {h.n}")
+
+
+def prometheus_text():
+    lines = []
+    with REGISTRY._lock:
+        lines += ["# HELP rental_db_query_seconds Execution time per SQL statement.",
+                  "# TYPE rental_db_query_seconds histogram"]
+        for statement, h in sorted(REGISTRY.queries.items()):
+            _prom_histogram(lines, "rental_db_query_seconds", f'statement="{_label(statement)}",', h)
+        lines += ["# HELP rental_db_rows_total Rows fetched per SQL statement.",
+                  "# TYPE rental_db_rows_total counter"]
+        for statement, n in sorted(REGISTRY.rows.items()):
+            lines.append(f'rental_db_rows_total{{statement="{_label(statement)}"}} {n}')
+        lines += ["# HELP rental_db_pool_wait_seconds Time spent waiting for a pooled connection.",
+                  "# TYPE rental_db_pool_wait_seconds histogram"]
+        _prom_histogram(lines, "rental_db_pool_wait_seconds", "", REGISTRY.pool_wait)
+        lines += ["# HELP rental_action_seconds Duration of menu actions, HTTP routes and batch commands.",
+                  "# TYPE rental_action_seconds histogram"]
+        for action, h in sorted(REGISTRY.actions.items()):
+            _prom_histogram(lines, "rental_action_seconds", f'action="{_label(action)}",', h)
+        lines += ["# HELP rental_slow_queries_total Statements slower than the slow-query threshold.",
+                  "# TYPE rental_slow_queries_total counter",
+                  f"rental_slow_queries_total {REGISTRY.slow_queries}"]
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Write metrics to path: Prometheus text for .prom/.txt, otherwise a JSON snapshot."""
+    if os.path.splitext(path)[1].lower() in (".prom", ".txt"):
+        content = prometheus_text()
+    else:
+        content = json.dumps(snapshot(), indent=2)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
@@ -0,0 +1,243 @@
+"""Versioned schema setup.
+
+schema_version records the number of the last migration applied to the
+database. migrate() reads it with a single query and returns straight away
+when it is current, so a normal launch sends no DDL and no seed checks; the
+steps below only run on a new or older database. Every step is idempotent
+(CREATE ... IF NOT EXISTS, seed-if-empty, check the column layout before
+altering it), so an interrupted run can simply be repeated. Add schema changes
+as a new step at the end, never edit old ones.
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # recorded vs latest version
+"""
+import argparse
+import datetime
+
+from car_catalog import CAR_FIELDS
+from car_search import ensure_search_index
+from event_log import ensure_event_log
+from fleet_summary import ensure_overdue_counter, ensure_summary_tables
+from id_sequence import ensure_id_sequences
+from rental_clock import ensure_rental_clock
+from reservations import ensure_reservation_changes, ensure_reservations
+from storage import create_index, dialect_of, drop_index, ensure_replica_heartbeat, table_columns
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT NOT NULL,
+        description VARCHAR(200),
+        applied_at DATETIME NOT NULL
+    )
+"""
+
+USERS_DDL = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id VARCHAR(6) PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(100) NOT NULL,
+        role ENUM('manager','customer') NOT NULL
+    )
+"""
+BUILTIN_USERS = [
+    ('U001', 'Admin Manager', 'admin@rental.com', 'admin', 'manager'),
+    ('U002', 'Admin Customer', 'customer@rental.com', 'admin', 'customer'),
+]
+
+
+def ensure_user_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute(USERS_DDL)
+    for user in BUILTIN_USERS:
+        cursor.execute("SELECT COUNT(*) FROM users WHERE email=%s", (user[2],))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)", user)
+    conn.commit()
+
+
+def ensure_support_tables(conn):
+    # fleet summary, ID sequences, search index, event log and reservations
+    ensure_summary_tables(conn)
+    ensure_id_sequences(conn)
+    ensure_search_index(conn)
+    ensure_event_log(conn)
+    ensure_reservations(conn)
+
+
+# ---------- mobil_rental layout ----------
+CAR_TABLE_DDL = """
+    CREATE TABLE {name} (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        car_id VARCHAR(10) NOT NULL UNIQUE,
+        car_model VARCHAR(100) NOT NULL,
+        car_type VARCHAR(50) NOT NULL,
+        price_per_day DECIMAL(12,2) NOT NULL,
+        status ENUM('Tersedia', 'Dirental') NOT NULL,
+        current_rental_days INT NOT NULL DEFAULT 0,
+        total_rental_count INT NOT NULL DEFAULT 0
+    )
+"""
+# one per hot access path: filter by type, by status (also the customer
+# availability list) with keyset pages on car_id, longest running rentals,
+# top-N by rental count
+CAR_INDEXES = [
+    ("idx_mobil_type_id", "mobil_rental", "car_type, car_id"),
+    ("idx_mobil_status_id", "mobil_rental", "status, car_id"),
+    ("idx_mobil_status_days", "mobil_rental", "status, current_rental_days DESC, car_id"),
+    ("idx_mobil_rentals", "mobil_rental", "total_rental_count DESC, car_id"),
+]
+# superseded by idx_mobil_type_id
+OLD_CAR_INDEXES = [("idx_mobil_type", "mobil_rental")]
+
+
+def _rebuild_sqlite_car_table(conn):
+    # SQLite cannot change a primary key or a column type in place: copy into a
+    # new table, swap it in and recreate the indexes, all in one transaction
+    cursor = conn.cursor()
+    conn.start_transaction()
+    try:
+        cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = 'mobil_rental' "
+                       "AND type IN ('index', 'trigger') AND sql IS NOT NULL")
+        extras = [row[0] for row in cursor.fetchall()]
+        columns = ", ".join(CAR_FIELDS)
+        cursor.execute(CAR_TABLE_DDL.format(name="mobil_rental_new"))
+        cursor.execute(f"INSERT INTO mobil_rental_new ({columns}) SELECT {columns} FROM mobil_rental ORDER BY car_id")
+        cursor.execute("DROP TABLE mobil_rental")
+        cursor.execute("ALTER TABLE mobil_rental_new RENAME TO mobil_rental")
+        for sql in extras:
+            cursor.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def upgrade_car_table(conn):
+    """Numeric surrogate key (car_id stays unique) and DECIMAL(12,2) prices."""
+    columns = table_columns(conn, "mobil_rental")
+    has_id = "id" in columns
+    has_decimal = columns["price_per_day"].startswith("decimal")
+    if has_id and has_decimal:
+        return
+    if dialect_of(conn) == "sqlite":
+        _rebuild_sqlite_car_table(conn)
+        return
+    changes = []
+    if not has_decimal:
+        changes.append("MODIFY price_per_day DECIMAL(12,2) NOT NULL")
+    if not has_id:
+        changes += ["DROP PRIMARY KEY", "ADD UNIQUE KEY car_id (car_id)",
+                    "ADD COLUMN id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST"]
+    # one ALTER, so InnoDB rebuilds the table once
+    conn.cursor().execute(f"ALTER TABLE mobil_rental {', '.join(changes)}")
+    conn.commit()
+
+
+def ensure_car_indexes(conn):
+    for name, table, columns in CAR_INDEXES:
+        create_index(conn, name, table, columns)
+    for name, table in OLD_CAR_INDEXES:
+        drop_index(conn, name, table)
+
+
+# ---------- user IDs ----------
+# VARCHAR(6) ends at U99999; the sequence keeps counting (id_sequence checks the width)
+USER_ID_COLUMNS = [("users", "user_id VARCHAR(20) NOT NULL"), ("rental_events", "user_id VARCHAR(20)"),
+                   ("reservations", "user_id VARCHAR(20)")]
+
+
+def widen_user_ids(conn):
+    # SQLite does not enforce VARCHAR lengths; on MySQL a wider VARCHAR below 64 characters
+    # keeps its one-byte length prefix, so InnoDB changes it in place
+    if dialect_of(conn) == "sqlite":
+        return
+    cursor = conn.cursor()
+    for table, column in USER_ID_COLUMNS:
+        cursor.execute(f"ALTER TABLE {table} MODIFY {column}")
+    conn.commit()
+
+
+# ---------- event log prices ----------
+def exact_event_prices(conn):
+    # MySQL FLOAT keeps about 7 digits, and undo, redo and replay write these prices back into
+    # mobil_rental. SQLite stores FLOAT and DECIMAL as the same double, so there is nothing to do there
+    if dialect_of(conn) == "sqlite":
+        return
+    cursor = conn.cursor()
+    cursor.execute("ALTER TABLE rental_events MODIFY price_per_day DECIMAL(12,2)")
+    # a car's price never changes after it is added: take the exact one where the car still exists
+    cursor.execute("""
+        UPDATE rental_events e JOIN mobil_rental m ON m.car_id = e.car_id
+        SET e.price_per_day = m.price_per_day
+        WHERE e.price_per_day <> m.price_per_day
+    """)
+    conn.commit()
+
+
+# (version, description, step(conn)), in order
+MIGRATIONS = [
+    (1, "users + akun bawaan", ensure_user_tables),
+    (2, "tabel pendukung: ringkasan, ID, indeks cari, log event, reservasi", ensure_support_tables),
+    (3, "mobil_rental: kunci numerik id, harga DECIMAL(12,2)", upgrade_car_table),
+    (4, "mobil_rental: indeks komposit untuk filter, ketersediaan dan top-N", ensure_car_indexes),
+    (5, "jam rental harian: rented_on, days_out, tanda terlambat", ensure_rental_clock),
+    (6, "replica_heartbeat: pengukur lag replika baca", ensure_replica_heartbeat),
+    (7, "user_id VARCHAR(20): lebih dari 99.999 user", widen_user_ids),
+    (8, "ringkasan fleet: jumlah mobil terlambat per jenis", ensure_overdue_counter),
+    (9, "rental_events: harga DECIMAL(12,2)", exact_event_prices),
+    (10, "reservation_changes: versi kalender tanpa baris bersama", ensure_reservation_changes),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+    except Exception:
+        # no schema_version table yet: nothing recorded
+        conn.rollback()
+        return 0
+    return row[0] or 0
+
+
+def migrate(conn, progress=None):
+    """Apply every migration newer than the recorded version; returns the list applied."""
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return []
+    cursor = conn.cursor()
+    cursor.execute(SCHEMA_VERSION_DDL)
+    conn.commit()
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        if progress:
+            progress(number, description)
+        step(conn)
+        cursor.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (%s,%s,%s)",
+                       (number, description, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        conn.commit()
+        applied.append(number)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi skema database rental")
+    parser.add_argument("--status", action="store_true", help="hanya tampilkan versi skema")
+    args = parser.parse_args()
+
+    import rental_system
+    with rental_system.connect_db() as conn:
+        if args.status:
+            print(f"Versi skema: {current_version(conn)} (terbaru: {LATEST_VERSION})")
+            return
+        applied = migrate(conn, lambda n, d: print(f"Migrasi {n}: {d} ..."))
+    print(f"{len(applied)} migrasi diterapkan." if applied else "Skema sudah versi terbaru.")
+
+
+if __name__ == "__main__":
+    main()
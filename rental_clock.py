@@ -0,0 +1,296 @@
+"""Daily rental clock: days out, overdue flags and optional auto-return.
+
+    python rental_clock.py                          # advance to today (cron: 5 0 * * *)
+    python rental_clock.py --auto-return --grace 1  # also take back cars more than 1 day late
+    python rental_clock.py --daemon --at 00:05      # long-running, once a day
+    python rental_clock.py --overdue                # list overdue cars
+
+current_rental_days stays the booked length of a rental (the event log, undo
+and reservations rely on it). rent_car stamps rented_on, and the clock keeps
+days_out (days since rented_on) and overdue (days_out > booked days) for every
+car that is out. It updates them with set-based UPDATEs over keyset batches of
+BATCH_SIZE rented cars, one short transaction each, which also moves the
+fleet summary's overdue counters by that batch's change. Writers only wait for
+one batch, never for the whole fleet.
+
+days_out is recomputed from rented_on, not incremented, so a repeated or
+resumed run gives the same result. rental_clock keeps one row per calendar
+day with the last car_id done. A second run on the same day returns straight
+away, and a run that was cut off resumes after that car. Auto-return goes
+through return_car, one car per transaction, so the event log, fleet summary
+and reservations stay in step.
+"""
+import argparse
+import datetime
+import time
+from dataclasses import dataclass
+
+from fleet_summary import apply_overdue_changes, rebuild_top
+from storage import create_index, dialect_of, drop_index, table_columns
+
+BATCH_SIZE = 5000
+# pause between batches, so writers waiting on the lock get their turn
+BATCH_PAUSE = 0.02
+CLOCK_SESSION = {"session_id": "rental-clock", "user_id": None}
+
+CLOCK_DDL = """
+    CREATE TABLE IF NOT EXISTS rental_clock (
+        day DATE PRIMARY KEY,
+        started_at DATETIME NOT NULL,
+        finished_at DATETIME,
+        last_car_id VARCHAR(10) NOT NULL DEFAULT '',
+        advanced INT NOT NULL DEFAULT 0,
+        overdue INT NOT NULL DEFAULT 0,
+        returned INT NOT NULL DEFAULT 0
+    )
+"""
+CLOCK_COLUMNS = [
+    ("rented_on", "DATE NULL"),
+    ("days_out", "INT NOT NULL DEFAULT 0"),
+    ("overdue", "TINYINT NOT NULL DEFAULT 0"),
+]
+CLOCK_INDEXES = [
+    ("idx_mobil_status_out", "mobil_rental", "status, days_out DESC, car_id"),
+    ("idx_mobil_overdue", "mobil_rental", "status, overdue, car_id"),
+]
+
+
+@dataclass
+class ClockReport:
+    day: datetime.date
+    advanced: int = 0
+    overdue: int = 0
+    returned: int = 0
+    batches: int = 0
+    longest_batch: float = 0.0
+    elapsed: float = 0.0
+    already_done: bool = False
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def clock_fields(status, day=None):
+    """SET fragment and params that start (Dirental) or clear the clock of one car."""
+    if status == "Dirental":
+        return "rented_on=%s, days_out=0, overdue=0", ((day or datetime.date.today()).isoformat(),)
+    return "rented_on=NULL, days_out=0, overdue=0", ()
+
+
+# ---------- Setup ----------
+def ensure_rental_clock(conn):
+    cursor = conn.cursor()
+    cursor.execute(CLOCK_DDL)
+    conn.commit()
+    missing = [(name, ddl) for name, ddl in CLOCK_COLUMNS if name not in table_columns(conn, "mobil_rental")]
+    if missing:
+        if dialect_of(conn) == "sqlite":
+            for name, ddl in missing:
+                cursor.execute(f"ALTER TABLE mobil_rental ADD COLUMN {name} {ddl}")
+        else:
+            cursor.execute("ALTER TABLE mobil_rental " + ", ".join(f"ADD COLUMN {n} {d}" for n, d in missing))
+        conn.commit()
+    for name, table, columns in CLOCK_INDEXES:
+        create_index(conn, name, table, columns)
+    # the long-rental ranking now goes by days_out
+    drop_index(conn, "idx_mobil_status_days", "mobil_rental")
+    # cars already out: their running reservation says since when, otherwise from today
+    today = datetime.date.today().isoformat()
+    cursor.execute("""
+        UPDATE mobil_rental SET rented_on = (
+            SELECT MAX(r.start_date) FROM reservations r
+            WHERE r.car_id = mobil_rental.car_id AND r.status = 'aktif' AND r.start_date <= %s)
+        WHERE status = 'Dirental' AND rented_on IS NULL
+    """, (today,))
+    cursor.execute("UPDATE mobil_rental SET rented_on = %s WHERE status = 'Dirental' AND rented_on IS NULL", (today,))
+    cursor.execute("DELETE FROM fleet_top WHERE metric = 'current_rental_days'")
+    cursor.execute("DELETE FROM fleet_summary_meta WHERE name = 'top_floor:current_rental_days'")
+    # the summary was built before days_out existed (migration 2); start its buffer here
+    rebuild_top(cursor, "days_out")
+    conn.commit()
+    advance_clock(conn)
+
+
+# ---------- Clock ----------
+def _days_sql(conn):
+    # whole days from rented_on to the clock day (%s); a car without rented_on starts today
+    if dialect_of(conn) == "sqlite":
+        return "CAST(julianday(%s) - julianday(COALESCE(rented_on, %s)) AS INTEGER)"
+    return "DATEDIFF(%s, COALESCE(rented_on, %s))"
+
+
+def _clock_row(cursor, day):
+    cursor.execute("SELECT finished_at, last_car_id, advanced FROM rental_clock WHERE day=%s", (day.isoformat(),))
+    return cursor.fetchone()
+
+
+def _overdue_by_type(cursor, batch, params):
+    # locking read: a return cannot slip in between the counts before and after the UPDATE
+    cursor.execute(f"SELECT car_type FROM mobil_rental WHERE {batch} AND overdue = 1 FOR UPDATE", params)
+    counts = {}
+    for (car_type,) in cursor.fetchall():
+        counts[car_type] = counts.get(car_type, 0) + 1
+    return counts
+
+
+def advance_clock(conn, day=None, batch_size=BATCH_SIZE, progress=None, pause=BATCH_PAUSE):
+    """Bring days_out and overdue of every rented car to `day` (default today); returns a ClockReport."""
+    day = day or datetime.date.today()
+    report = ClockReport(day)
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    row = _clock_row(cursor, day)
+    if row is not None and row[0] is not None:
+        report.already_done = True
+        report.advanced = row[2]
+    else:
+        if row is None:
+            cursor.execute("INSERT INTO rental_clock (day, started_at) VALUES (%s,%s)", (day.isoformat(), _now()))
+            conn.commit()
+            last = ""
+        else:
+            last, report.advanced = row[1], row[2]
+        days = _days_sql(conn)
+        update = (f"UPDATE mobil_rental SET days_out = {days}, "
+                  f"overdue = CASE WHEN {days} > current_rental_days THEN 1 ELSE 0 END, "
+                  f"rented_on = COALESCE(rented_on, %s) WHERE ")
+        stamp = (day.isoformat(),) * 5
+        # the fleet summary counts overdue cars from migration 8 on (which counts them from scratch)
+        counted = "overdue_count" in table_columns(conn, "fleet_summary")
+        conn.commit()
+        while True:
+            conn.start_transaction()
+            # the batch ends at the batch_size-th rented car after the last one done
+            cursor.execute("SELECT car_id FROM mobil_rental WHERE status = 'Dirental' AND car_id > %s "
+                           "ORDER BY car_id LIMIT 1 OFFSET %s", (last, batch_size - 1))
+            end = cursor.fetchone()
+            end = end[0] if end else None
+            batch = "status = 'Dirental' AND car_id > %s" + ("" if end is None else " AND car_id <= %s")
+            params = (last,) if end is None else (last, end)
+            batch_started = time.perf_counter()
+            before = _overdue_by_type(cursor, batch, params) if counted else {}
+            cursor.execute(update + batch, stamp + params)
+            changed = cursor.rowcount
+            if counted:
+                after = _overdue_by_type(cursor, batch, params)
+                apply_overdue_changes(conn, {t: after.get(t, 0) - before.get(t, 0) for t in set(before) | set(after)})
+            cursor.execute("UPDATE rental_clock SET last_car_id=%s, advanced=advanced+%s WHERE day=%s",
+                           (end or last, changed, day.isoformat()))
+            conn.commit()
+            report.batches += 1
+            report.advanced += changed
+            report.longest_batch = max(report.longest_batch, time.perf_counter() - batch_started)
+            if progress:
+                progress(report)
+            if end is None:
+                break
+            last = end
+            time.sleep(pause)
+        rebuild_top(cursor, "days_out")
+        conn.commit()
+    cursor.execute("SELECT COUNT(*) FROM mobil_rental WHERE status = 'Dirental' AND overdue = 1")
+    report.overdue = cursor.fetchone()[0]
+    if not report.already_done:
+        cursor.execute("UPDATE rental_clock SET finished_at=%s, overdue=%s WHERE day=%s",
+                       (_now(), report.overdue, day.isoformat()))
+        conn.commit()
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def overdue_cars(conn, grace_days=0, after="", limit=100):
+    """Overdue rented cars more than grace_days past their booked length, in car_id order."""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT car_id, car_model, rented_on, current_rental_days, days_out FROM mobil_rental "
+                   "WHERE status = 'Dirental' AND overdue = 1 AND car_id > %s "
+                   "AND days_out > current_rental_days + %s ORDER BY car_id LIMIT %s", (after, grace_days, limit))
+    return cursor.fetchall()
+
+
+def auto_return(conn, report, grace_days=0, batch_size=500):
+    """Return every car more than grace_days overdue; adds the count to report.returned."""
+    import rental_system
+
+    last = ""
+    while True:
+        cars = overdue_cars(conn, grace_days, last, batch_size)
+        conn.commit()
+        for car in cars:
+            try:
+                rental_system.return_car(conn, car["car_id"], CLOCK_SESSION)
+                report.returned += 1
+            except (rental_system.RentalConflictError, rental_system.CarNotFoundError):
+                # returned or removed by hand in the meantime
+                pass
+        if len(cars) < batch_size:
+            break
+        last = cars[-1]["car_id"]
+    cursor = conn.cursor()
+    cursor.execute("UPDATE rental_clock SET returned=returned+%s WHERE day=%s", (report.returned, report.day.isoformat()))
+    cursor.execute("SELECT COUNT(*) FROM mobil_rental WHERE status = 'Dirental' AND overdue = 1")
+    report.overdue = cursor.fetchone()[0]
+    conn.commit()
+    return report
+
+
+def run_clock(conn, day=None, auto_return_cars=False, grace_days=0, batch_size=BATCH_SIZE, progress=None):
+    report = advance_clock(conn, day, batch_size, progress)
+    if auto_return_cars:
+        auto_return(conn, report, grace_days)
+    return report
+
+
+def describe_clock(report):
+    if report.already_done:
+        head = f"Jam rental {report.day} sudah dijalankan hari ini ({report.advanced:,} mobil)"
+    else:
+        head = (f"Jam rental {report.day}: {report.advanced:,} mobil diperbarui dalam {report.batches} batch, "
+                f"{report.elapsed:.2f} s (batch terlama {report.longest_batch * 1000:.0f} ms)")
+    tail = f", {report.returned} dikembalikan otomatis" if report.returned else ""
+    return f"{head}; {report.overdue:,} mobil terlambat{tail}."
+
+
+# ---------- CLI / daemon ----------
+def _seconds_until(at):
+    now = datetime.datetime.now()
+    target = datetime.datetime.combine(now.date(), at)
+    if target <= now:
+        target += datetime.timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def main():
+    import rental_system
+
+    parser = argparse.ArgumentParser(description="Jam rental harian: hari berjalan, tanda terlambat, pengembalian otomatis")
+    parser.add_argument("--auto-return", action="store_true", help="kembalikan mobil yang terlambat")
+    parser.add_argument("--grace", type=int, default=0, help="hari toleransi sebelum dikembalikan otomatis")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--daemon", action="store_true", help="tetap berjalan, sekali sehari pada --at")
+    parser.add_argument("--at", default="00:05", help="jam jalan mode daemon (HH:MM)")
+    parser.add_argument("--overdue", action="store_true", help="hanya tampilkan mobil yang terlambat")
+    args = parser.parse_args()
+    rental_system.init_schema()
+
+    if args.overdue:
+        with rental_system.connect_db() as conn:
+            cars = overdue_cars(conn, limit=1000)
+        if not cars:
+            print("Tidak ada mobil yang terlambat.")
+            return
+        rental_system.print_table(cars)
+        return
+    at = datetime.time.fromisoformat(args.at)
+    while True:
+        with rental_system.connect_db() as conn:
+            report = run_clock(conn, auto_return_cars=args.auto_return, grace_days=args.grace,
+                               batch_size=args.batch_size)
+        print(describe_clock(report), flush=True)
+        if not args.daemon:
+            break
+        time.sleep(_seconds_until(at))
+
+
+if __name__ == "__main__":
+    main()
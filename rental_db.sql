@@ -5,17 +5,21 @@ CREATE DATABASE rental_db;
 USE rental_db;
 
 CREATE TABLE IF NOT EXISTS mobil_rental (
-    car_id VARCHAR(10) PRIMARY KEY,
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    car_id VARCHAR(10) NOT NULL UNIQUE,
     car_model VARCHAR(100) NOT NULL,
     car_type VARCHAR(50) NOT NULL,
-    price_per_day FLOAT NOT NULL,
+    price_per_day DECIMAL(12,2) NOT NULL,
     status ENUM('Tersedia', 'Dirental') NOT NULL,
     current_rental_days INT NOT NULL DEFAULT 0,
-    total_rental_count INT NOT NULL DEFAULT 0
+    total_rental_count INT NOT NULL DEFAULT 0,
+    rented_on DATE NULL,
+    days_out INT NOT NULL DEFAULT 0,
+    overdue TINYINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS users (
-    user_id VARCHAR(6) PRIMARY KEY,
+    user_id VARCHAR(20) PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
     email VARCHAR(100) UNIQUE NOT NULL,
     password VARCHAR(100) NOT NULL,
@@ -1,12 +1,29 @@
-import mysql.connector
-from tabulate import tabulate
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-import pandas as pd
+# pandas, numpy, tabulate and matplotlib are imported where they are used:
+# together they take most of a second to load, and the menus do not need them
 import getpass
+import heapq
 import re
 import datetime
 import os
+import uuid
+from contextlib import nullcontext
+from itertools import chain
+import instrumentation
+from instrumentation import span, timed
+from storage import create_backend
+from car_catalog import CAR_FIELDS, CAR_OPTIONS, MIN_PRICE, validate_car
+from id_sequence import allocate_ids
+from car_search import apply_search_change, search_cars
+from fleet_import import check_source, import_fleet, print_report
+from event_log import build_stacks, describe_event, fetch_event, log_event, session_log, state_after, state_before, state_matches
+from reservations import ReservationCalendar, ReservationConflictError, apply_reservation_change, available_cars, check_period, insert_reservation, MAX_RESERVATION_DAYS
+from fleet_summary import apply_car_change, load_fleet_partial, merge_fleet_partials, read_car
+from charts import CHART_NAMES, chart_data, draw_chart, merge_chart_data, render_charts, snapshot_chart_data, specs_from
+from fleet_snapshot import SnapshotCache, describe_stats as describe_snapshot_stats
+from fleet_export import FORMATS as EXPORT_FORMATS, ExportJob, describe_report, export_sharded
+from fleet_shards import ShardsUnavailableError, create_shards, describe_errors, merge_pages, merge_ranked, parse_sqlite_branches
+from migrations import ensure_support_tables, ensure_user_tables, migrate
+from rental_clock import clock_fields
 
 # ---------- Configuration ----------
 DB_CONFIG = {
@@ -14,27 +31,339 @@ DB_CONFIG = {
     "port": 3306,
     "user": "dika",
     "password": "admin",
-    "database": "rental_db"
+    "database": "rental_db",
+    # read replicas for manager reports; each entry overrides keys of the primary, e.g. {"port": 3307}
+    "replicas": []
 }
 
-# Global for undo (one-level)
-LAST_ACTION = None  # dict storing reverse operation details
+# Storage backend: "mysql" (DB_CONFIG) or "sqlite" (embedded, SQLITE_CONFIG; path may be ":memory:")
+DB_BACKEND = os.environ.get("RENTAL_DB_BACKEND", "mysql")
+SQLITE_CONFIG = {
+    "path": os.environ.get("RENTAL_SQLITE_PATH", "rental_db.sqlite3"),
+    # read-only replica files, kept in sync from the primary by an outside process
+    "replicas": [p for p in os.environ.get("RENTAL_SQLITE_REPLICAS", "").split(",") if p]
+}
+
+# Read routing when replicas are configured: policy "round_robin" or "least_latency",
+# replicas more than max_lag seconds behind are skipped (reads go to the primary)
+REPLICA_CONFIG = {
+    "policy": os.environ.get("RENTAL_READ_POLICY", "round_robin"),
+    "max_lag": 5.0,
+    "heartbeat_interval": 1.0
+}
+
+# Connection pool settings (size = max open connections, timeout = seconds to wait for a free one)
+POOL_CONFIG = {
+    "size": 5,
+    "timeout": 10.0
+}
+
+# In-process columnar copy of mobil_rental for listings, car types and charts (fleet_snapshot);
+# re-validated against the database every ttl seconds, reloaded after max_age seconds
+SNAPSHOT_CONFIG = {
+    "enabled": os.environ.get("RENTAL_SNAPSHOT", "1") != "0",
+    "ttl": 2.0,
+    "max_age": 300.0
+}
+
+# This branch and the other branches' databases (fleet_shards). This branch is the home shard:
+# it holds the users and numbers new cars with its car_prefix. Cars are routed by the prefix of
+# their car_id (MB017 -> "MB"), so every branch needs its own. timeout = seconds a branch may
+# take before a fleet-wide read goes on without it.
+BRANCH_CONFIG = {
+    "name": os.environ.get("RENTAL_BRANCH", "Pusat"),
+    "car_prefix": os.environ.get("RENTAL_CAR_PREFIX", "M"),
+    "timeout": 5.0
+}
+BRANCHES = [
+    # {"name": "Bandung", "car_prefix": "MB", "backend": "mysql", "config": {**DB_CONFIG, "host": "10.0.2.15"}},
+] + parse_sqlite_branches(os.environ.get("RENTAL_SQLITE_BRANCHES", ""))  # "Bandung:MB:bandung.sqlite3,..."
+
+# Rows per chunk for streamed query results (iter_query_chunks)
+QUERY_CHUNK_SIZE = 10000
+
+# Column types for mobil_rental results, so every chunk has the same dtypes
+COLUMN_DTYPES = {
+    "price_per_day": "float64",
+    "current_rental_days": "int64",
+    "total_rental_count": "int64"
+}
+
+# Rows per page in the fleet listings (show_all_cars, filter, customer availability)
+PAGE_SIZE = 20
+
+# Maximum number of ranked results for the customer search
+SEARCH_LIMIT = 50
 
 # ---------- Database helpers ----------
+_BACKEND = None
+_SHARDS = None
+# per branch name
+_CALENDARS = {}
+_SNAPSHOTS = {}
+
+def get_backend():
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = create_backend(DB_BACKEND, mysql_config=DB_CONFIG, sqlite_config=SQLITE_CONFIG,
+                                  pool_config=POOL_CONFIG, replica_config=REPLICA_CONFIG)
+    return _BACKEND
+
+def set_backend(backend):
+    # swap the storage backend (e.g. an in-memory SQLite one for benchmarks)
+    global _BACKEND, _SHARDS
+    if _BACKEND is not None and _BACKEND is not backend:
+        _BACKEND.close()
+    if _SHARDS is not None:
+        _SHARDS.close()
+    _BACKEND = backend
+    _SHARDS = None
+    _CALENDARS.clear()
+    _SNAPSHOTS.clear()
+
+def get_shards():
+    # this branch and the configured ones (fleet_shards.ShardSet); just this one without BRANCHES
+    global _SHARDS
+    if _SHARDS is None:
+        _SHARDS = create_shards(get_backend(), BRANCH_CONFIG, BRANCHES, POOL_CONFIG, REPLICA_CONFIG)
+    return _SHARDS
+
+def set_shards(shards):
+    # swap the whole branch set (e.g. local SQLite branches for checks); its home backend becomes the backend
+    global _SHARDS
+    set_backend(shards.home.backend)
+    _SHARDS = shards
+
 def connect_db():
-    return mysql.connector.connect(**DB_CONFIG)
+    # usage: with connect_db() as conn: ...  (connection goes back to the pool afterwards)
+    return get_backend().connection()
 
-def fetch_all_to_df(query, params=None):
-    conn = connect_db()
-    cursor = conn.cursor(dictionary=True)
+def connect_read(session=None):
+    # read-only reporting: a replica that is recent enough and has this session's writes, else the primary
+    return get_backend().read_connection(session)
+
+def shard_connection(shard, conn=None, session=None, replica=False):
+    # a connection to one branch; conn (held by the caller, to this branch) is reused for the home shard.
+    # replica: a read replica of that branch where connect_read would use one
+    if shard.home and conn is not None:
+        return nullcontext(conn)
+    if replica:
+        return shard.backend.read_connection(session)
+    return shard.backend.connection()
+
+def connect_car(car_id, conn=None):
+    # usage: with connect_car(car_id, conn) as conn: ...  (the branch that owns the car)
+    return shard_connection(get_shards().shard_for(car_id), conn)
+
+def commit_write(conn, session, old=None, new=None, event_id=None, car_id=None):
+    # commit, then keep the session's reads on the primary until the replicas have the write,
+    # and fold the car change (if any) into this process's fleet snapshot of the car's branch
+    conn.commit()
+    car_id = car_id or (new or old or {}).get("car_id")
+    shard = get_shards().shard_for(car_id) if car_id else get_shards().home
+    shard.backend.note_write(session)
+    cache = _SNAPSHOTS.get(shard.name)
+    if (old is not None or new is not None) and cache is not None:
+        cache.patch(old, new, event_id)
+
+def get_snapshot(shard=None):
+    # the fleet snapshot cache of a branch (default: this one) in this process, or None when disabled
+    shard = shard or get_shards().home
+    if shard.name not in _SNAPSHOTS and SNAPSHOT_CONFIG["enabled"]:
+        _SNAPSHOTS[shard.name] = SnapshotCache(shard.backend.connection, SNAPSHOT_CONFIG["ttl"], SNAPSHOT_CONFIG["max_age"])
+    return _SNAPSHOTS.get(shard.name)
+
+def current_snapshot(conn=None, shard=None):
+    # a current FleetSnapshot, or None: read the database (a load may have started in the background).
+    # Pass conn when holding one (to that branch), so the version check does not need a second connection
+    cache = get_snapshot(shard)
+    return cache.get(conn) if cache is not None else None
+
+def get_calendar(shard=None):
+    # in-memory reservation index of a branch (default: this one), synced from its database on use
+    shard = shard or get_shards().home
+    if shard.name not in _CALENDARS:
+        _CALENDARS[shard.name] = ReservationCalendar()
+    return _CALENDARS[shard.name]
+
+def pool_stats():
+    return get_backend().pool.snapshot()
+
+def replica_status():
+    # lag, latency and read count per replica; empty without replicas
+    backend = get_backend()
+    return backend.replica_status() if hasattr(backend, "replica_status") else []
+
+def iter_query_chunks(query, params=None, chunk_size=None, conn=None):
+    # stream a result set as DataFrame chunks of at most chunk_size rows;
+    # an empty result still yields one empty (but typed) chunk.
+    # Uses conn when given, otherwise checks one out of the pool for the duration.
+    if conn is None:
+        with connect_db() as conn:
+            yield from iter_query_chunks(query, params, chunk_size, conn)
+        return
+    import pandas as pd
+    chunk_size = chunk_size or QUERY_CHUNK_SIZE
+    cursor = conn.cursor()
     cursor.execute(query, params or ())
-    rows = cursor.fetchall()
     cols = [d[0] for d in cursor.description] if cursor.description else []
-    conn.close()
-    if rows:
-        return pd.DataFrame(rows)
+    dtypes = {c: t for c, t in COLUMN_DTYPES.items() if c in cols}
+    first = True
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows and not first:
+            break
+        first = False
+        yield pd.DataFrame.from_records(rows, columns=cols).astype(dtypes)
+        if len(rows) < chunk_size:
+            break
+
+@timed("fetch_all_to_df")
+def fetch_all_to_df(query, params=None, conn=None):
+    chunks = list(iter_query_chunks(query, params, conn=conn))
+    if len(chunks) == 1:
+        return chunks[0]
+    import pandas as pd
+    return pd.concat(chunks, ignore_index=True)
+
+def print_table(data):
+    # DataFrame or list of dicts as a grid; tabulate is loaded on first use
+    from tabulate import tabulate
+    print(tabulate(data, headers="keys", tablefmt="grid", showindex=False))
+
+def fetch_car(car_id):
+    with connect_car(car_id) as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT {', '.join(CAR_FIELDS)} FROM mobil_rental WHERE car_id=%s", (car_id,))
+        return cursor.fetchone()
+
+def write_car(conn, car_id, query, params, expect_status=None, session=None):
+    # run one write on mobil_rental and fold the row change into the fleet summary,
+    # search index and reservations; the caller owns the transaction (start_transaction ... commit).
+    # With expect_status the (conditional) write must hit exactly that row in that status.
+    old = read_car(conn, car_id, for_update=True)
+    if expect_status is not None:
+        if old is None:
+            raise CarNotFoundError(f"Car ID {car_id} tidak ditemukan.")
+        if old['status'] != expect_status:
+            raise RentalConflictError(f"Mobil {car_id} berstatus {old['status']}, bukan {expect_status}.")
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    if expect_status is not None and cursor.rowcount != 1:
+        raise RentalConflictError(f"Status mobil {car_id} berubah oleh transaksi lain.")
+    new = read_car(conn, car_id)
+    apply_car_change(conn, old, new)
+    apply_search_change(conn, old, new)
+    apply_reservation_change(conn, old, new, session)
+    return old, new
+
+# ---------- Rental operations ----------
+class CarNotFoundError(Exception):
+    pass
+
+class RentalConflictError(Exception):
+    pass
+
+def rent_car(conn, car_id, days, session=None):
+    # atomic: row lock + conditional UPDATE, so a car can never be rented twice
+    clock, clock_params = clock_fields('Dirental')
+    conn.start_transaction()
+    try:
+        old, new = write_car(conn, car_id,
+                             f"UPDATE mobil_rental SET status='Dirental', current_rental_days=%s, total_rental_count=total_rental_count+1, {clock} WHERE car_id=%s AND status='Tersedia'",
+                             (days,) + clock_params + (car_id,), expect_status='Tersedia', session=session)
+        event_id = log_event(conn, session, "rent", old, new)
+        commit_write(conn, session, old, new, event_id)
+    except Exception:
+        conn.rollback()
+        raise
+    return old
+
+def return_car(conn, car_id, session=None):
+    conn.start_transaction()
+    try:
+        old, new = write_car(conn, car_id,
+                             f"UPDATE mobil_rental SET status='Tersedia', current_rental_days=0, {clock_fields('Tersedia')[0]} WHERE car_id=%s AND status='Dirental'",
+                             (car_id,), expect_status='Dirental', session=session)
+        event_id = log_event(conn, session, "return", old, new)
+        commit_write(conn, session, old, new, event_id)
+    except Exception:
+        conn.rollback()
+        raise
+    return old
+
+def create_car(conn, car_model, car_type, price_per_day, session=None, car_id=None):
+    # validated against the catalog like the bulk importer; returns the new row
+    car_model, car_type, price_per_day = validate_car(car_model, car_type, price_per_day)
+    if car_id is None:
+        car_id = generate_car_id(conn)
+    conn.start_transaction()
+    try:
+        old, new = write_car(conn, car_id, """
+            INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count)
+            VALUES (%s,%s,%s,%s,'Tersedia',0,0)
+        """, (car_id, car_model, car_type, price_per_day), session=session)
+        # logged for undo
+        event_id = log_event(conn, session, "add", old, new)
+        commit_write(conn, session, old, new, event_id)
+    except Exception:
+        conn.rollback()
+        raise
+    return new
+
+def book_car(conn, car_id, start, end, session=None):
+    # a booking that starts today is an ordinary rental (the reservation comes with it);
+    # a later start only reserves the dates, the car stays as it is until then
+    check_period(start, end)
+    if start == datetime.date.today():
+        return rent_car(conn, car_id, (end - start).days, session)
+    conn.start_transaction()
+    try:
+        car = read_car(conn, car_id, for_update=True)
+        if car is None:
+            raise CarNotFoundError(f"Car ID {car_id} tidak ditemukan.")
+        insert_reservation(conn, car_id, (session or {}).get("user_id"), start, end)
+        commit_write(conn, session, car_id=car_id)
+    except Exception:
+        conn.rollback()
+        raise
+    return car
+
+def revert_event(conn, session, event, action):
+    # action "undo" moves the car from the event's after-state back to its before-state,
+    # "redo" re-applies it; refused when another session changed the car in between
+    if action == "undo":
+        expected, target = state_after(event), state_before(event)
     else:
-        return pd.DataFrame(columns=cols)
+        expected, target = state_before(event), state_after(event)
+    car_id = event['car_id']
+    conn.start_transaction()
+    try:
+        current = read_car(conn, car_id, for_update=True)
+        if not state_matches(current, expected):
+            raise RentalConflictError(f"Mobil {car_id} sudah diubah oleh transaksi lain sejak aksi tersebut.")
+        if target is None:
+            old, new = write_car(conn, car_id, "DELETE FROM mobil_rental WHERE car_id=%s", (car_id,))
+        elif expected is None:
+            rented_on = datetime.date.today().isoformat() if target['status'] == 'Dirental' else None
+            old, new = write_car(conn, car_id, """
+                INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count, rented_on)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+            """, (car_id, target['car_model'], target['car_type'], target['price_per_day'], target['status'],
+                  target['current_rental_days'], target['total_rental_count'], rented_on))
+        else:
+            # a status change (undo/redo of a rent or return) restarts or clears the rental clock
+            clock, clock_params = clock_fields(target['status']) if target['status'] != expected['status'] else ("", ())
+            old, new = write_car(conn, car_id,
+                                 f"UPDATE mobil_rental SET status=%s, current_rental_days=%s, total_rental_count=%s{', ' + clock if clock else ''} WHERE car_id=%s AND status=%s AND current_rental_days=%s AND total_rental_count=%s",
+                                 (target['status'], target['current_rental_days'], target['total_rental_count']) + clock_params +
+                                 (car_id, expected['status'], expected['current_rental_days'], expected['total_rental_count']),
+                                 expect_status=expected['status'], session=session)
+        event_id = log_event(conn, session, action, old, new, ref_event_id=event['event_id'])
+        commit_write(conn, session, old, new, event_id)
+    except Exception:
+        conn.rollback()
+        raise
 
 # ---------- Input validation helpers ----------
 def input_float(prompt, min_value=None):
@@ -71,222 +400,381 @@ def input_choice(prompt, options):
         else:
             print("Pilihan tidak valid. Pilihan yang tersedia:", ", ".join(options))
 
-# ---------- ID generator ----------
-def generate_car_id(cursor):
-    cursor.execute("SELECT car_id FROM mobil_rental ORDER BY car_id DESC LIMIT 1")
-    last = cursor.fetchone()
-    if last:
-        last_id = last[0]
-        try:
-            num = int(last_id[1:]) + 1
-        except Exception:
-            num = 1
-    else:
-        num = 1
-    return f"M{num:03d}"
-
-def generate_user_id(cursor):
-    cursor.execute("SELECT user_id FROM users ORDER BY user_id DESC LIMIT 1")
-    last = cursor.fetchone()
-    if last:
-        last_id = last[0]
+def input_date(prompt, default=None, min_value=None):
+    while True:
+        raw = input(prompt).strip()
+        if raw == "" and default is not None:
+            return default
         try:
-            num = int(last_id[1:]) + 1
-        except Exception:
-            num = 1
+            val = datetime.date.fromisoformat(raw)
+        except ValueError:
+            print("Format tanggal harus YYYY-MM-DD. Coba lagi.")
+            continue
+        if min_value is not None and val < min_value:
+            print(f"Tanggal harus >= {min_value}. Coba lagi.")
+            continue
+        return val
+
+# ---------- ID generator ----------
+def generate_car_id(conn):
+    # new cars belong to this branch
+    return allocate_ids(conn, "car", prefix=BRANCH_CONFIG["car_prefix"])[0]
+
+def generate_user_id(conn):
+    return allocate_ids(conn, "user")[0]
+
+# ---------- Paginated listing ----------
+def fetch_car_page(where="1=1", params=(), anchor=None, direction="next", page_size=None, conn=None):
+    # keyset pagination on car_id: the cost of a page does not depend on its position.
+    # direction: "next" (car_id > anchor), "prev" (car_id < anchor), "jump" (car_id >= anchor)
+    page_size = page_size or PAGE_SIZE
+    params = tuple(params)
+    if anchor is None:
+        cond, order = "", "ASC"
+    elif direction == "prev":
+        cond, order, params = " AND car_id < %s", "DESC", params + (anchor,)
+    elif direction == "jump":
+        cond, order, params = " AND car_id >= %s", "ASC", params + (anchor,)
     else:
-        num = 1
-    return f"U{num:03d}"
+        cond, order, params = " AND car_id > %s", "ASC", params + (anchor,)
+    query = f"SELECT {', '.join(CAR_FIELDS)} FROM mobil_rental WHERE ({where}){cond} ORDER BY car_id {order} LIMIT %s"
+    df = fetch_all_to_df(query, params + (page_size + 1,), conn)
+    has_more = len(df) > page_size
+    df = df.head(page_size)
+    if order == "DESC":
+        df = df.iloc[::-1].reset_index(drop=True)
+    return df, has_more
 
-# ---------- Manager functions ----------
-def show_all_cars():
-    df = fetch_all_to_df("SELECT * FROM mobil_rental ORDER BY car_id")
+def car_filter_sql(filters):
+    # {"status": ..., "car_type": ...} as the WHERE fragment and params of fetch_car_page
+    if not filters:
+        return "1=1", ()
+    return " AND ".join(f"{field} = %s" for field in filters), tuple(filters.values())
+
+# ---------- Fleet-wide reads (every branch, fleet_shards) ----------
+# Each returns its result and {branch: reason} for the branches that are missing from it.
+# conn, when given, is a connection to this branch and is used for its part.
+def car_page(filters=None, anchor=None, direction="next", page_size=None, session=None, conn=None, replica=False):
+    # one keyset page of the whole fleet: every branch's page, k-way merged on car_id
+    page_size = page_size or PAGE_SIZE
+    where, params = car_filter_sql(filters)
+
+    def shard_page(shard):
+        # from the branch's fleet snapshot when it is current, otherwise one query;
+        # the version check needs the primary, a lagging replica would look like a stale snapshot
+        snapshot = current_snapshot(conn if shard.home and not replica else None, shard)
+        if snapshot is not None:
+            return snapshot.page(filters, anchor, direction, page_size)
+        with shard_connection(shard, conn, session, replica) as c:
+            return fetch_car_page(where, params, anchor, direction, page_size, c)
+
+    gathered = get_shards().gather(shard_page)
+    # without an anchor every direction is the first page
+    df, has_more = merge_pages(gathered.results.values(), direction if anchor is not None else "next", page_size)
+    return df, has_more, gathered.errors
+
+def search_fleet(keyword, status=None, min_price=None, max_price=None, limit=None, conn=None):
+    # the best `limit` matches of every branch, merged on score
+    limit = limit or SEARCH_LIMIT
+
+    def shard_search(shard):
+        with shard_connection(shard, conn) as c:
+            return search_cars(c, keyword, status, min_price, max_price, limit=limit)
+
+    gathered = get_shards().gather(shard_search)
+    return merge_ranked(gathered.results.values(), limit, key=lambda car: -car['score']), gathered.errors
+
+def available_fleet(start, end, car_type=None, limit=None, conn=None):
+    # cars free over [start, end): this branch's first, then the other branches' in order
+    limit = limit or SEARCH_LIMIT
+    check_period(start, end)
+
+    def shard_available(shard):
+        with shard_connection(shard, conn) as c:
+            return available_cars(c, get_calendar(shard), start, end, car_type, limit)
+
+    gathered = get_shards().gather(shard_available)
+    return list(chain.from_iterable(gathered.results.values()))[:limit], gathered.errors
+
+def fleet_car_types(session=None):
+    def shard_types(shard):
+        snapshot = current_snapshot(shard=shard)
+        if snapshot is not None:
+            return snapshot.car_types()
+        with shard_connection(shard, session=session, replica=True) as c:
+            types_df = fetch_all_to_df("SELECT DISTINCT car_type FROM mobil_rental", conn=c)
+        return types_df['car_type'].tolist() if not types_df.empty else []
+
+    gathered = get_shards().gather(shard_types)
+    return list(dict.fromkeys(chain.from_iterable(gathered.results.values()))), gathered.errors
+
+def fleet_stats(session=None, conn=None):
+    # manager report: every branch's partial aggregates, added up (fleet_summary.merge_fleet_partials)
+    def shard_partial(shard):
+        with shard_connection(shard, conn, session, replica=True) as c:
+            return load_fleet_partial(c)
+
+    gathered = get_shards().gather(shard_partial)
+    return merge_fleet_partials(gathered.results.values()), gathered.errors
+
+def fleet_chart_specs(session=None):
+    # every chart from aggregates (every branch's snapshot or chart_data, added up), never from raw rows
+    def shard_chart_data(shard):
+        snapshot = current_snapshot(shard=shard)
+        if snapshot is not None:
+            return snapshot_chart_data(snapshot)
+        with shard_connection(shard, session=session, replica=True) as c:
+            return chart_data(c)
+
+    gathered = get_shards().gather(shard_chart_data)
+    return specs_from(merge_chart_data(gathered.results.values())), gathered.errors
+
+def export_all(stats, path, fmt=None, session=None, progress=None, conn=None, **options):
+    # every branch's cars streamed into one file (fleet_export.export_sharded); report.missing names the gaps
+    return export_sharded(stats, path, get_shards(), fmt, progress=progress,
+                          connect=lambda shard: shard_connection(shard, conn, session, replica=True), **options)
+
+def session_event(session, action, conn=None):
+    # the event the session's next "undo" / "redo" applies to and its stack depth, or (None, 0).
+    # The branches' logs are merged by created_at, as one action anywhere ends the redo history everywhere
+    # (actions on two branches within the same second cannot be told apart: this branch's count as older).
+    # With a branch missing the history is incomplete and ShardsUnavailableError is raised
+    shards = get_shards()
+
+    def shard_log(shard):
+        with shard_connection(shard, conn) as c:
+            return [(str(created_at), (shard.name, event_id), act, ref and (shard.name, ref))
+                    for event_id, created_at, act, ref in session_log(c, session['session_id'])]
+
+    gathered = shards.gather(shard_log)
+    if gathered.errors:
+        raise ShardsUnavailableError(f"Riwayat aksi tidak lengkap ({describe_errors(gathered.errors)})")
+    merged = heapq.merge(*gathered.results.values(), key=lambda entry: entry[0])
+    undo_stack, redo_stack = build_stacks(entry[1:] for entry in merged)
+    stack = undo_stack if action == "undo" else redo_stack
+    if not stack:
+        return None, 0
+    name, event_id = stack[-1]
+    with shard_connection(shards.by_name(name), conn) as c:
+        return fetch_event(c, event_id), len(stack)
+
+def report_unavailable(errors):
+    # a fleet-wide result without some branches says so
+    if errors:
+        print(f"Peringatan: data cabang berikut tidak ikut ditampilkan: {describe_errors(errors)}")
+
+def branch_status():
+    # per branch: prefix, database, timeout and query/error/timeout counts
+    return get_shards().status()
+
+def browse_cars(filters=None, empty_message="Data tidak ditemukan.", session=None, replica=False):
+    page_size = PAGE_SIZE
+
+    def fetch_page(anchor=None, direction="next"):
+        page, more, errors = car_page(filters, anchor, direction, page_size, session, replica=replica)
+        report_unavailable(errors)
+        return page, more
+
+    df, has_next = fetch_page()
     if df.empty:
-        print("Tidak ada data mobil.")
+        print(empty_message)
         return
-    print(tabulate(df, headers="keys", tablefmt="grid", showindex=False))
+    has_prev = False
+    while True:
+        print_table(df)
+        print(f"Menampilkan {df['car_id'].iloc[0]} - {df['car_id'].iloc[-1]} ({len(df)} mobil, {page_size} per halaman)")
+        print("[n] berikutnya  [p] sebelumnya  [j] lompat ke Car ID  [s] ubah ukuran halaman  [q] selesai")
+        nav = input("Navigasi: ").strip().lower()
+        if nav == "n":
+            if not has_next:
+                print("Sudah di halaman terakhir.")
+                continue
+            page, more = fetch_page(df['car_id'].iloc[-1], "next")
+            if page.empty:
+                print("Sudah di halaman terakhir.")
+                continue
+            df, has_next, has_prev = page, more, True
+        elif nav == "p":
+            if not has_prev:
+                print("Sudah di halaman pertama.")
+                continue
+            page, more = fetch_page(df['car_id'].iloc[0], "prev")
+            if page.empty:
+                print("Sudah di halaman pertama.")
+                has_prev = False
+                continue
+            df, has_prev, has_next = page, more, True
+        elif nav == "j":
+            car_id = input("Lompat ke Car ID (contoh M050): ").strip().upper()
+            page, more = fetch_page(car_id, "jump")
+            if page.empty:
+                print("Tidak ada mobil dengan Car ID tersebut atau sesudahnya.")
+                continue
+            df, has_next, has_prev = page, more, True
+        elif nav == "s":
+            page_size = input_int("Jumlah baris per halaman: ", min_value=1, max_value=500)
+            df, has_next = fetch_page(df['car_id'].iloc[0], "jump")
+        elif nav == "q":
+            break
+        else:
+            print("Pilihan tidak valid.")
+
+# ---------- Manager functions ----------
+# reports read through connect_read: on a replica when one is configured and current
+def show_all_cars(user=None):
+    browse_cars(empty_message="Tidak ada data mobil.", session=user, replica=True)
 
-def filter_cars():
+def filter_cars(user=None):
     print("\nFilter berdasarkan:")
     print("1. Jenis mobil (car_type)")
     print("2. Status (Tersedia / Dirental)")
     choice = input_choice("Pilih opsi (1/2): ", ["1", "2"])
-    conn = connect_db()
-    cursor = conn.cursor(dictionary=True)
     if choice == "1":
-        types_df = fetch_all_to_df("SELECT DISTINCT car_type FROM mobil_rental")
-        types = types_df['car_type'].tolist() if not types_df.empty else []
+        types, errors = fleet_car_types(user)
+        report_unavailable(errors)
         if not types:
             print("Tidak ada data jenis mobil.")
-            conn.close()
             return
         print("Tipe yang tersedia:", ", ".join(types))
         car_type = input_choice("Masukkan jenis mobil: ", types)
-        cursor.execute("SELECT * FROM mobil_rental WHERE car_type = %s", (car_type,))
+        filters = {"car_type": car_type}
     else:
         status = input_choice("Masukkan status (Tersedia/Dirental): ", ["Tersedia", "Dirental"])
-        cursor.execute("SELECT * FROM mobil_rental WHERE status = %s", (status,))
-    rows = cursor.fetchall()
-    conn.close()
-    if rows:
-        print(tabulate(rows, headers="keys", tablefmt="grid"))
-    else:
-        print("Data tidak ditemukan.")
+        filters = {"status": status}
+    browse_cars(filters, session=user, replica=True)
 
-def add_car():
-    global LAST_ACTION
-    conn = connect_db()
-    cursor = conn.cursor()
-    car_id = generate_car_id(cursor)
+def add_car(user):
+    with connect_db() as conn:
+        car_id = generate_car_id(conn)
     print(f"ID mobil baru: {car_id}")
 
-    car_options = [
-        ("Toyota Avanza", "MPV"),
-        ("Daihatsu Xenia", "MPV"),
-        ("Honda Brio", "Hatchback"),
-        ("Suzuki Ertiga", "MPV"),
-        ("Mitsubishi Pajero", "SUV"),
-        ("Toyota Fortuner", "SUV"),
-        ("Honda Jazz", "Hatchback"),
-        ("Toyota Yaris", "Hatchback"),
-        ("Honda HRV", "SUV"),
-        ("Toyota Innova", "MPV"),
-        ("Honda Civic", "Sedan"),
-        ("Toyota Camry", "Sedan"),
-        ("Mazda CX-5", "SUV"),
-        ("Nissan X-Trail", "SUV"),
-        ("Mitsubishi Xpander", "MPV"),
-    ]
-
     print("\nPilih mobil dari daftar berikut:")
-    for i, (model, tipe) in enumerate(car_options, 1):
+    for i, (model, tipe) in enumerate(CAR_OPTIONS, 1):
         print(f"{i}. {model} ({tipe})")
 
-    idx = input_int("Pilih nomor mobil: ", 1, len(car_options))
-    car_model, car_type = car_options[idx-1]
+    idx = input_int("Pilih nomor mobil: ", 1, len(CAR_OPTIONS))
+    car_model, car_type = CAR_OPTIONS[idx-1]
 
-    price_per_day = input_float("Masukkan harga sewa per hari: Rp ", min_value=0)
-
-    status = "Tersedia"
-    current_rental_days = 0
-    total_rental_count = 0
+    price_per_day = input_float("Masukkan harga sewa per hari: Rp ", min_value=MIN_PRICE)
 
     # confirm
     print("\nRingkasan data mobil yang akan ditambahkan:")
-    print(f"ID: {car_id}, Model: {car_model}, Type: {car_type}, Price/day: Rp {price_per_day:,}, Status: {status}")
+    print(f"ID: {car_id}, Model: {car_model}, Type: {car_type}, Price/day: Rp {price_per_day:,}, Status: Tersedia")
     confirm = input_choice("Konfirmasi tambah mobil? (y/n): ", ["y","n"])
     if confirm == "n":
         print("Penambahan mobil dibatalkan.")
-        conn.close()
         return
 
-    cursor.execute("""
-        INSERT INTO mobil_rental (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count)
-        VALUES (%s,%s,%s,%s,%s,%s,%s)
-    """, (car_id, car_model, car_type, price_per_day, status, current_rental_days, total_rental_count))
-    conn.commit()
+    with connect_db() as conn:
+        create_car(conn, car_model, car_type, price_per_day, session=user, car_id=car_id)
 
-    # store undo info
-    LAST_ACTION = {"action":"insert_car", "car_id":car_id}
-    conn.close()
     print(f"Mobil {car_model} ({car_type}) berhasil ditambahkan dengan ID {car_id}! (Anda bisa undo terakhir jika perlu)")
 
+def import_cars(user):
+    path = input("Masukkan path file CSV/Excel berisi data mobil: ").strip()
+    if not os.path.isfile(path):
+        print("File tidak ditemukan.")
+        return
+    try:
+        check_source(path)
+    except ValueError as e:
+        print(e)
+        return
+    batch_size = input_int("Ukuran batch insert (mis. 1000): ", min_value=1)
+    # imported cars belong to this branch
+    report = import_fleet(path, connect_db, batch_size, session=user, car_prefix=BRANCH_CONFIG["car_prefix"])
+    get_backend().note_write(user)
+    cache = _SNAPSHOTS.get(get_shards().home.name)
+    if cache is not None:
+        cache.invalidate()
+    print_report(report, path)
+
 # ---------- Statistics & export ----------
-def show_statistics():
-    conn = connect_db()
-    cursor = conn.cursor(dictionary=True)
+def show_statistics(user=None):
+    stats, errors = fleet_stats(user)
     print("\n=== Statistik Mobil Rental (Detail) ===")
+    report_unavailable(errors)
+    print(f"Total mobil di fleet: {stats.total}")
+
+    for status, jumlah in stats.status_counts.items():
+        print(f"{status}: {jumlah} mobil")
+
+    if stats.total > 0:
+        print(f"Persentase Tersedia: {stats.available/stats.total*100:.1f}% | Persentase Dirental: {stats.rented/stats.total*100:.1f}%")
+
+    if stats.avg_price is not None:
+        print(f"Rata-rata harga sewa per hari (seluruh fleet): Rp {stats.avg_price:,.0f}")
+
+    for t in stats.by_type:
+        print(f"- {t.car_type}: rata-rata Rp {t.avg_price:,.0f} ({t.count} unit)")
 
-    cursor.execute("SELECT COUNT(*) as cnt FROM mobil_rental")
-    total = cursor.fetchone()['cnt'] or 0
-    print(f"Total mobil di fleet: {total}")
-
-    cursor.execute("SELECT status, COUNT(*) as jumlah FROM mobil_rental GROUP BY status")
-    rows = cursor.fetchall()
-    available = 0
-    rented = 0
-    for row in rows:
-        print(f"{row['status']}: {row['jumlah']} mobil")
-        if row['status'] == 'Tersedia':
-            available = row['jumlah']
-        elif row['status'] == 'Dirental':
-            rented = row['jumlah']
-
-    if total > 0:
-        print(f"Persentase Tersedia: {available/total*100:.1f}% | Persentase Dirental: {rented/total*100:.1f}%")
-
-    cursor.execute("SELECT AVG(price_per_day) as avg_price FROM mobil_rental")
-    avg_price = cursor.fetchone()['avg_price']
-    if avg_price is not None:
-        print(f"Rata-rata harga sewa per hari (seluruh fleet): Rp {avg_price:,.0f}")
-
-    cursor.execute("SELECT car_type, AVG(price_per_day) as avg_type_price, COUNT(*) as cnt FROM mobil_rental GROUP BY car_type")
-    for row in cursor.fetchall():
-        print(f"- {row['car_type']}: rata-rata Rp {row['avg_type_price']:,.0f} ({row['cnt']} unit)")
-
-    cursor.execute("SELECT AVG(total_rental_count) as avg_rent_count, MAX(total_rental_count) as max_rent_count, MIN(total_rental_count) as min_rent_count FROM mobil_rental")
-    rc = cursor.fetchone()
-    print(f"Rata-rata total rental per mobil: {rc['avg_rent_count']:.2f}, Max: {rc['max_rent_count']}, Min: {rc['min_rent_count']}")
-
-    cursor.execute("SELECT car_id, car_model, total_rental_count FROM mobil_rental ORDER BY total_rental_count DESC LIMIT 5")
-    top5 = cursor.fetchall()
-    if top5:
+    if stats.avg_rental_count is not None:
+        print(f"Rata-rata total rental per mobil: {stats.avg_rental_count:.2f}, Max: {stats.max_rental_count}, Min: {stats.min_rental_count}")
+
+    if stats.top_rented:
         print("\nTop 5 mobil berdasarkan total_rental_count:")
-        df_top5 = pd.DataFrame(top5)
-        print(tabulate(df_top5, headers="keys", tablefmt="grid", showindex=False))
-
-    cursor.execute("SELECT car_id, car_model, current_rental_days FROM mobil_rental WHERE status='Dirental' ORDER BY current_rental_days DESC LIMIT 5")
-    long_rentals = cursor.fetchall()
-    if long_rentals:
-        print("\nMobil dengan rental berjalan terlama:")
-        df_lr = pd.DataFrame(long_rentals)
-        print(tabulate(df_lr, headers="keys", tablefmt="grid", showindex=False))
-
-    df = fetch_all_to_df("SELECT price_per_day, car_type, status, total_rental_count, car_id, car_model FROM mobil_rental")
-    if not df.empty:
+        print_table(stats.top_rented_frame())
+
+    if stats.long_rentals:
+        print("\nMobil dengan rental berjalan terlama (hari berjalan):")
+        print_table(stats.long_rentals_frame())
+
+    if stats.overdue:
+        print(f"Mobil terlambat dikembalikan: {stats.overdue} (lihat: python rental_clock.py --overdue)")
+
+    if stats.price_summary:
         print("\nRingkasan distribusi harga sewa:")
-        print(df['price_per_day'].describe().to_string())
+        print(stats.price_summary_series().to_string())
 
-    # Offer export to Excel
-    export = input_choice("\nApakah ingin mengekspor ringkasan statistik ke file Excel? (y/n): ", ["y","n"])
+    # Offer export (statistics tables + every car, streamed)
+    export = input_choice("\nApakah ingin mengekspor statistik dan data mobil ke file? (y/n): ", ["y","n"])
     if export == "y":
-        default_name = f"rental_stats_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = input(f"Masukkan nama file Excel atau tekan Enter untuk default [{default_name}]: ").strip()
+        fmt = input_choice(f"Format ({'/'.join(EXPORT_FORMATS)}): ", list(EXPORT_FORMATS))
+        default_name = f"rental_stats_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        filepath = input(f"Masukkan nama file atau tekan Enter untuk default [{default_name}]: ").strip()
         if filepath == "":
             filepath = default_name
-        # build a few sheets
-        with pd.ExcelWriter(filepath) as writer:
-            # overall summary
-            overall = {
-                "total_mobil":[total],
-                "tersedia":[available],
-                "dirental":[rented],
-                "avg_price":[avg_price if avg_price is not None else 0]
-            }
-            pd.DataFrame(overall).to_excel(writer, sheet_name="summary", index=False)
-            # top5
-            if top5:
-                pd.DataFrame(top5, columns=["car_id","car_model","total_rental_count"]).to_excel(writer, sheet_name="top5", index=False)
-            # long rentals
-            if long_rentals:
-                pd.DataFrame(long_rentals, columns=["car_id","car_model","current_rental_days"]).to_excel(writer, sheet_name="long_rentals", index=False)
-            # full dump for further analysis
-            pd.DataFrame(df).to_excel(writer, sheet_name="full_data", index=False)
-        print(f"Statistik berhasil diekspor ke {filepath}")
-
-    conn.close()
+        # an in-memory database has a single connection, which the menu still needs
+        if pool_stats()["size"] > 1 and input_choice("Jalankan di latar belakang? (y/n): ", ["y","n"]) == "y":
+            export = lambda progress: export_all(stats, filepath, fmt, user, progress)
+            _EXPORT_JOBS.append(ExportJob(filepath, export).start())
+            print("Ekspor berjalan di latar belakang; statusnya muncul di menu manager.")
+            return
+        try:
+            report = export_all(stats, filepath, fmt, user)
+        except (ValueError, ShardsUnavailableError) as e:
+            print(e)
+            return
+        print(describe_report(report))
+
+# ---------- Background exports ----------
+_EXPORT_JOBS = []
+
+def report_export_jobs():
+    # finished jobs are reported once and dropped; running ones show their progress
+    for job in [j for j in _EXPORT_JOBS if j.done]:
+        _EXPORT_JOBS.remove(job)
+        if job.error:
+            print(f"\n[Ekspor] Gagal mengekspor {job.path}: {job.error}")
+        else:
+            print(f"\n[Ekspor] Selesai: {describe_report(job.report)}")
+    for job in _EXPORT_JOBS:
+        print(f"\n[Ekspor] {job.path}: {job.report.rows:,} baris sejauh ini ...")
+
+def wait_export_jobs():
+    if any(not j.done for j in _EXPORT_JOBS):
+        print("Menunggu ekspor di latar belakang selesai ...")
+    for job in _EXPORT_JOBS:
+        job.wait()
+    report_export_jobs()
 
 # ---------- Visualizations ----------
-def show_visualizations():
-    conn = connect_db()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM mobil_rental")
-    rows = cursor.fetchall()
-    conn.close()
-    if not rows:
+def show_visualizations(user=None):
+    specs, errors = fleet_chart_specs(user)
+    report_unavailable(errors)
+    if not specs:
         print("Tidak ada data untuk divisualisasikan.")
         return
-    df = pd.DataFrame(rows)
 
     while True:
         print("\n=== Menu Visualisasi ===")
@@ -295,119 +783,156 @@ def show_visualizations():
         print("3. Histogram - Distribusi harga sewa")
         print("4. Bar Chart - Top 5 mobil paling sering dirental")
         print("5. Scatter - Harga vs Total Rental Count")
-        print("6. Kembali ke menu utama")
+        print("6. Simpan semua grafik ke file (PNG/SVG, tanpa jendela)")
+        print("7. Kembali ke menu utama")
         choice = input("Pilih opsi: ")
 
-        if choice == "1":
-            counts = df['status'].value_counts()
-            counts.plot.pie(autopct='%1.1f%%', ylabel='')
-            plt.title("Perbandingan Mobil Tersedia vs Dirental")
+        if choice in ("1", "2", "3", "4", "5"):
+            import matplotlib.pyplot as plt
+            fig, ax = plt.subplots()
+            draw_chart(ax, specs[CHART_NAMES[int(choice) - 1]])
+            fig.tight_layout()
             plt.show()
+        elif choice == "6":
+            out_dir = input("Folder output [charts]: ").strip() or "charts"
+            fmt = input_choice("Format (png/svg): ", ["png", "svg"])
+            for name, path, source in render_charts(specs, out_dir, fmt):
+                print(f"- {path} ({'tidak berubah' if source == 'cache' else 'digambar ulang'})")
+        elif choice == "7":
+            break
+        else:
+            print("Pilihan tidak valid.")
 
+# ---------- Instrumentation ----------
+def instrumentation_menu():
+    while True:
+        state = "aktif" if instrumentation.STATE.enabled else "nonaktif"
+        print(f"\n=== Instrumentasi ({state}, slow query >= {instrumentation.STATE.slow_query_ms:g} ms -> {instrumentation.STATE.slow_log_path}) ===")
+        print("1. Aktifkan / nonaktifkan")
+        print("2. Ubah ambang slow query")
+        print("3. Tampilkan query paling lambat")
+        print("4. Ekspor metrik (.prom = Prometheus, .json = snapshot)")
+        print("5. Reset metrik")
+        print("6. Statistik snapshot fleet (hit/miss, memori)")
+        print("7. Status cabang (shard)")
+        print("8. Kembali")
+        choice = input("Pilih opsi: ")
+        if choice == "1":
+            if instrumentation.STATE.enabled:
+                instrumentation.disable()
+            else:
+                instrumentation.enable()
+            print("Instrumentasi", "aktif." if instrumentation.STATE.enabled else "nonaktif.")
         elif choice == "2":
-            vc = df['car_type'].value_counts().sort_index()
-            ax = vc.plot.bar()
-            plt.title("Jumlah Mobil per Jenis")
-            plt.xlabel("Jenis Mobil")
-            plt.ylabel("Jumlah")
-            ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-            plt.show()
-
+            instrumentation.STATE.slow_query_ms = input_float("Ambang slow query (ms): ", min_value=0)
         elif choice == "3":
-            ax = df['price_per_day'].plot.hist(bins=12)
-            plt.title("Distribusi Harga Sewa Mobil")
-            plt.xlabel("Harga Sewa per Hari")
-            plt.ylabel("Frekuensi")
-            plt.show()
-
+            queries = instrumentation.snapshot()["queries"]
+            if not queries:
+                print("Belum ada data. Aktifkan instrumentasi lalu jalankan beberapa aksi.")
+                continue
+            rows = sorted(({"statement": q[:80], "n": m["count"], "total_ms": round(m["sum_seconds"] * 1000, 1),
+                            "rata2_ms": round(m["sum_seconds"] / m["count"] * 1000, 2), "rows": m["rows"]}
+                           for q, m in queries.items()), key=lambda r: -r["total_ms"])
+            print_table(rows[:10])
         elif choice == "4":
-            top5 = df.sort_values(by="total_rental_count", ascending=False).head(5).copy()
-            top5['label'] = top5['car_id'] + " - " + top5['car_model']
-            ax = top5.plot.bar(x='label', y='total_rental_count', legend=False)
-            ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-            plt.title("Top 5 Mobil Paling Sering Dirental (CarID - Model)")
-            plt.xlabel("Mobil (ID - Model)")
-            plt.ylabel("Jumlah Rental")
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.show()
-
+            default_name = f"rental_metrics_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.prom"
+            path = input(f"Nama file [{default_name}]: ").strip() or default_name
+            print(f"Metrik diekspor ke {instrumentation.export(path)}")
         elif choice == "5":
-            ax = df.plot.scatter(x='price_per_day', y='total_rental_count')
-            plt.title("Harga vs Total Rental Count")
-            plt.xlabel("Harga per Hari")
-            plt.ylabel("Total Rental Count")
-            plt.show()
-
+            instrumentation.REGISTRY.reset()
+            print("Metrik direset.")
         elif choice == "6":
+            if not SNAPSHOT_CONFIG["enabled"]:
+                print("Snapshot fleet nonaktif (RENTAL_SNAPSHOT=0).")
+                continue
+            for shard in get_shards().shards:
+                print(f"[{shard.name}] {describe_snapshot_stats(get_snapshot(shard).snapshot_stats())}")
+        elif choice == "7":
+            print_table(branch_status())
+        elif choice == "8":
             break
         else:
             print("Pilihan tidak valid.")
 
-# ---------- Undo support ----------
-def undo_last_action():
-    global LAST_ACTION
-    if not LAST_ACTION:
+# ---------- Undo / redo support (per session, over rental_events) ----------
+def undo_last_action(user):
+    try:
+        event, depth = session_event(user, "undo")
+    except ShardsUnavailableError as e:
+        print("Undo tidak tersedia:", e)
+        return
+    if not event:
         print("Tidak ada aksi yang dapat di-undo.")
         return
-    print("Aksi terakhir:", LAST_ACTION.get('action'))
+    print(f"Aksi terakhir: {describe_event(event)} ({depth} aksi dapat di-undo)")
     confirm = input_choice("Apakah Anda ingin meng-undo aksi terakhir? (y/n): ", ["y","n"])
     if confirm == "n":
         print("Undo dibatalkan.")
         return
-    conn = connect_db()
-    cursor = conn.cursor()
     try:
-        if LAST_ACTION['action'] == 'insert_car':
-            cursor.execute("DELETE FROM mobil_rental WHERE car_id=%s", (LAST_ACTION['car_id'],))
-            conn.commit()
-            print(f"Penambahan mobil {LAST_ACTION['car_id']} berhasil di-undo (dihapus).")
-        elif LAST_ACTION['action'] == 'update_status':
-            # reverse to previous status and days and adjust total_rental_count if needed
-            cursor.execute("UPDATE mobil_rental SET status=%s, current_rental_days=%s, total_rental_count=%s WHERE car_id=%s",
-                           (LAST_ACTION['prev_status'], LAST_ACTION['prev_days'], LAST_ACTION['prev_total'], LAST_ACTION['car_id']))
-            conn.commit()
-            print(f"Perubahan status untuk {LAST_ACTION['car_id']} berhasil di-undo.")
-        else:
-            print("Tipe aksi undo tidak dikenali.")
+        with connect_car(event['car_id']) as conn:
+            revert_event(conn, user, event, "undo")
+        print(f"Aksi {describe_event(event)} berhasil di-undo.")
     except Exception as e:
         print("Gagal melakukan undo:", e)
-    finally:
-        conn.close()
-        LAST_ACTION = None
+
+def redo_last_action(user):
+    try:
+        event, depth = session_event(user, "redo")
+    except ShardsUnavailableError as e:
+        print("Redo tidak tersedia:", e)
+        return
+    if not event:
+        print("Tidak ada aksi yang dapat di-redo.")
+        return
+    print(f"Aksi yang akan diulang: {describe_event(event)} ({depth} aksi dapat di-redo)")
+    confirm = input_choice("Apakah Anda ingin meng-redo aksi ini? (y/n): ", ["y","n"])
+    if confirm == "n":
+        print("Redo dibatalkan.")
+        return
+    try:
+        with connect_car(event['car_id']) as conn:
+            revert_event(conn, user, event, "redo")
+        print(f"Aksi {describe_event(event)} berhasil di-redo.")
+    except Exception as e:
+        print("Gagal melakukan redo:", e)
 
 # ---------- User management (authentication, email validation) ----------
 def init_user_tables():
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id VARCHAR(6) PRIMARY KEY,
-            name VARCHAR(100) NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            password VARCHAR(100) NOT NULL,
-            role ENUM('manager','customer') NOT NULL
-        )
-    """)
-    cursor.execute("SELECT COUNT(*) FROM users WHERE email='admin@rental.com'")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)",
-                       ('U001','Admin Manager','admin@rental.com','admin','manager'))
-    cursor.execute("SELECT COUNT(*) FROM users WHERE email='customer@rental.com'")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)",
-                       ('U002','Admin Customer','customer@rental.com','admin','customer'))
-    conn.commit()
-    conn.close()
+    with connect_db() as conn:
+        ensure_user_tables(conn)
 
 def is_valid_email(email):
     # basic but practical regex for emails
     pattern = r'^[A-Za-z0-9]+[A-Za-z0-9._%+-]*@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
     return re.match(pattern, email) is not None
 
-def register_user():
-    conn = connect_db()
+def email_registered(email):
+    with connect_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM users WHERE email = %s", (email,))
+        return cursor.fetchone()[0] > 0
+
+def create_user(conn, name, email, password, role):
+    # shared by the registration prompt and batch mode; raises ValueError on invalid input
+    email = (email or "").strip().lower()
+    if not (name or "").strip():
+        raise ValueError("Nama tidak boleh kosong.")
+    if not is_valid_email(email):
+        raise ValueError("Format email tidak valid. Contoh: nama@domain.com")
+    if role not in ("manager", "customer"):
+        raise ValueError("Role harus manager atau customer.")
     cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE email = %s", (email,))
+    if cursor.fetchone()[0] > 0:
+        raise ValueError("Email sudah terdaftar.")
+    user_id = generate_user_id(conn)
+    cursor.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)",
+                   (user_id, name.strip(), email, password, role))
+    conn.commit()
+    return {"user_id": user_id, "name": name.strip(), "email": email, "role": role}
+
+def register_user():
     print("\n=== Registrasi User Baru ===")
     name = input("Nama lengkap: ").strip()
     while True:
@@ -415,126 +940,172 @@ def register_user():
         if not is_valid_email(email):
             print("Format email tidak valid. Contoh: nama@domain.com")
             continue
-        cursor.execute("SELECT COUNT(*) FROM users WHERE email = %s", (email,))
-        if cursor.fetchone()[0] > 0:
+        if email_registered(email):
             print("Email sudah terdaftar. Gunakan email lain atau login.")
         else:
             break
     password = getpass.getpass("Password (tidak akan ditampilkan): ").strip()
     role = input_choice("Role (manager/customer): ", ["manager","customer"])
-    user_id = generate_user_id(cursor)
-    cursor.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (%s,%s,%s,%s,%s)",
-                   (user_id, name, email, password, role))
-    conn.commit()
-    conn.close()
+    with connect_db() as conn:
+        create_user(conn, name, email, password, role)
     print("Registrasi sukses. Anda dapat login menggunakan email dan password yang didaftarkan.")
 
-def login_user():
-    conn = connect_db()
+def authenticate(conn, email, password):
+    # returns the user row with a fresh session_id, or None
     cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM users WHERE email = %s AND password = %s", ((email or "").strip().lower(), password))
+    user = cursor.fetchone()
+    if user:
+        # undo/redo history is scoped to this login
+        user['session_id'] = uuid.uuid4().hex
+    return user
+
+def login_user():
     attempts = 3
     while attempts > 0:
         email = input("Email: ").strip().lower()
         password = getpass.getpass("Password: ").strip()
-        cursor.execute("SELECT * FROM users WHERE email = %s AND password = %s", (email, password))
-        user = cursor.fetchone()
+        with connect_db() as conn:
+            user = authenticate(conn, email, password)
         if user:
             print(f"Login berhasil. Selamat datang, {user['name']} ({user['role']})")
-            conn.close()
             return user
         else:
             attempts -= 1
             print(f"Login gagal. Kesempatan tersisa: {attempts}")
-    conn.close()
     print("Anda telah gagal login 3 kali. Program akan keluar.")
     return None
 
 # ---------- Customer functions ----------
+# menu choice -> action name for instrumentation
+CUSTOMER_ACTIONS = {'1': 'browse_available', '2': 'search', '3': 'availability', '4': 'rent', '5': 'return',
+                    '6': 'undo', '7': 'redo', '8': 'logout'}
+
 def customer_menu(user):
-    global LAST_ACTION
     while True:
         print(f"\n=== MENU PELANGGAN ({user['name']}) ===")
         print("1. Lihat mobil tersedia")
         print("2. Cari mobil (jenis/model)")
-        print("3. Pinjam / rental mobil (simulasi)")
-        print("4. Kembalikan mobil (simulasi)")
-        print("5. Undo last action (jika ada)")
-        print("6. Logout")
+        print("3. Cek ketersediaan per tanggal")
+        print("4. Pinjam / reservasi mobil (simulasi)")
+        print("5. Kembalikan mobil (simulasi)")
+        print("6. Undo aksi terakhir (jika ada)")
+        print("7. Redo aksi yang di-undo (jika ada)")
+        print("8. Logout")
         choice = input("Pilih menu: ")
-        if choice == '1':
-            df = fetch_all_to_df("SELECT * FROM mobil_rental WHERE status='Tersedia' ORDER BY car_id")
-            if df.empty:
-                print("Tidak ada mobil tersedia saat ini.")
-            else:
-                print(tabulate(df, headers='keys', tablefmt='grid', showindex=False))
-        elif choice == '2':
-            keyword = input('Masukkan kata kunci (model atau jenis): ').strip().lower()
-            df = fetch_all_to_df("SELECT * FROM mobil_rental WHERE LOWER(car_model) LIKE %s OR LOWER(car_type) LIKE %s", params=(f"%{keyword}%", f"%{keyword}%"))
-            if df.empty:
-                print('Tidak ditemukan.')
-            else:
-                print(tabulate(df, headers='keys', tablefmt='grid', showindex=False))
-        elif choice == '3':
-            car_id = input('Masukkan Car ID yang ingin dirental (contoh M001): ').strip().upper()
-            conn = connect_db()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute('SELECT * FROM mobil_rental WHERE car_id=%s', (car_id,))
-            car = cursor.fetchone()
-            if not car:
-                print('Car ID tidak ditemukan.')
-            elif car['status'] == 'Dirental':
-                print('Maaf, mobil sedang dirental.')
-            else:
-                days = input_int('Berapa hari ingin dirental? (integer): ', min_value=1)
-                print(f"Anda akan merental {car_id} selama {days} hari, total harga estimasi: Rp {int(car['price_per_day']*days):,}")                
-                confirm = input_choice("Konfirmasi rental? (y/n): ", ["y","n"])                
+        with span(f"menu.customer.{CUSTOMER_ACTIONS.get(choice, 'other')}"):
+            if choice == '1':
+                browse_cars({"status": "Tersedia"}, empty_message="Tidak ada mobil tersedia saat ini.")
+            elif choice == '2':
+                keyword = input('Masukkan kata kunci (model atau jenis): ').strip().lower()
+                status, min_price, max_price = None, None, None
+                if input_choice("Tambah filter status/harga? (y/n): ", ["y","n"]) == 'y':
+                    status = input_choice("Status (Tersedia/Dirental/Semua): ", ["Tersedia", "Dirental", "Semua"])
+                    status = None if status == "Semua" else status
+                    min_price = input_float("Harga minimum per hari: Rp ", min_value=0)
+                    max_price = input_float("Harga maksimum per hari: Rp ", min_value=min_price)
+                results, errors = search_fleet(keyword, status, min_price, max_price)
+                report_unavailable(errors)
+                if not results:
+                    print('Tidak ditemukan.')
+                else:
+                    print_table([{k: v for k, v in r.items() if k != 'score'} for r in results])
+                    if len(results) >= SEARCH_LIMIT:
+                        print(f"Menampilkan {SEARCH_LIMIT} hasil teratas. Persempit kata kunci atau filter untuk hasil lain.")
+            elif choice == '3':
+                today = datetime.date.today()
+                start = input_date(f"Dari tanggal (YYYY-MM-DD, Enter = hari ini {today}): ", default=today, min_value=today)
+                end = input_date("Sampai tanggal kembali (YYYY-MM-DD): ", min_value=start + datetime.timedelta(days=1))
+                types = sorted({tipe for _, tipe in CAR_OPTIONS})
+                car_type = input_choice(f"Jenis mobil ({'/'.join(types)}/Semua): ", types + ["Semua"])
+                try:
+                    cars, errors = available_fleet(start, end, None if car_type == "Semua" else car_type)
+                except (ValueError, ShardsUnavailableError) as e:
+                    print(e)
+                    continue
+                report_unavailable(errors)
+                if not cars:
+                    print('Tidak ada mobil yang tersedia pada tanggal tersebut.')
+                else:
+                    print_table(cars)
+                    if len(cars) >= SEARCH_LIMIT:
+                        print(f"Menampilkan {SEARCH_LIMIT} mobil pertama. Persempit jenis atau tanggal untuk hasil lain.")
+            elif choice == '4':
+                car_id = input('Masukkan Car ID yang ingin dirental (contoh M001): ').strip().upper()
+                car = fetch_car(car_id)
+                if not car:
+                    print('Car ID tidak ditemukan.')
+                    continue
+                today = datetime.date.today()
+                start = input_date(f"Tanggal mulai (YYYY-MM-DD, Enter = hari ini {today}): ", default=today, min_value=today)
+                end = input_date("Tanggal kembali (YYYY-MM-DD): ", min_value=start + datetime.timedelta(days=1))
+                days = (end - start).days
+                if days > MAX_RESERVATION_DAYS:
+                    print(f"Durasi rental maksimal {MAX_RESERVATION_DAYS} hari.")
+                    continue
+                if start == today and car['status'] == 'Dirental':
+                    print('Maaf, mobil sedang dirental.')
+                    continue
+                calendar = get_calendar(get_shards().shard_for(car_id))
+                with connect_car(car_id) as conn:
+                    calendar.sync(conn)
+                clash = calendar.car_reservations(car_id, start, end)
+                if clash:
+                    print(f"Maaf, mobil sudah direservasi {clash[0][0]} s/d {clash[0][1]}.")
+                    continue
+                print(f"Anda akan merental {car_id} dari {start} s/d {end} ({days} hari), total harga estimasi: Rp {int(car['price_per_day']*days):,}")
+                confirm = input_choice("Konfirmasi rental? (y/n): ", ["y","n"])
                 if confirm == 'y':
-                    # store previous state for undo
-                    prev_status = car['status']
-                    prev_days = car['current_rental_days']
-                    prev_total = car['total_rental_count']
-                    cursor.execute("UPDATE mobil_rental SET status='Dirental', current_rental_days=%s, total_rental_count=total_rental_count+1 WHERE car_id=%s", (days, car_id))
-                    conn.commit()
-                    LAST_ACTION = {'action':'update_status','car_id':car_id,'prev_status':prev_status,'prev_days':prev_days,'prev_total':prev_total}
-                    print(f'Mobil {car_id} berhasil dirental selama {days} hari. (Anda bisa undo terakhir jika perlu)')
+                    try:
+                        with connect_car(car_id) as conn:
+                            book_car(conn, car_id, start, end, session=user)
+                    except (RentalConflictError, ReservationConflictError, CarNotFoundError) as e:
+                        print(f'Rental gagal: {e}')
+                        continue
+                    if start == today:
+                        print(f'Mobil {car_id} berhasil dirental selama {days} hari. (Anda bisa undo terakhir jika perlu)')
+                    else:
+                        print(f'Reservasi {car_id} untuk {start} s/d {end} berhasil disimpan.')
                 else:
                     print('Rental dibatalkan.')
-            conn.close()
-        elif choice == '4':
-            car_id = input('Masukkan Car ID yang ingin dikembalikan: ').strip().upper()
-            conn = connect_db()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute('SELECT * FROM mobil_rental WHERE car_id=%s', (car_id,))
-            car = cursor.fetchone()
-            if not car:
-                print('Car ID tidak ditemukan.')
-            elif car['status'] == 'Tersedia':
-                print('Mobil sudah tersedia. Tidak perlu dikembalikan.')
-            else:
-                print(f"Anda akan mengembalikan {car_id}. Pastikan selesai pembayaran. ")                
-                confirm = input_choice("Konfirmasi pengembalian? (y/n): ", ["y","n"])                
-                if confirm == 'y':
-                    prev_status = car['status']
-                    prev_days = car['current_rental_days']
-                    prev_total = car['total_rental_count']
-                    cursor.execute("UPDATE mobil_rental SET status='Tersedia', current_rental_days=0 WHERE car_id=%s", (car_id,))
-                    conn.commit()
-                    LAST_ACTION = {'action':'update_status','car_id':car_id,'prev_status':prev_status,'prev_days':prev_days,'prev_total':prev_total}
-                    print(f'Mobil {car_id} berhasil dikembalikan dan kini tersedia. (Anda bisa undo terakhir jika perlu)')
+            elif choice == '5':
+                car_id = input('Masukkan Car ID yang ingin dikembalikan: ').strip().upper()
+                car = fetch_car(car_id)
+                if not car:
+                    print('Car ID tidak ditemukan.')
+                elif car['status'] == 'Tersedia':
+                    print('Mobil sudah tersedia. Tidak perlu dikembalikan.')
                 else:
-                    print('Pengembalian dibatalkan.')
-            conn.close()
-        elif choice == '5':
-            undo_last_action()
-        elif choice == '6':
-            print('Logout.')
-            break
-        else:
-            print('Pilihan tidak valid.')
+                    print(f"Anda akan mengembalikan {car_id}. Pastikan selesai pembayaran. ")                
+                    confirm = input_choice("Konfirmasi pengembalian? (y/n): ", ["y","n"])                
+                    if confirm == 'y':
+                        try:
+                            with connect_car(car_id) as conn:
+                                return_car(conn, car_id, session=user)
+                        except (RentalConflictError, CarNotFoundError) as e:
+                            print(f'Pengembalian gagal: {e}')
+                            continue
+                        print(f'Mobil {car_id} berhasil dikembalikan dan kini tersedia. (Anda bisa undo terakhir jika perlu)')
+                    else:
+                        print('Pengembalian dibatalkan.')
+            elif choice == '6':
+                undo_last_action(user)
+            elif choice == '7':
+                redo_last_action(user)
+            elif choice == '8':
+                print('Logout.')
+                break
+            else:
+                print('Pilihan tidak valid.')
 
 # ---------- Manager menu ----------
+MANAGER_ACTIONS = {'1': 'show_all_cars', '2': 'filter_cars', '3': 'add_car', '4': 'show_statistics',
+                   '5': 'show_visualizations', '6': 'register_user', '7': 'undo', '8': 'redo', '9': 'import_cars',
+                   '10': 'instrumentation', '11': 'logout'}
+
 def manager_menu(user):
     while True:
+        report_export_jobs()
         print(f"\n=== MENU PENGELOLA ({user['name']}) ===")
         print("1. Lihat semua mobil")
         print("2. Filter mobil")
@@ -542,32 +1113,59 @@ def manager_menu(user):
         print("4. Lihat statistik (detail)")
         print("5. Lihat visualisasi")
         print("6. Tambah user (registrasi admin/customer)")
-        print("7. Undo last action (jika ada)")
-        print("8. Logout")
+        print("7. Undo aksi terakhir (jika ada)")
+        print("8. Redo aksi yang di-undo (jika ada)")
+        print("9. Impor mobil massal (CSV/Excel)")
+        print("10. Instrumentasi & metrik")
+        print("11. Logout")
         choice = input("Pilih menu: ")
-        if choice == '1':
-            show_all_cars()
-        elif choice == '2':
-            filter_cars()
-        elif choice == '3':
-            add_car()
-        elif choice == '4':
-            show_statistics()
-        elif choice == '5':
-            show_visualizations()
-        elif choice == '6':
-            register_user()
-        elif choice == '7':
-            undo_last_action()
-        elif choice == '8':
-            print('Logout.')
-            break
-        else:
-            print('Pilihan tidak valid.')
+        with span(f"menu.manager.{MANAGER_ACTIONS.get(choice, 'other')}"):
+            if choice == '1':
+                show_all_cars(user)
+            elif choice == '2':
+                filter_cars(user)
+            elif choice == '3':
+                add_car(user)
+            elif choice == '4':
+                show_statistics(user)
+            elif choice == '5':
+                show_visualizations(user)
+            elif choice == '6':
+                register_user()
+            elif choice == '7':
+                undo_last_action(user)
+            elif choice == '8':
+                redo_last_action(user)
+            elif choice == '9':
+                import_cars(user)
+            elif choice == '10':
+                instrumentation_menu()
+            elif choice == '11':
+                print('Logout.')
+                break
+            else:
+                print('Pilihan tidak valid.')
 
 # ---------- Entry point (choose role) ----------
+def init_support_tables():
+    # fleet summary, ID sequences, search index, event log and reservations (created/seeded on first run)
+    with connect_db() as conn:
+        ensure_support_tables(conn)
+
+def init_schema():
+    # one version check per launch; users and support tables are only set up when the schema is behind.
+    # The other branches too: one that cannot be reached is left out of fleet-wide reads until it can
+    with connect_db() as conn:
+        migrate(conn)
+    for shard in get_shards().shards[1:]:
+        try:
+            with shard.backend.connection() as conn:
+                migrate(conn)
+        except Exception as e:
+            print(f"Peringatan: database cabang {shard.name} tidak dapat disiapkan: {e}")
+
 def main():
-    init_user_tables()
+    init_schema()
     print("Selamat datang di Sistem Rental Mobil (Manager & Pelanggan)")
     while True:
         print("\nMasuk sebagai:")
@@ -593,6 +1191,7 @@ def main():
         elif choice == '3':
             register_user()
         elif choice == '4':
+            wait_export_jobs()
             print('Terima kasih. Program selesai.')
             break
         else:
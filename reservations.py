@@ -0,0 +1,278 @@
+"""Date-range reservations and the in-memory calendar used for availability queries.
+
+A reservation is a half-open interval [start_date, end_date) per car; end_date is
+the return day. Renting a car now is a reservation that starts today (write_car
+keeps it in step with the car's status), booking ahead is a reservation that
+starts later. Overlaps are rejected inside the booking transaction with the car
+row locked, so two sessions can never book the same days.
+
+ReservationCalendar keeps the active reservations sorted by start date. No
+reservation is longer than MAX_RESERVATION_DAYS (the calendar tracks the
+longest one it holds), so everything overlapping a window starts in
+[window start - longest, window end) and two bisects bound the scan. Every reservation write appends a row to
+reservation_changes, an insert-only log with an auto-increment version, so a
+calendar catches up on other sessions' writes by reading only the versions
+after its last sync. Rental writes share no row there: each one inserts its
+own. Versions are handed out before commit, so a lower one can become
+visible after a higher one; the calendar re-checks such gaps until they show
+up or GAP_TIMEOUT passes (a rolled-back write never fills its gap).
+"""
+import bisect
+import datetime
+import threading
+import time
+
+from car_catalog import CAR_FIELDS
+from storage import create_index
+
+MAX_RESERVATION_DAYS = 90
+
+RESERVATION_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS reservations (
+        reservation_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        car_id VARCHAR(10) NOT NULL,
+        user_id VARCHAR(6),
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        status VARCHAR(10) NOT NULL,
+        version BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reservation_clock (
+        id INT PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """,
+]
+RESERVATION_CHANGES_DDL = """
+    CREATE TABLE IF NOT EXISTS reservation_changes (
+        version BIGINT AUTO_INCREMENT PRIMARY KEY,
+        reservation_id BIGINT NOT NULL
+    )
+"""
+# seconds a calendar keeps waiting for a missing version; far beyond any rental transaction
+GAP_TIMEOUT = 60
+# versions below the newest one checked for gaps when a calendar first loads
+GAP_SCAN = 1000
+RESERVATION_INDEXES = [
+    ("idx_reservations_car", "reservations", "car_id, status, start_date"),
+    ("idx_reservations_version", "reservations", "version"),
+]
+
+
+class ReservationConflictError(Exception):
+    pass
+
+
+def as_date(value):
+    # MySQL returns DATE columns as date objects, SQLite as ISO strings
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+
+def _log_change(cursor, reservation_id):
+    # a new version for one reservation write; its own row, so writers never wait on each other here
+    cursor.execute("INSERT INTO reservation_changes (reservation_id) VALUES (%s)", (reservation_id,))
+    return cursor.lastrowid
+
+
+def ensure_reservations(conn):
+    cursor = conn.cursor()
+    for ddl in RESERVATION_DDL:
+        cursor.execute(ddl)
+    conn.commit()
+    for name, table, columns in RESERVATION_INDEXES:
+        create_index(conn, name, table, columns)
+    cursor.execute("SELECT version FROM reservation_clock WHERE id = 1")
+    if cursor.fetchone() is None:
+        # first run: cars already out get a reservation for their remaining rental days
+        today = datetime.date.today()
+        cursor.execute("INSERT INTO reservation_clock (id, version) VALUES (1, 1)")
+        cursor.execute("SELECT car_id, current_rental_days FROM mobil_rental WHERE status='Dirental'")
+        rows = [(car_id, None, today.isoformat(),
+                 (today + datetime.timedelta(days=min(max(days, 1), MAX_RESERVATION_DAYS))).isoformat(), "aktif", 1)
+                for car_id, days in cursor.fetchall()]
+        cursor.executemany("INSERT INTO reservations (car_id, user_id, start_date, end_date, status, version) "
+                           "VALUES (%s,%s,%s,%s,%s,%s)", rows)
+        conn.commit()
+
+
+def ensure_reservation_changes(conn):
+    # migration 10: the change log replaces the single reservation_clock row (kept as the first-run marker)
+    conn.cursor().execute(RESERVATION_CHANGES_DDL)
+    conn.commit()
+
+
+def check_period(start, end):
+    if end <= start:
+        raise ValueError("Tanggal kembali harus setelah tanggal mulai.")
+    if (end - start).days > MAX_RESERVATION_DAYS:
+        raise ValueError(f"Durasi reservasi maksimal {MAX_RESERVATION_DAYS} hari.")
+
+
+def find_overlap(conn, car_id, start, end):
+    """Active reservation of car_id overlapping [start, end), or None. Call with the car row locked."""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT reservation_id, start_date, end_date FROM reservations "
+                   "WHERE car_id=%s AND status='aktif' AND start_date < %s AND end_date > %s LIMIT 1",
+                   (car_id, end.isoformat(), start.isoformat()))
+    return cursor.fetchone()
+
+
+def insert_reservation(conn, car_id, user_id, start, end):
+    """Insert a reservation inside the caller's transaction; the car row must already be locked."""
+    check_period(start, end)
+    clash = find_overlap(conn, car_id, start, end)
+    if clash:
+        raise ReservationConflictError(
+            f"Mobil {car_id} sudah direservasi {as_date(clash['start_date'])} s/d {as_date(clash['end_date'])}.")
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO reservations (car_id, user_id, start_date, end_date, status, version) "
+                   "VALUES (%s,%s,%s,%s,'aktif',0)", (car_id, user_id, start.isoformat(), end.isoformat()))
+    reservation_id = cursor.lastrowid
+    cursor.execute("UPDATE reservations SET version=%s WHERE reservation_id=%s",
+                   (_log_change(cursor, reservation_id), reservation_id))
+    return reservation_id
+
+
+def end_current_reservation(conn, car_id, today):
+    # the car came back (or the rental was undone): free the rest of the running reservation
+    cursor = conn.cursor()
+    cursor.execute("SELECT reservation_id FROM reservations WHERE car_id=%s AND status='aktif' AND start_date <= %s",
+                   (car_id, today.isoformat()))
+    ids = [r[0] for r in cursor.fetchall()]
+    if not ids:
+        return
+    for reservation_id in ids:
+        cursor.execute("UPDATE reservations SET status='selesai', end_date=%s, version=%s WHERE reservation_id=%s",
+                       (today.isoformat(), _log_change(cursor, reservation_id), reservation_id))
+
+
+def apply_reservation_change(conn, old, new, session=None):
+    """Keep the current reservation in step with one mobil_rental row change (called from write_car)."""
+    was = old["status"] if old else None
+    now = new["status"] if new else None
+    if was == now:
+        return
+    today = datetime.date.today()
+    if now == "Dirental":
+        days = new["current_rental_days"] or 1
+        insert_reservation(conn, new["car_id"], (session or {}).get("user_id"),
+                           today, today + datetime.timedelta(days=days))
+    elif was == "Dirental":
+        end_current_reservation(conn, old["car_id"], today)
+
+
+# ---------- In-memory calendar ----------
+class ReservationCalendar:
+    def __init__(self):
+        self.version = 0
+        self._loaded = False
+        self._gaps = {}  # version not visible yet -> when it was first missed
+        self._entries = []  # (start, end, reservation_id, car_id), sorted
+        self._by_id = {}
+        # longest active reservation seen; bounds how far back overlapping() looks
+        self._max_len = datetime.timedelta(0)
+        # one calendar is shared by the service's DB threads
+        self._lock = threading.Lock()
+
+    def _remove(self, reservation_id):
+        entry = self._by_id.pop(reservation_id, None)
+        if entry is not None:
+            i = bisect.bisect_left(self._entries, entry)
+            del self._entries[i]
+
+    def _add(self, entry):
+        self._by_id[entry[2]] = entry
+        self._max_len = max(self._max_len, entry[1] - entry[0])
+        bisect.insort(self._entries, entry)
+
+    def sync(self, conn):
+        """Apply reservation changes committed since the last sync (all of them on the first call)."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(version) FROM reservation_changes")
+        current = cursor.fetchone()[0] or 0
+        if self._loaded and current == self.version and not self._gaps:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load(cursor, current)
+            else:
+                self._apply_changes(cursor, current)
+
+    def _note_gaps(self, low, high, seen):
+        # versions in (low, high] not committed yet are re-checked on later syncs, until GAP_TIMEOUT
+        now = time.monotonic()
+        for version in range(low + 1, high + 1):
+            if version not in seen:
+                self._gaps.setdefault(version, now)
+        self._gaps = {v: t for v, t in self._gaps.items() if v not in seen and now - t < GAP_TIMEOUT}
+
+    def _load(self, cursor, current):
+        low = max(0, current - GAP_SCAN)
+        cursor.execute("SELECT version FROM reservation_changes WHERE version > %s AND version <= %s", (low, current))
+        seen = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT reservation_id, car_id, start_date, end_date FROM reservations WHERE status='aktif'")
+        self._by_id = {reservation_id: (as_date(start), as_date(end), reservation_id, car_id)
+                       for reservation_id, car_id, start, end in cursor.fetchall()}
+        self._entries = sorted(self._by_id.values())
+        self._max_len = max((e[1] - e[0] for e in self._entries), default=datetime.timedelta(0))
+        self._note_gaps(low, current, seen)
+        self.version = current
+        self._loaded = True
+
+    def _apply_changes(self, cursor, current):
+        if current < self.version:
+            return
+        select = ("SELECT c.version, r.reservation_id, r.car_id, r.start_date, r.end_date, r.status "
+                  "FROM reservation_changes c JOIN reservations r ON r.reservation_id = c.reservation_id ")
+        cursor.execute(select + "WHERE c.version > %s AND c.version <= %s", (self.version, current))
+        rows = cursor.fetchall()
+        if self._gaps:
+            gaps = sorted(self._gaps)
+            cursor.execute(select + f"WHERE c.version IN ({', '.join(['%s'] * len(gaps))})", tuple(gaps))
+            rows += cursor.fetchall()
+        for _, reservation_id, car_id, start, end, status in rows:
+            self._remove(reservation_id)
+            if status == "aktif":
+                self._add((as_date(start), as_date(end), reservation_id, car_id))
+        self._note_gaps(self.version, current, {row[0] for row in rows})
+        self.version = current
+
+    def __len__(self):
+        return len(self._entries)
+
+    def overlapping(self, start, end):
+        """Active reservations overlapping [start, end), as (start, end, reservation_id, car_id)."""
+        with self._lock:
+            lo = bisect.bisect_left(self._entries, (start - self._max_len,))
+            hi = bisect.bisect_left(self._entries, (end,))
+            return [e for e in self._entries[lo:hi] if e[1] > start]
+
+    def busy_cars(self, start, end):
+        return {e[3] for e in self.overlapping(start, end)}
+
+    def car_reservations(self, car_id, start, end):
+        return [e for e in self.overlapping(start, end) if e[3] == car_id]
+
+
+def available_cars(conn, calendar, start, end, car_type=None, limit=50):
+    """Up to `limit` cars (dicts) with no active reservation overlapping [start, end)."""
+    check_period(start, end)
+    calendar.sync(conn)
+    busy = calendar.busy_cars(start, end)
+    filters, params = [], ()
+    if start <= datetime.date.today():
+        # a car that is out right now is not free today, reservation or not
+        filters.append("status = 'Tersedia'")
+    if car_type:
+        filters.append("car_type = %s")
+        params += (car_type,)
+    where = f" WHERE {' AND '.join(filters)}" if filters else ""
+    # at most len(busy) of the fetched rows can be dropped
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"SELECT {', '.join(CAR_FIELDS)} FROM mobil_rental{where} LIMIT %s", params + (limit + len(busy),))
+    return [r for r in cursor.fetchall() if r["car_id"] not in busy][:limit]
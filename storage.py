@@ -0,0 +1,482 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+import instrumentation
+from db_pool import ConnectionPool
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rental_db.sql")
+
+
+def checkout(pool):
+    # plain pooled connection unless instrumentation is switched on
+    if instrumentation.STATE.enabled:
+        return instrumentation.instrumented_checkout(pool)
+    return pool.connection()
+
+
+# ---------- MySQL ----------
+class MySQLBackend:
+    dialect = "mysql"
+
+    def __init__(self, config, pool_config=None):
+        self.config = dict(config)
+        self.pool = ConnectionPool(self._connect, **(pool_config or {}))
+
+    def _connect(self):
+        import mysql.connector
+        return mysql.connector.connect(**self.config)
+
+    def connection(self):
+        return checkout(self.pool)
+
+    def read_connection(self, session=None):
+        # no replicas: reads share the primary
+        return self.connection()
+
+    def note_write(self, session):
+        pass
+
+    def describe(self):
+        return f"MySQL {self.config.get('host')}:{self.config.get('port')}/{self.config.get('database')}"
+
+    def close(self):
+        self.pool.close_all()
+
+
+# ---------- SQLite (file or in-memory) ----------
+_ENUM_RE = re.compile(r"ENUM\s*\([^)]*\)", re.IGNORECASE)
+_SKIP_RE = re.compile(r"^\s*(DROP\s+DATABASE|CREATE\s+DATABASE|USE)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def mysql_to_sqlite(sql):
+    # the program writes MySQL flavoured SQL; translate the few constructs SQLite lacks
+    sql = _ENUM_RE.sub("TEXT", sql)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bBIGINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", sql, flags=re.IGNORECASE)
+    # row locks come from BEGIN IMMEDIATE (start_transaction) instead
+    sql = re.sub(r"\s+FOR\s+UPDATE\b", "", sql, flags=re.IGNORECASE)
+    return sql.replace("%s", "?")
+
+
+def split_sql_script(text):
+    statements = []
+    for stmt in text.split(";"):
+        lines = [l for l in stmt.splitlines() if not l.strip().startswith("--")]
+        stmt = "\n".join(lines).strip()
+        if stmt:
+            statements.append(stmt)
+    return statements
+
+
+class SQLiteCursor:
+    # mimics the subset of the mysql.connector cursor API the program uses
+    dialect = "sqlite"
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(mysql_to_sqlite(query), tuple(params or ()))
+        return self
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(mysql_to_sqlite(query), seq_params)
+        return self
+
+    def _convert(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [self._convert(r) for r in rows]
+
+    def fetchall(self):
+        return [self._convert(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._convert(row)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    dialect = "sqlite"
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self.raw.cursor(), dictionary=dictionary)
+
+    def start_transaction(self):
+        # take the write lock up front so read-then-write transactions cannot deadlock
+        self.raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLiteBackend:
+    """Embedded backend for local runs, benchmarks and small branch offices.
+
+    `path` is a database file or ":memory:". A fresh database is created from
+    `seed_file` (rental_db.sql by default); pass seed_file=None for empty tables.
+    A read_only backend opens an existing file (a replica) and never writes to it.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path=":memory:", seed_file=SEED_FILE, pool_config=None, read_only=False):
+        self.path = path
+        self.seed_file = seed_file
+        self.read_only = read_only
+        pool_config = dict(pool_config or {})
+        self._memory_conn = None
+        if path == ":memory:":
+            # every sqlite3 connection to :memory: is a separate database, so all
+            # pool users share one connection and checkouts are serialized
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+            pool_config["size"] = 1
+        self._init_lock = threading.Lock()
+        if not read_only:
+            self._bootstrap()
+        self.pool = ConnectionPool(self._connect, **pool_config)
+
+    def _open(self):
+        if self._memory_conn is not None:
+            return self._memory_conn
+        if self.read_only:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+        raw = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        return raw
+
+    def _connect(self):
+        return SQLiteConnection(self._open())
+
+    def _bootstrap(self):
+        with self._init_lock:
+            raw = self._open()
+            exists = raw.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='mobil_rental'"
+            ).fetchone()[0]
+            if not exists:
+                self.load_sql_file(raw, self.seed_file)
+            if self._memory_conn is None:
+                raw.close()
+
+    def load_sql_file(self, raw, path):
+        if path is None:
+            path = SEED_FILE
+            with open(path, encoding="utf-8") as f:
+                statements = [s for s in split_sql_script(f.read()) if not s.upper().startswith("INSERT")]
+        else:
+            with open(path, encoding="utf-8") as f:
+                statements = split_sql_script(f.read())
+        for stmt in statements:
+            if _SKIP_RE.match(stmt):
+                continue
+            raw.execute(mysql_to_sqlite(stmt))
+        raw.commit()
+
+    def connection(self):
+        return checkout(self.pool)
+
+    def read_connection(self, session=None):
+        return self.connection()
+
+    def note_write(self, session):
+        pass
+
+    def describe(self):
+        return f"SQLite {self.path}{' (read-only)' if self.read_only else ''}"
+
+    def close(self):
+        self.pool.close_all()
+        if self._memory_conn is not None:
+            self._memory_conn.close()
+
+
+# ---------- Primary + read replicas ----------
+READ_POLICIES = ("round_robin", "least_latency")
+HEARTBEAT_DDL = """
+    CREATE TABLE IF NOT EXISTS replica_heartbeat (
+        id INT PRIMARY KEY,
+        beat DOUBLE NOT NULL
+    )
+"""
+
+
+def ensure_replica_heartbeat(conn):
+    cursor = conn.cursor()
+    cursor.execute(HEARTBEAT_DDL)
+    cursor.execute("INSERT IGNORE INTO replica_heartbeat (id, beat) VALUES (1, 0)")
+    conn.commit()
+
+
+def _session_key(session):
+    return (session or {}).get("session_id")
+
+
+class ReplicatedBackend:
+    """A primary for every write plus read replicas for reporting.
+
+    connection() is always the primary. read_connection(session) hands out a
+    replica whose lag is at most max_lag, picked round-robin or by least
+    latency, and falls back to the primary when none qualifies or the chosen
+    one cannot be reached. A heartbeat thread stamps replica_heartbeat on the
+    primary every heartbeat_interval seconds and reads the stamp back from each
+    replica: its age is the replica's lag, the round trip its latency.
+
+    The stamp also gives read-your-writes: note_write(session) after a commit
+    keeps that session on the primary until a replica shows a newer stamp,
+    i.e. has applied the write. Sessions are tracked per process.
+    """
+
+    def __init__(self, primary, replicas, policy="round_robin", max_lag=5.0, heartbeat_interval=1.0):
+        if policy not in READ_POLICIES:
+            raise ValueError(f"Kebijakan baca replika harus salah satu dari: {', '.join(READ_POLICIES)}")
+        if not replicas:
+            raise ValueError("Minimal satu replika dibutuhkan.")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.dialect = primary.dialect
+        self.pool = primary.pool
+        self.policy = policy
+        self.max_lag = max_lag
+        self.heartbeat_interval = heartbeat_interval
+        self._lock = threading.Lock()
+        self._turn = 0
+        # per replica: last stamp seen, lag and probe round trip in seconds (None = unusable / not checked yet)
+        self._beats = [None] * len(self.replicas)
+        self._lags = [None] * len(self.replicas)
+        self._latencies = [None] * len(self.replicas)
+        # session_id -> time of its last committed write
+        self._writes = {}
+        self.stats = {"primary_reads": 0, "replica_reads": [0] * len(self.replicas),
+                      "lag_fallbacks": 0, "session_fallbacks": 0, "replica_errors": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="replica-heartbeat", daemon=True)
+        self._thread.start()
+
+    # ----- heartbeat -----
+    def _heartbeat_loop(self):
+        while True:
+            self.check_replicas()
+            if self._stop.wait(self.heartbeat_interval):
+                break
+
+    def check_replicas(self):
+        """Stamp the primary, then measure every replica; returns their lags."""
+        now = time.time()
+        try:
+            with self.primary.connection() as conn:
+                conn.cursor().execute("UPDATE replica_heartbeat SET beat=%s WHERE id=1", (now,))
+                conn.commit()
+        except Exception:
+            # primary down or not migrated yet: the replicas' stamps simply age
+            pass
+        for i, replica in enumerate(self.replicas):
+            started = time.perf_counter()
+            try:
+                with replica.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT beat FROM replica_heartbeat WHERE id=1")
+                    row = cursor.fetchone()
+                beat = row[0] if row and row[0] else None
+            except Exception:
+                beat = None
+            latency = time.perf_counter() - started
+            with self._lock:
+                self._beats[i] = beat
+                self._lags[i] = max(0.0, now - beat) if beat is not None else None
+                previous = self._latencies[i]
+                self._latencies[i] = latency if previous is None else 0.7 * previous + 0.3 * latency
+        with self._lock:
+            # a write older than max_lag is on every replica that still qualifies
+            self._writes = {k: t for k, t in self._writes.items() if t >= now - self.max_lag}
+            return list(self._lags)
+
+    # ----- routing -----
+    def note_write(self, session):
+        key = _session_key(session)
+        if key is not None:
+            with self._lock:
+                self._writes[key] = time.time()
+
+    def _candidates(self, session):
+        # replica indexes to try, in order; empty means the primary
+        with self._lock:
+            fresh = [i for i, lag in enumerate(self._lags) if lag is not None and lag <= self.max_lag]
+            if not fresh:
+                self.stats["lag_fallbacks"] += 1
+                return []
+            wrote = self._writes.get(_session_key(session))
+            if wrote is not None:
+                fresh = [i for i in fresh if self._beats[i] > wrote]
+                if not fresh:
+                    self.stats["session_fallbacks"] += 1
+                    return []
+            if self.policy == "least_latency":
+                return sorted(fresh, key=lambda i: self._latencies[i])
+            self._turn += 1
+            start = self._turn % len(fresh)
+            return fresh[start:] + fresh[:start]
+
+    @contextmanager
+    def read_connection(self, session=None):
+        with ExitStack() as stack:
+            conn = None
+            for i in self._candidates(session):
+                try:
+                    conn = stack.enter_context(self.replicas[i].connection())
+                except Exception:
+                    # unreachable: skipped until the next heartbeat reaches it again
+                    with self._lock:
+                        self._lags[i] = None
+                        self.stats["replica_errors"] += 1
+                    continue
+                with self._lock:
+                    self.stats["replica_reads"][i] += 1
+                break
+            if conn is None:
+                conn = stack.enter_context(self.primary.connection())
+                with self._lock:
+                    self.stats["primary_reads"] += 1
+            yield conn
+
+    def connection(self):
+        return self.primary.connection()
+
+    def replica_status(self):
+        with self._lock:
+            return [{"replica": r.describe(), "beat": beat, "lag_seconds": lag,
+                     "latency_ms": None if latency is None else round(latency * 1000, 3), "reads": reads}
+                    for r, beat, lag, latency, reads in zip(self.replicas, self._beats, self._lags, self._latencies,
+                                                            self.stats["replica_reads"])]
+
+    def describe(self):
+        return f"{self.primary.describe()} + {len(self.replicas)} replika ({self.policy}, lag maks {self.max_lag:g} s)"
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        for backend in [self.primary] + self.replicas:
+            backend.close()
+
+
+# MySQL has no IF [NOT] EXISTS for indexes: these error codes mean "already there" / "already gone"
+MYSQL_DUP_KEYNAME = 1061
+MYSQL_CANT_DROP_KEY = 1091
+
+
+def _index_ddl(conn, sql, ignore_errno=None):
+    try:
+        conn.cursor().execute(sql)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        if ignore_errno is None or getattr(e, "errno", None) != ignore_errno:
+            raise
+
+
+def create_index(conn, name, table, columns):
+    # create if missing; any other failure (unknown column, lock timeout, ...) is raised
+    if dialect_of(conn) == "sqlite":
+        _index_ddl(conn, f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    else:
+        _index_ddl(conn, f"CREATE INDEX {name} ON {table} ({columns})", MYSQL_DUP_KEYNAME)
+
+
+def drop_index(conn, name, table):
+    # counterpart of create_index; a missing index is not an error
+    if dialect_of(conn) == "sqlite":
+        _index_ddl(conn, f"DROP INDEX IF EXISTS {name}")
+    else:
+        _index_ddl(conn, f"DROP INDEX {name} ON {table}", MYSQL_CANT_DROP_KEY)
+
+
+def table_columns(conn, table):
+    # {column: declared type}, lower case
+    cursor = conn.cursor()
+    if dialect_of(conn) == "sqlite":
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1].lower(): row[2].lower() for row in cursor.fetchall()}
+    cursor.execute("SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+    return {name.lower(): dtype.lower() for name, dtype in cursor.fetchall()}
+
+
+def dialect_of(conn):
+    # SQLite connections and cursors say so; pooled MySQL ones carry no marker
+    return getattr(conn, "dialect", "mysql")
+
+
+def upsert_add(cursor, table, keys, deltas):
+    # INSERT the row with `deltas` as values, or add them to the row with these keys, in one
+    # statement: concurrent writers neither lose an increment nor race to insert the same key
+    cols = list(keys) + list(deltas)
+    sets = ", ".join(f"{k}={k}+%s" for k in deltas)
+    if dialect_of(cursor) == "sqlite":
+        upsert = f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {sets}"
+    else:
+        upsert = f"ON DUPLICATE KEY UPDATE {sets}"
+    cursor.execute(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))}) {upsert}",
+                   tuple(keys.values()) + tuple(deltas.values()) + tuple(deltas.values()))
+
+
+def create_backend(kind, mysql_config=None, sqlite_config=None, pool_config=None, replica_config=None):
+    # "replicas" in the config adds read replicas: MySQL entries override keys of the
+    # primary config (e.g. {"port": 3307}), SQLite entries are file paths
+    kind = (kind or "mysql").lower()
+    if kind == "mysql":
+        config = dict(mysql_config or {})
+        replica_configs = config.pop("replicas", None) or []
+        primary = MySQLBackend(config, pool_config)
+        replicas = [MySQLBackend({**config, **r}, pool_config) for r in replica_configs]
+    elif kind == "sqlite":
+        config = dict(sqlite_config or {})
+        replica_paths = config.pop("replicas", None) or []
+        primary = SQLiteBackend(pool_config=pool_config, **config)
+        replicas = [SQLiteBackend(path, pool_config=pool_config, read_only=True) for path in replica_paths]
+    else:
+        raise ValueError(f"Backend database tidak dikenal: {kind}")
+    if not replicas:
+        return primary
+    return ReplicatedBackend(primary, replicas, **(replica_config or {}))